@@ -1,6 +1,12 @@
-import pickle 
+import inspect
 import datetime 
 
+import numpy as np
+
+from data.checkpoint import load_checkpoint, save_checkpoint
+from envs.batch import board_to_tiles
+from envs.engine import MOVES
+
 
 class BaseAgent:
     """
@@ -81,13 +87,51 @@ class BaseAgent:
 
         return params
 
-    def next_move(self):
+    def get_arrays(self):
+        """
+        Get the arrays holding the learned state of this agent.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        arrays:     dictionary
+                    Arrays not covered by get_params, by name; saved
+                    alongside the parameters in checkpoints.
+        """
+        return dict()
+
+    def set_arrays(self, arrays):
+        """
+        Set the arrays holding the learned state of this agent.
+
+        Parameters
+        ----------
+        arrays:     dictionary
+                    Arrays by name, as returned by get_arrays.
+
+        Returns
+        -------
+        None
+        """
+        pass
+
+    def next_move(self, state=None, legal_mask=None):
         """
         Get the next move to be made by the agent.
 
         Parameters
         ----------
-        None 
+        state:      list or None, default None
+                    Current tiles in the GameEnv.get_tiles layout; agents
+                    which do not look at the board ignore it.
+
+        legal_mask: sequence of 4 bools or None, default None
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board (see GameEnv.get_legal_moves); if given,
+                    agents only play legal moves while there is one.
 
         Returns
         -------
@@ -98,6 +142,60 @@ class BaseAgent:
         Notes
         -----
         All agents should overload this function with their own instance.
+        A move which does not change the board still costs a round trip
+        to the game and counts towards GameEnv.max_iter.
+        """
+        pass
+
+    def next_moves(self, states, legal_masks=None):
+        """
+        Get the next move of each of a batch of games.
+
+        Parameters
+        ----------
+        states:         NumPy array (N, 16)
+                        Tile exponents of each board, as in envs.batch.
+
+        legal_masks:    NumPy array (N, 4) of booleans or None, default None
+                        Whether or not each move in envs.engine.MOVES changes
+                        each board; see next_move.
+
+        Returns
+        -------
+        moves:          NumPy array (N,) of integers
+                        Index in envs.engine.MOVES of the next move of each
+                        game.
+
+        Notes
+        -----
+        Row i of every call holds the same game, so agents keeping state per
+        game keep it by row; reset_games clears it when rows start new
+        games. This default calls next_move once per row, which is only
+        right for agents keeping no state between moves; agents should
+        overload it with a vectorized version where they can.
+        """
+        moves = np.empty(len(states), dtype=np.int64)
+
+        for i, board in enumerate(states):
+            legal_mask = None if legal_masks is None else legal_masks[i]
+            move = self.next_move(board_to_tiles(board), legal_mask)
+            moves[i] = MOVES.index(move)
+
+        return moves
+
+    def reset_games(self, games):
+        """
+        Forget what the agent keeps about some games of a batch, as they
+        start over.
+
+        Parameters
+        ----------
+        games:      NumPy array of integers
+                    Rows of the batch passed to next_moves starting new games.
+
+        Returns
+        -------
+        None
         """
         pass
 
@@ -127,7 +225,7 @@ class BaseAgent:
         dt = datetime.datetime.utcnow().strftime('%Y-%m-%d_%H-%M-%S')
 
         # build the proposed filename
-        filename = "{cls_}_{ts}.pkl".format(
+        filename = "{cls_}_{ts}.ckpt".format(
             cls_=class_name,         
             ts=dt
         )
@@ -136,7 +234,7 @@ class BaseAgent:
 
     def save(self, filename=None):
         """
-        Save the agent.
+        Save the agent to a checkpoint file.
 
         Parameters
         ----------
@@ -146,8 +244,48 @@ class BaseAgent:
         Returns
         -------
         None
+
+        Notes
+        -----
+        Checkpoints hold a JSON description of the agent, built from
+        get_params (representations included), followed by the raw bytes of
+        its arrays; nothing is pickled. See data.checkpoint.
         """
         if filename is None:
             filename = self._get_filename()
 
-        pickle.dump(self, open(filename, 'wb'))
\ No newline at end of file
+        save_checkpoint(self, filename)
+
+    @classmethod
+    def load(cls, filename, mmap_mode='r'):
+        """
+        Load an agent saved by save.
+
+        Parameters
+        ----------
+        filename    string
+                    File name of the saved object.
+
+        mmap_mode:  string or None, default r
+                    Memory-map the arrays with this mode instead of reading
+                    them; the default shares one read-only copy of the
+                    weights between processes. See
+                    data.checkpoint.load_checkpoint.
+
+        Returns
+        -------
+        agent:      BaseAgent object
+                    Loaded agent.
+        """
+        agent = load_checkpoint(filename, mmap_mode=mmap_mode)
+
+        if not isinstance(agent, cls):
+            raise TypeError(
+                '{f} holds a {t} object, not a {c} object.'.format(
+                    f=filename,
+                    t=type(agent).__name__,
+                    c=cls.__name__
+                )
+            )
+
+        return agent
@@ -0,0 +1,404 @@
+import numpy as np
+
+from agents.base import BaseAgent
+from agents.neural_network import exponents_to_values, tiles_to_array
+from data.replay import PrioritizedReplayBuffer
+from envs.batch import legal_moves
+from envs.engine import MOVES
+from representations.neural_network import NeuralNetworkRepresentation
+from representations.optimizers import Adam
+
+
+class DQNAgent(BaseAgent):
+    """
+    Class object for the deep Q-network agent.
+
+    This agent plays epsilon-greedily with respect to a neural network
+    estimating the value of each move (its Q-function), and learns online
+    from a prioritized replay buffer: transitions are stored with observe, and
+    every few observations a minibatch is sampled and the network regressed
+    towards the reward plus the discounted value of the next board. The value
+    of the next board is taken from a target network, a copy of the network
+    refreshed every target_update training steps, at the move the network
+    itself prefers (double Q-learning).
+
+    Boards, moves and masks are handled in batches, so one agent can drive
+    many games at once, such as those of a BatchGameEnv.
+
+    Parameters
+    ----------
+    representation:     NeuralNetworkRepresentation object or None,
+                        default None
+                        Q-function, scoring the four moves, in the order of
+                        envs.engine.MOVES, from the 16 tile values; a new relu
+                        network with 64 hidden nodes if None.
+
+    epsilon:            float, default 0.1
+                        Probability of playing a random legal move.
+
+    gamma:              float, default 0.95
+                        Discount applied to the value of the next board.
+
+    reward_scale:       float, default 0.015625
+                        Multiplier turning the score gained by a move into
+                        its reward.
+
+    learning_rate:      float, default 0.001
+                        Step size of the Adam optimizer.
+
+    batch_size:         integer, default 64
+                        Number of transitions per training step.
+
+    buffer_size:        integer, default 1048576
+                        Maximum number of transitions replayed.
+
+    learning_starts:    integer, default 1024
+                        Number of transitions stored before training begins.
+
+    train_every:        integer, default 1
+                        Number of calls to observe per training step.
+
+    target_update:      integer, default 1000
+                        Number of training steps between copies of the
+                        network into the target network.
+
+    alpha:              float, default 0.6
+                        Prioritization exponent of the replay buffer.
+
+    beta:               float, default 0.4
+                        Importance sampling exponent of the replay buffer.
+
+    seed:               integer, default 1234
+                        Seed for exploration and replay sampling.
+
+    Attributes
+    ----------
+    buffer:             PrioritizedReplayBuffer object
+                        Stored transitions; not saved with the agent.
+
+    optimizer:          Adam object
+                        Optimizer of the network; its moment estimates are
+                        not saved with the agent, so training resumed from a
+                        checkpoint starts them afresh.
+
+    Notes
+    -----
+    An agent loaded with the default read-only memory maps (see
+    BaseAgent.load) plays from the checkpoint's pages; the network's arrays
+    are copied into memory on the first training step.
+    """
+    def __init__(self,
+                 representation=None,
+                 epsilon=0.1,
+                 gamma=0.95,
+                 reward_scale=0.015625,
+                 learning_rate=0.001,
+                 batch_size=64,
+                 buffer_size=1048576,
+                 learning_starts=1024,
+                 train_every=1,
+                 target_update=1000,
+                 alpha=0.6,
+                 beta=0.4,
+                 seed=1234):
+        if representation is None:
+            representation = NeuralNetworkRepresentation(
+                n_h=64,
+                activation='relu',
+                seed=seed,
+                dtype='float32'
+            )
+
+        self.representation = representation
+        self.epsilon = epsilon
+        self.gamma = gamma
+        self.reward_scale = reward_scale
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.learning_starts = learning_starts
+        self.train_every = train_every
+        self.target_update = target_update
+        self.alpha = alpha
+        self.beta = beta
+        self.seed = seed
+
+        self.buffer = PrioritizedReplayBuffer(
+            capacity=buffer_size,
+            alpha=alpha,
+            beta=beta,
+            seed=seed
+        )
+        self.optimizer = Adam(learning_rate=learning_rate)
+        self.rng = np.random.default_rng(seed)
+        self.target = None
+        self._update_target()
+
+        self.n_observed = 0
+        self.n_updates = 0
+
+    def __getstate__(self):
+        # the replay buffer can take GBs; a new, empty one is made on loading
+        state = self.__dict__.copy()
+        state['buffer'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.buffer = PrioritizedReplayBuffer(
+            capacity=self.buffer_size,
+            alpha=self.alpha,
+            beta=self.beta,
+            seed=self.seed
+        )
+
+    def _update_target(self):
+        """
+        Copy the network into the target network, creating it on first use.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        rep = self.representation
+
+        if self.target is None:
+            self.target = NeuralNetworkRepresentation(
+                n_i=rep.n_i,
+                n_h=rep.n_h,
+                n_o=rep.n_o,
+                activation=rep.activation,
+                seed=rep.seed,
+                initialize=False,
+                normalize_input=rep.normalize_input,
+                dtype=rep.dtype
+            )
+
+        self.target.update_parameters(*rep.parameters())
+
+    def _own_arrays(self):
+        """
+        Copy the network's arrays into memory if they are read-only, such as
+        the memory maps of a loaded checkpoint, so they can be trained.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        arrays = self.representation.get_arrays()
+
+        if not all(array.flags.writeable for array in arrays.values()):
+            self.representation.set_arrays(
+                {name: np.array(array) for name, array in arrays.items()}
+            )
+
+    def q_values(self, boards, target=False):
+        """
+        Value of each move from each of a batch of boards.
+
+        Parameters
+        ----------
+        boards:     NumPy array (N, 16)
+                    Tile exponents of each board.
+
+        target:     bool, default False
+                    Whether to use the target network instead of the network.
+
+        Returns
+        -------
+        values:     NumPy array (N, 4)
+                    Value of each move in envs.engine.MOVES.
+        """
+        rep = self.target if target else self.representation
+        X = exponents_to_values(boards).astype(rep.dtype)
+
+        return rep.feed_forward_batch(X)
+
+    def act(self, boards, legal=None):
+        """
+        Pick epsilon-greedy moves for a batch of boards.
+
+        Parameters
+        ----------
+        boards:     NumPy array (N, 16)
+                    Tile exponents of each board.
+
+        legal:      NumPy array (N, 4) of booleans or None, default None
+                    Whether or not each move in envs.engine.MOVES is legal
+                    for each board; computed if None.
+
+        Returns
+        -------
+        moves:      NumPy array (N,) of integers
+                    Index in envs.engine.MOVES of the picked move.
+        """
+        if legal is None:
+            legal = legal_moves(boards)
+
+        values = self.q_values(boards)
+        values[~legal] = -np.inf
+        moves = np.argmax(values, axis=1)
+
+        # a random legal move with probability epsilon
+        explore = self.rng.random(len(boards)) < self.epsilon
+        if explore.any():
+            u = self.rng.random((int(explore.sum()), 4)) * legal[explore]
+            moves[explore] = np.argmax(u, axis=1)
+
+        return moves
+
+    def observe(self, boards, moves, score_add, next_boards, dones):
+        """
+        Store a batch of transitions, training when due.
+
+        Parameters
+        ----------
+        boards:         NumPy array (N, 16)
+                        Tile exponents of each board before the move.
+
+        moves:          NumPy array (N,)
+                        Index in envs.engine.MOVES of each move.
+
+        score_add:      NumPy array (N,)
+                        Score gained by each move.
+
+        next_boards:    NumPy array (N, 16)
+                        Tile exponents of each board after the move and the
+                        new tile.
+
+        dones:          NumPy array (N,) of booleans
+                        Whether or not each move ended its game.
+
+        Returns
+        -------
+        loss:           float or None
+                        Loss of the training step taken, if any.
+        """
+        rewards = np.asarray(score_add, dtype=np.float32) * self.reward_scale
+        self.buffer.add(boards, moves, rewards, next_boards, dones)
+        self.n_observed += 1
+
+        if (len(self.buffer) >= self.learning_starts and
+                self.n_observed % self.train_every == 0):
+            return self.train_step()
+
+        return None
+
+    def train_step(self):
+        """
+        Sample a minibatch from the replay buffer and take one optimization
+        step on it.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        loss:       float
+                    Importance-weighted loss of the minibatch.
+        """
+        self._own_arrays()
+
+        (indices, boards, moves, rewards,
+         next_boards, dones, weights) = self.buffer.sample(self.batch_size)
+        rows = np.arange(len(indices))
+
+        # the network picks the next move, the target network values it
+        next_legal = legal_moves(next_boards)
+        next_values = self.q_values(next_boards)
+        next_values[~next_legal] = -np.inf
+        next_moves = np.argmax(next_values, axis=1)
+        bootstrap = self.q_values(next_boards, target=True)[rows, next_moves]
+
+        # nothing follows the end of a game
+        alive = ~dones & next_legal.any(axis=1)
+        targets = rewards + self.gamma * alive * bootstrap
+
+        errors = self.q_values(boards)[rows, moves] - targets
+        self.buffer.update_priorities(indices, errors)
+
+        rep = self.representation
+        loss = rep.fit_batch(
+            exponents_to_values(boards).astype(rep.dtype),
+            targets.astype(rep.dtype),
+            moves=moves,
+            loss='value',
+            optimizer=self.optimizer,
+            weights=weights
+        )
+
+        self.n_updates += 1
+        if self.n_updates % self.target_update == 0:
+            self._update_target()
+
+        return loss
+
+    def next_move(self, state=None, legal_mask=None):
+        """
+        Get the next move to be made by the agent.
+
+        Parameters
+        ----------
+        state:      list
+                    Current tiles in the GameEnv.get_tiles layout.
+
+        legal_mask: sequence of 4 bools or None, default None
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board; computed from the tiles if None.
+
+        Returns
+        -------
+        next_move:  unicode literal
+                    Next maneuver to be played by the agent encoded as one of
+                    the Selenium webdriver common keys implementation.
+        """
+        if state is None:
+            raise ValueError('DQNAgent requires the current tiles')
+
+        x = tiles_to_array(state)
+        board = np.log2(np.maximum(x, 1)).astype(np.uint8)
+
+        legal = None
+        if legal_mask is not None:
+            legal = np.asarray(legal_mask, dtype=bool)[np.newaxis]
+
+        return MOVES[self.next_moves(board[np.newaxis], legal)[0]]
+
+    def next_moves(self, states, legal_masks=None):
+        """
+        Get the next move of each of a batch of games; see
+        BaseAgent.next_moves.
+
+        Parameters
+        ----------
+        states:         NumPy array (N, 16)
+                        Tile exponents of each board.
+
+        legal_masks:    NumPy array (N, 4) of booleans or None, default None
+                        Whether or not each move in envs.engine.MOVES changes
+                        each board; computed from the boards if None.
+
+        Returns
+        -------
+        moves:          NumPy array (N,) of integers
+                        Index in envs.engine.MOVES of the next move of each
+                        game.
+
+        Notes
+        -----
+        Moves are epsilon-greedy, as in act.
+        """
+        if legal_masks is not None:
+            legal_masks = np.asarray(legal_masks, dtype=bool)
+
+        return self.act(states, legal_masks)
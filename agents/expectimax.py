@@ -0,0 +1,311 @@
+import time
+
+from agents.base import BaseAgent
+from agents.heuristics import RowHeuristic
+from envs.bitboard import MOVE_FUNCTIONS, to_board
+from envs.engine import MOVES
+from representations.cache import EvaluationCache
+
+
+# value of a board on which the game is over, well below any value the
+# heuristic gives a board still in play
+GAME_OVER_VALUE = -1e9
+
+
+class _Timeout(Exception):
+    """
+    Raised inside the search when the time budget of a move runs out.
+    """
+    pass
+
+
+class ExpectimaxAgent(BaseAgent):
+    """
+    Class object for the expectimax agent.
+
+    This agent searches the game tree, alternating between its own moves
+    (taking the best) and the random placement of new tiles (taking the
+    expectation), and plays the move with the highest expected value. Boards
+    are evaluated by the score gained along the way plus a heuristic value of
+    the final board, looked up line by line in precomputed tables (see
+    agents.heuristics.RowHeuristic).
+
+    Parameters
+    ----------
+    depth:                  integer, default 3
+                            Maximum number of moves searched ahead.
+
+    time_budget:            float or None, default 0.05
+                            Seconds per move. The search deepens one move at a
+                            time and plays the result of the deepest search
+                            completed in time; the first move ahead is always
+                            searched. If None, the search goes straight to
+                            depth.
+
+    min_probability:        float, default 0.0001
+                            Tile placements reached with a lower probability
+                            are not searched further, but evaluated directly.
+
+    table_size:             integer, default 1000000
+                            Maximum number of boards kept in the transposition
+                            table; the least recently used are evicted. The 8
+                            rotations and reflections of a board share an
+                            entry.
+
+    empty_weight:           float, default 20.0
+                            Value of each empty cell of an evaluated board, in
+                            its row and in its column.
+
+    merge_weight:           float, default 20.0
+                            Value of each merge available along a row or
+                            column.
+
+    monotonicity_weight:    float, default 1.0
+                            Cost of each unit of the penalty for rows and
+                            columns not being monotonic.
+
+    monotonicity_power:     float, default 2.0
+                            Power the tile exponents are raised to for the
+                            monotonicity penalty.
+
+    smoothness_weight:      float, default 2.0
+                            Cost of each unit of difference between the
+                            exponents of neighbouring tiles.
+
+    corner_weight:          float, default 20.0
+                            Value of each unit of exponent of the largest tile
+                            when it is in a corner.
+
+    Attributes
+    ----------
+    table:      EvaluationCache object
+                Transposition table mapping a canonical board to the depth it
+                was searched to and its expected value; see its stats for
+                the hit rate.
+    """
+    def __init__(self,
+                 depth=3,
+                 time_budget=0.05,
+                 min_probability=0.0001,
+                 table_size=1000000,
+                 empty_weight=20.0,
+                 merge_weight=20.0,
+                 monotonicity_weight=1.0,
+                 monotonicity_power=2.0,
+                 smoothness_weight=2.0,
+                 corner_weight=20.0):
+        self.depth = depth
+        self.time_budget = time_budget
+        self.min_probability = min_probability
+        self.table_size = table_size
+        self.empty_weight = empty_weight
+        self.merge_weight = merge_weight
+        self.monotonicity_weight = monotonicity_weight
+        self.monotonicity_power = monotonicity_power
+        self.smoothness_weight = smoothness_weight
+        self.corner_weight = corner_weight
+
+        self.heuristic = RowHeuristic(
+            empty_weight=empty_weight,
+            merge_weight=merge_weight,
+            monotonicity_weight=monotonicity_weight,
+            monotonicity_power=monotonicity_power,
+            smoothness_weight=smoothness_weight,
+            corner_weight=corner_weight
+        )
+        self.table = EvaluationCache(max_size=table_size)
+        self._deadline = None
+
+    def evaluate(self, board):
+        """
+        Evaluate a board reached at the end of the search. The value should
+        be the same for the 8 rotations and reflections of the board, as
+        they share entries of the transposition table.
+
+        Parameters
+        ----------
+        board:      integer
+                    64-bit board.
+
+        Returns
+        -------
+        value:      float
+                    Heuristic value of the board.
+        """
+        return self.heuristic.evaluate(board)
+
+    def _max_node(self, board, depth, probability):
+        """
+        Value of a board on which the agent moves next.
+
+        Parameters
+        ----------
+        board:          integer
+                        64-bit board.
+
+        depth:          integer
+                        Number of moves left to search.
+
+        probability:    float
+                        Probability of reaching this board.
+
+        Returns
+        -------
+        value:          float
+                        Best expected value over the agent's moves;
+                        GAME_OVER_VALUE if the game is over.
+        """
+        best = -float('inf')
+        for move in MOVE_FUNCTIONS:
+            new_board, score_add = move(board)
+            if new_board != board:
+                value = score_add + self._chance_node(
+                    new_board,
+                    depth - 1,
+                    probability
+                )
+                best = max(best, value)
+
+        if best == -float('inf'):
+            return GAME_OVER_VALUE
+
+        return best
+
+    def _chance_node(self, board, depth, probability):
+        """
+        Value of a board on which a new tile is placed next.
+
+        Parameters
+        ----------
+        board:          integer
+                        64-bit board.
+
+        depth:          integer
+                        Number of moves left to search.
+
+        probability:    float
+                        Probability of reaching this board.
+
+        Returns
+        -------
+        value:          float
+                        Expected value over the placements of the new tile.
+        """
+        if depth == 0 or probability < self.min_probability:
+            return self.evaluate(board)
+
+        # reuse the value of a search at least as deep, from any symmetric
+        # version of the board
+        key, _ = self.table.key(board)
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            return entry[1]
+
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _Timeout()
+
+        cells = [i for i in range(16) if (board >> (4 * i)) & 0xF == 0]
+        p_cell = probability / len(cells)
+
+        # a new tile is a 2 with probability 0.9, otherwise a 4
+        total = 0.0
+        for cell in cells:
+            shift = 4 * cell
+            total += 0.9 * self._max_node(
+                board | (1 << shift),
+                depth,
+                p_cell * 0.9
+            )
+            total += 0.1 * self._max_node(
+                board | (2 << shift),
+                depth,
+                p_cell * 0.1
+            )
+        value = total / len(cells)
+
+        # store the value, evicting the least recently used board if full
+        self.table.put(key, (depth, value))
+
+        return value
+
+    def _search(self, board, depth):
+        """
+        Expected value of each move from a board.
+
+        Parameters
+        ----------
+        board:      integer
+                    64-bit board.
+
+        depth:      integer
+                    Number of moves to search ahead.
+
+        Returns
+        -------
+        values:     list
+                    Expected value of each move in the order of
+                    envs.engine.MOVES; None for moves which do not change the
+                    board.
+        """
+        values = []
+        for move in MOVE_FUNCTIONS:
+            new_board, score_add = move(board)
+            if new_board == board:
+                values.append(None)
+            else:
+                values.append(
+                    score_add + self._chance_node(new_board, depth - 1, 1.0)
+                )
+
+        return values
+
+    def next_move(self, state=None, legal_mask=None):
+        """
+        Get the next move to be made by the agent.
+
+        Parameters
+        ----------
+        state:      list or integer
+                    Current tiles in the GameEnv.get_tiles layout, or the
+                    current 64-bit board.
+
+        legal_mask: sequence of 4 bools or None, default None
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board; ignored, as the search finds the legal
+                    moves itself.
+
+        Returns
+        -------
+        next_move:  unicode literal
+                    Next maneuver to be played by the agent encoded as one of
+                    the Selenium webdriver common keys implementation.
+        """
+        if state is None:
+            raise ValueError('ExpectimaxAgent requires the current tiles')
+
+        board = state if isinstance(state, int) else to_board(state)
+
+        if self.time_budget is None:
+            self._deadline = None
+            values = self._search(board, self.depth)
+        else:
+            # iterative deepening; the first move ahead always completes
+            start = time.perf_counter()
+            self._deadline = None
+            values = self._search(board, 1)
+
+            self._deadline = start + self.time_budget
+            for depth in range(2, self.depth + 1):
+                try:
+                    values = self._search(board, depth)
+                except _Timeout:
+                    break
+
+            self._deadline = None
+
+        # play the legal move with the highest value
+        legal = [i for i, value in enumerate(values) if value is not None]
+        if len(legal) == 0:
+            return MOVES[0]
+
+        return MOVES[max(legal, key=lambda i: values[i])]
@@ -0,0 +1,212 @@
+import numpy as np
+
+from envs.bitboard import ROW_MASK, transpose
+
+
+# Heuristic evaluation of bitboards from lookup tables.
+#
+# Notes
+# -----
+# Every line of the board (the four rows, and the four columns read as the
+# rows of the transposed board) is scored with one lookup in a 65536-entry
+# table, indexed by the line's 16-bit value, holding the weighted sum of the
+# line's terms: empty cells, merges, monotonicity and smoothness. Each cell
+# thus counts once in its row and once in its column. The terms read a line
+# the same way in both directions, so symmetric boards get the same value.
+
+# weight-independent tables, populated by _build_tables()
+_tables = {}
+
+
+def _build_tables():
+    """
+    Build the line tables which do not depend on the weights.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    tables:     dictionary
+                Lookup tables indexed by a 16-bit line:
+                    cells:      NumPy array (65536, 4) of the line's exponents
+                    empty:      NumPy array of the number of empty cells
+                    merges:     NumPy array of the number of merges a move
+                                along the line would make
+                    smoothness: NumPy array of the sum of the differences
+                                between neighbouring tiles, empty cells
+                                skipped
+                    line_max:   list of the largest exponent of the line
+                    end_max:    list of the largest exponent at either end
+                                of the line
+    """
+    if len(_tables) > 0:
+        return _tables
+
+    n = 1 << 16
+    cells = np.empty((n, 4), dtype=np.int64)
+    merges = np.zeros(n)
+    smoothness = np.zeros(n)
+
+    for line in range(n):
+        row = [(line >> (4 * i)) & 0xF for i in range(4)]
+        cells[line] = row
+        values = [val for val in row if val != 0]
+
+        # count the merges, each tile merging at most once
+        i = 0
+        while i + 1 < len(values):
+            if values[i] == values[i + 1]:
+                merges[line] += 1
+                i += 2
+            else:
+                i += 1
+
+        smoothness[line] = sum(abs(a - b) for a, b in zip(values, values[1:]))
+
+    _tables.update(
+        cells=cells,
+        empty=(cells == 0).sum(axis=1).astype(float),
+        merges=merges,
+        smoothness=smoothness,
+        line_max=cells.max(axis=1).tolist(),
+        end_max=np.maximum(cells[:, 0], cells[:, 3]).tolist()
+    )
+
+    return _tables
+
+
+def monotonicity(cells, power=2.0):
+    """
+    Penalty of lines for not being monotonic.
+
+    Parameters
+    ----------
+    cells:      NumPy array (N, 4)
+                Tile exponents of each line.
+
+    power:      float, default 2.0
+                Exponents are raised to this power, so that breaking the
+                order of large tiles costs more.
+
+    Returns
+    -------
+    penalty:    NumPy array (N,)
+                Smaller of the total increase and the total decrease along
+                each line; 0 for monotonic lines.
+    """
+    ranks = cells.astype(float) ** power
+    steps = ranks[:, 1:] - ranks[:, :-1]
+
+    increase = np.where(steps > 0, steps, 0.0).sum(axis=1)
+    decrease = np.where(steps < 0, -steps, 0.0).sum(axis=1)
+
+    return np.minimum(increase, decrease)
+
+
+class RowHeuristic:
+    """
+    Class object evaluating bitboards with precomputed line tables.
+
+    Notes
+    -----
+    The value of a board is the sum, over its rows and columns, of
+
+        empty_weight * empty cells
+        + merge_weight * merges
+        - monotonicity_weight * monotonicity penalty
+        - smoothness_weight * smoothness penalty
+
+    from one table lookup per line, plus corner_weight times the exponent of
+    the largest tile when that tile sits in a corner. The weights are folded
+    into a single table when the object is created.
+
+    Parameters
+    ----------
+    empty_weight:           float, default 20.0
+                            Value of each empty cell.
+
+    merge_weight:           float, default 20.0
+                            Value of each pair of neighbouring equal tiles.
+
+    monotonicity_weight:    float, default 1.0
+                            Cost of each unit of monotonicity penalty.
+
+    monotonicity_power:     float, default 2.0
+                            Power the exponents are raised to for the
+                            monotonicity penalty.
+
+    smoothness_weight:      float, default 2.0
+                            Cost of each unit of difference between the
+                            exponents of neighbouring tiles.
+
+    corner_weight:          float, default 20.0
+                            Value of each unit of exponent of the largest
+                            tile when it is in a corner.
+    """
+    def __init__(self,
+                 empty_weight=20.0,
+                 merge_weight=20.0,
+                 monotonicity_weight=1.0,
+                 monotonicity_power=2.0,
+                 smoothness_weight=2.0,
+                 corner_weight=20.0):
+        self.empty_weight = empty_weight
+        self.merge_weight = merge_weight
+        self.monotonicity_weight = monotonicity_weight
+        self.monotonicity_power = monotonicity_power
+        self.smoothness_weight = smoothness_weight
+        self.corner_weight = corner_weight
+
+        tables = _build_tables()
+        values = (
+            empty_weight * tables['empty'] +
+            merge_weight * tables['merges'] -
+            monotonicity_weight * monotonicity(tables['cells'],
+                                               monotonicity_power) -
+            smoothness_weight * tables['smoothness']
+        )
+
+        # lists index faster than arrays with Python integers
+        self._values = values.tolist()
+        self._line_max = tables['line_max']
+        self._end_max = tables['end_max']
+
+    def evaluate(self, board):
+        """
+        Evaluate a board.
+
+        Parameters
+        ----------
+        board:      integer
+                    64-bit board.
+
+        Returns
+        -------
+        value:      float
+                    Heuristic value of the board.
+        """
+        values = self._values
+        line_max = self._line_max
+        columns = transpose(board)
+
+        rows = (board & ROW_MASK, (board >> 16) & ROW_MASK,
+                (board >> 32) & ROW_MASK, board >> 48)
+
+        value = (
+            values[rows[0]] + values[rows[1]] +
+            values[rows[2]] + values[rows[3]] +
+            values[columns & ROW_MASK] +
+            values[(columns >> 16) & ROW_MASK] +
+            values[(columns >> 32) & ROW_MASK] +
+            values[columns >> 48]
+        )
+
+        # the corners are the ends of the top and bottom rows
+        corner = max(self._end_max[rows[0]], self._end_max[rows[3]])
+        if corner == max(line_max[rows[0]], line_max[rows[1]],
+                         line_max[rows[2]], line_max[rows[3]]):
+            value += self.corner_weight * corner
+
+        return value
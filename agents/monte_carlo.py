@@ -0,0 +1,218 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from agents.base import BaseAgent
+from agents.neural_network import tiles_to_array
+from envs.batch import RandomStreams, legal_moves, move_boards, spawn_tiles
+from envs.engine import MOVES
+
+
+def rollout(boards, seed, max_moves=None):
+    """
+    Play random games from a set of boards, all at once, and report their
+    scores.
+
+    Parameters
+    ----------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each starting board, before a new tile is
+                placed.
+
+    seed:       integer
+                Seed for the games' random number streams.
+
+    max_moves:  integer or None, default None
+                Maximum number of moves per game (no limit if None).
+
+    Returns
+    -------
+    scores:     NumPy array (N,)
+                Score gained in each game.
+    """
+    streams = RandomStreams(len(boards), seed=seed)
+    games = np.arange(len(boards))
+
+    boards = boards.copy()
+    spawn_tiles(boards, games, streams)
+
+    scores = np.zeros(len(boards), dtype=np.int64)
+    legal = legal_moves(boards)
+    alive = legal.any(axis=1)
+
+    n_moves = 0
+    while alive.any() and (max_moves is None or n_moves < max_moves):
+        games = np.flatnonzero(alive)
+
+        # pick a random legal move in each game still being played
+        u = np.stack([streams.random(games) for _ in range(4)], axis=1)
+        moves = np.argmax(u * legal[games], axis=1)
+
+        new_boards, score_add, _ = move_boards(boards[games], moves)
+        boards[games] = new_boards
+        scores[games] += score_add
+        spawn_tiles(boards, games, streams)
+
+        legal[games] = legal_moves(boards[games])
+        alive[games] = legal[games].any(axis=1)
+        n_moves += 1
+
+    return scores
+
+
+class MonteCarloAgent(BaseAgent):
+    """
+    Class object for the Monte Carlo agent.
+
+    For each legal move, this agent plays many random games from the board
+    the move leads to, and plays the move with the best mean score. The
+    random games of all candidate moves are played together in batches with
+    NumPy, split across a pool of worker processes.
+
+    Parameters
+    ----------
+    n_rollouts:     integer, default 256
+                    Number of random games played per candidate move (per
+                    round, when a time budget is given).
+
+    time_budget:    float or None, default None
+                    Seconds per move. Rounds of n_rollouts games per move are
+                    played until the budget runs out; at least one round is
+                    always played. If None, exactly one round is played.
+
+    max_moves:      integer or None, default None
+                    Maximum number of moves per random game (no limit if
+                    None).
+
+    n_jobs:         integer, default 1
+                    Number of worker processes playing the random games (in
+                    process if 1). Call close() to shut the pool down.
+
+    seed:           integer, default 1234
+                    Seed for the random games.
+    """
+    def __init__(self,
+                 n_rollouts=256,
+                 time_budget=None,
+                 max_moves=None,
+                 n_jobs=1,
+                 seed=1234):
+        self.n_rollouts = n_rollouts
+        self.time_budget = time_budget
+        self.max_moves = max_moves
+        self.n_jobs = n_jobs
+        self.seed = seed
+
+        # seeds for the random games of successive rounds
+        self._seeds = np.random.SeedSequence(seed)
+        self._executor = None
+
+    def __getstate__(self):
+        # worker pools cannot be pickled; a new one is started when needed
+        state = self.__dict__.copy()
+        state['_executor'] = None
+
+        return state
+
+    def _get_executor(self):
+        """
+        Retrieve the pool of worker processes, starting it on first use.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        executor:   ProcessPoolExecutor object or None
+                    Pool playing the random games (None if n_jobs is 1).
+        """
+        if self._executor is None and self.n_jobs > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+
+        return self._executor
+
+    def close(self):
+        """
+        Shut down the pool of worker processes.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def next_move(self, state=None, legal_mask=None):
+        """
+        Get the next move to be made by the agent.
+
+        Parameters
+        ----------
+        state:      list
+                    Current tiles in the GameEnv.get_tiles layout.
+
+        legal_mask: sequence of 4 bools or None, default None
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board; computed from the tiles if None.
+
+        Returns
+        -------
+        next_move:  unicode literal
+                    Next maneuver to be played by the agent encoded as one of
+                    the Selenium webdriver common keys implementation.
+        """
+        if state is None:
+            raise ValueError('MonteCarloAgent requires the current tiles')
+
+        x = tiles_to_array(state)
+        board = np.log2(np.maximum(x, 1)).astype(np.uint8)
+
+        if legal_mask is None:
+            legal_mask = legal_moves(board[np.newaxis])[0]
+        candidates = np.flatnonzero(legal_mask)
+        if len(candidates) == 0:
+            return MOVES[0]
+
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+
+        # the boards each candidate move leads to, one row per random game
+        after, score_add, _ = move_boards(
+            np.repeat(board[np.newaxis], len(candidates), axis=0),
+            candidates
+        )
+        starts = np.repeat(after, self.n_rollouts, axis=0)
+        chunks = np.array_split(starts, max(1, self.n_jobs))
+
+        # play rounds of random games until the time budget runs out
+        executor = self._get_executor()
+        totals = np.zeros(len(starts), dtype=np.int64)
+        n_rounds = 0
+        while True:
+            seeds = self._seeds.spawn(1)[0].generate_state(len(chunks))
+            args = (chunks, seeds.tolist(), [self.max_moves] * len(chunks))
+
+            if executor is None:
+                scores = list(map(rollout, *args))
+            else:
+                scores = list(executor.map(rollout, *args))
+
+            totals += np.concatenate(scores)
+            n_rounds += 1
+
+            if deadline is None or time.perf_counter() > deadline:
+                break
+
+        # mean score of each candidate move
+        means = totals.reshape(len(candidates), -1).mean(axis=1) / n_rounds
+        values = score_add + means
+
+        return MOVES[candidates[int(np.argmax(values))]]
@@ -0,0 +1,122 @@
+import numpy as np
+
+from agents.base import BaseAgent
+from envs.batch import legal_moves
+from envs.engine import MOVES
+
+
+def tiles_to_array(tiles):
+    """
+    Flatten tiles in the GameEnv.get_tiles layout into network inputs.
+
+    Parameters
+    ----------
+    tiles:      list
+                Each sublist represents a row starting from top to bottom.
+                Each element represents a tile (None when empty), starting
+                from left to right.
+
+    Returns
+    -------
+    x:          NumPy array (16,)
+                Tile values, row by row, with 0 for empty cells.
+    """
+    return np.array([val or 0 for row in tiles for val in row], dtype=float)
+
+
+def exponents_to_values(boards):
+    """
+    Convert boards of tile exponents to tile values.
+
+    Parameters
+    ----------
+    boards:     NumPy array
+                Tile exponents (0 for empty cells).
+
+    Returns
+    -------
+    values:     NumPy array of floats
+                Tile values (0 for empty cells).
+    """
+    return np.where(boards > 0, np.exp2(boards), 0.0)
+
+
+class NeuralNetworkAgent(BaseAgent):
+    """
+    Class object for the neural network agent.
+
+    This agent feeds the current board through a neural network representation
+    and plays the legal move with the highest output.
+
+    Parameters
+    ----------
+    representation: NeuralNetworkRepresentation object
+                    Network scoring the four moves, in the order of
+                    envs.engine.MOVES, from the 16 tile values.
+    """
+    def __init__(self, representation=None):
+        self.representation = representation
+
+    def next_move(self, state=None, legal_mask=None):
+        """
+        Get the next move to be made by the agent.
+
+        Parameters
+        ----------
+        state:      list
+                    Current tiles in the GameEnv.get_tiles layout.
+
+        legal_mask: sequence of 4 bools or None, default None
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board; computed from the tiles if None.
+
+        Returns
+        -------
+        next_move:  unicode literal
+                    Next maneuver to be played by the agent encoded as one of
+                    the Selenium webdriver common keys implementation.
+        """
+        if state is None:
+            raise ValueError('NeuralNetworkAgent requires the current tiles')
+
+        x = tiles_to_array(state)
+        board = np.log2(np.maximum(x, 1)).astype(np.uint8)
+
+        legal = None
+        if legal_mask is not None:
+            legal = np.asarray(legal_mask, dtype=bool)[np.newaxis]
+
+        return MOVES[self.next_moves(board[np.newaxis], legal)[0]]
+
+    def next_moves(self, states, legal_masks=None):
+        """
+        Get the next move of each of a batch of games; see
+        BaseAgent.next_moves.
+
+        Parameters
+        ----------
+        states:         NumPy array (N, 16)
+                        Tile exponents of each board.
+
+        legal_masks:    NumPy array (N, 4) of booleans or None, default None
+                        Whether or not each move in envs.engine.MOVES changes
+                        each board; computed from the boards if None.
+
+        Returns
+        -------
+        moves:          NumPy array (N,) of integers
+                        Index in envs.engine.MOVES of the next move of each
+                        game.
+
+        Notes
+        -----
+        The whole batch goes through the network in one forward pass.
+        """
+        # only consider moves which change the board
+        if legal_masks is None:
+            legal_masks = legal_moves(states)
+
+        return self.representation.best_moves(
+            exponents_to_values(states),
+            legal=np.asarray(legal_masks, dtype=bool)
+        )
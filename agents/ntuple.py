@@ -0,0 +1,79 @@
+import numpy as np
+
+from agents.base import BaseAgent
+from agents.neural_network import tiles_to_array
+from envs.engine import MOVES
+
+
+class NTupleAgent(BaseAgent):
+    """
+    Class object for the n-tuple network agent.
+
+    This agent plays the move with the best score gained plus value, according
+    to an n-tuple network, of the board the move leads to.
+
+    Parameters
+    ----------
+    representation: NTupleRepresentation object
+                    Network valuing the boards reached by each move.
+    """
+    def __init__(self, representation=None):
+        self.representation = representation
+
+    def next_move(self, state=None, legal_mask=None):
+        """
+        Get the next move to be made by the agent.
+
+        Parameters
+        ----------
+        state:      list
+                    Current tiles in the GameEnv.get_tiles layout.
+
+        legal_mask: sequence of 4 bools or None, default None
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board; computed from the tiles if None.
+
+        Returns
+        -------
+        next_move:  unicode literal
+                    Next maneuver to be played by the agent encoded as one of
+                    the Selenium webdriver common keys implementation.
+        """
+        if state is None:
+            raise ValueError('NTupleAgent requires the current tiles')
+
+        x = tiles_to_array(state)
+        board = np.log2(np.maximum(x, 1)).astype(np.uint8)
+
+        legal = None
+        if legal_mask is not None:
+            legal = np.asarray(legal_mask, dtype=bool)[np.newaxis]
+
+        return MOVES[self.next_moves(board[np.newaxis], legal)[0]]
+
+    def next_moves(self, states, legal_masks=None):
+        """
+        Get the next move of each of a batch of games; see
+        BaseAgent.next_moves.
+
+        Parameters
+        ----------
+        states:         NumPy array (N, 16)
+                        Tile exponents of each board.
+
+        legal_masks:    NumPy array (N, 4) of booleans or None, default None
+                        Whether or not each move in envs.engine.MOVES changes
+                        each board; computed from the boards if None.
+
+        Returns
+        -------
+        moves:          NumPy array (N,) of integers
+                        Index in envs.engine.MOVES of the next move of each
+                        game.
+        """
+        if legal_masks is not None:
+            legal_masks = np.asarray(legal_masks, dtype=bool)
+
+        return self.representation.best_moves(
+            np.asarray(states, dtype=np.uint8), legal=legal_masks
+        )
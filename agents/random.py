@@ -1,6 +1,9 @@
 import random 
 
+import numpy as np
+
 from agents.base import BaseAgent
+from envs.batch import RandomStreams
 from selenium.webdriver.common.keys import Keys 
 
 
@@ -14,18 +17,28 @@ class RandomAgent(BaseAgent):
     Parameters
     ----------
     seed:   integer, default 1234
-            Seed for the random number generator.
+            Seed for the random number generator; in next_moves, for the
+            random number streams, one per game of the batch.
     """
+    _streams = None
+
     def __init__(self, seed=1234):
+        self.seed = seed
         random.seed(seed)
 
-    def next_move(self):
+    def next_move(self, state=None, legal_mask=None):
         """
         Get the next move to be made by the agent.
 
         Parameters
         ----------
-        None 
+        state:      list or None, default None
+                    Current tiles; ignored by this agent.
+
+        legal_mask: sequence of 4 bools or None, default None
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board; if given, the move is picked among the legal
+                    ones only.
 
         Returns
         -------
@@ -41,7 +54,50 @@ class RandomAgent(BaseAgent):
             Keys.ARROW_LEFT
         ]
         
+        # only pick among the legal moves, if known and there are any
+        if legal_mask is not None and any(legal_mask):
+            moves = [move for move, legal in zip(moves, legal_mask) if legal]
+
         # randomly pick the next move
-        next_move = moves[random.randint(0, 3)]
+        next_move = moves[random.randint(0, len(moves) - 1)]
+
+        return next_move
+
+    def next_moves(self, states, legal_masks=None):
+        """
+        Get the next move of each of a batch of games; see
+        BaseAgent.next_moves.
+
+        Parameters
+        ----------
+        states:         NumPy array (N, 16)
+                        Tile exponents of each board; only their number is
+                        used by this agent.
+
+        legal_masks:    NumPy array (N, 4) of booleans or None, default None
+                        Whether or not each move in envs.engine.MOVES changes
+                        each board; if given, moves are picked among the
+                        legal ones only.
+
+        Returns
+        -------
+        moves:          NumPy array (N,) of integers
+                        Index in envs.engine.MOVES of the next move of each
+                        game.
+        """
+        n = len(states)
+
+        # each game draws from its own stream
+        if self._streams is None or self._streams.n_streams != n:
+            self._streams = RandomStreams(n, seed=self.seed)
+
+        legal = np.ones((n, 4), dtype=bool)
+        if legal_masks is not None:
+            masks = np.asarray(legal_masks, dtype=bool)
+            has_legal = masks.any(axis=1)
+            legal[has_legal] = masks[has_legal]
+
+        # pick the k-th allowed move of each game
+        k = (self._streams.random() * legal.sum(axis=1)).astype(np.int64)
 
-        return next_move 
\ No newline at end of file
+        return np.argmax(np.cumsum(legal, axis=1) > k[:, None], axis=1)
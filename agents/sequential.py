@@ -1,4 +1,7 @@
+import numpy as np
+
 from agents.base import BaseAgent
+from envs.engine import MOVES
 from selenium.webdriver.common.keys import Keys 
 
 
@@ -22,8 +25,14 @@ class SequentialAgent(BaseAgent):
     ----------
     previous_move:  unicode literal
                     Previous move made by the agent.
+
+    previous_moves: NumPy array (N,) of integers or None
+                    Index in envs.engine.MOVES of the previous move made by
+                    next_moves in each game of the batch (-1 before the
+                    first).
     """
     previous_move = None
+    previous_moves = None
 
     def __init__(self, initial_move=Keys.ARROW_UP, clockwise=True):
         self.initial_move = initial_move
@@ -45,13 +54,44 @@ class SequentialAgent(BaseAgent):
         """
         self.previous_move = previous_move 
 
-    def next_move(self):
+    def _following_move(self, move):
+        """
+        Get the move following another in the agent's loop.
+
+        Parameters
+        ----------
+        move:       unicode literal or None
+                    Move in the loop; None before the first move.
+
+        Returns
+        -------
+        next_move:  unicode literal
+                    Move following it, or the initial move if None.
+        """
+        if move == Keys.ARROW_UP:
+            return Keys.ARROW_RIGHT if self.clockwise else Keys.ARROW_LEFT
+        elif move == Keys.ARROW_RIGHT:
+            return Keys.ARROW_DOWN if self.clockwise else Keys.ARROW_UP
+        elif move == Keys.ARROW_DOWN:
+            return Keys.ARROW_LEFT if self.clockwise else Keys.ARROW_RIGHT
+        elif move == Keys.ARROW_LEFT:
+            return Keys.ARROW_UP if self.clockwise else Keys.ARROW_DOWN
+        else:
+            return self.initial_move
+
+    def next_move(self, state=None, legal_mask=None):
         """
         Get the next move to be made by the agent.
 
         Parameters
         ----------
-        None 
+        state:      list or None, default None
+                    Current tiles; ignored by this agent.
+
+        legal_mask: sequence of 4 bools or None, default None
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board; if given, illegal moves are skipped over in
+                    the loop.
 
         Returns
         -------
@@ -60,18 +100,81 @@ class SequentialAgent(BaseAgent):
                     the Selenium webdriver common keys implementation.
         """
         # logic to sequentially loop through maneuvers
-        if self.previous_move == Keys.ARROW_UP:
-            next_move = Keys.ARROW_RIGHT if self.clockwise else Keys.ARROW_LEFT 
-        elif self.previous_move == Keys.ARROW_RIGHT:
-            next_move = Keys.ARROW_DOWN if self.clockwise else Keys.ARROW_UP
-        elif self.previous_move == Keys.ARROW_DOWN:
-            next_move = Keys.ARROW_LEFT if self.clockwise else Keys.ARROW_RIGHT 
-        elif self.previous_move == Keys.ARROW_LEFT:
-            next_move = Keys.ARROW_UP if self.clockwise else Keys.ARROW_DOWN
-        else:
-            next_move = self.initial_move 
+        next_move = self._following_move(self.previous_move)
+
+        # skip ahead past the illegal moves, if known and any move is legal
+        if legal_mask is not None and any(legal_mask):
+            legal = {move for move, ok in zip(MOVES, legal_mask) if ok}
+            for _ in range(len(MOVES)):
+                if next_move in legal:
+                    break
+                next_move = self._following_move(next_move)
 
         # update the previous move with the current move
         self._set_previous_move(next_move)
 
-        return next_move 
\ No newline at end of file
+        return next_move
+
+    def next_moves(self, states, legal_masks=None):
+        """
+        Get the next move of each of a batch of games; see
+        BaseAgent.next_moves.
+
+        Parameters
+        ----------
+        states:         NumPy array (N, 16)
+                        Tile exponents of each board; only their number is
+                        used by this agent.
+
+        legal_masks:    NumPy array (N, 4) of booleans or None, default None
+                        Whether or not each move in envs.engine.MOVES changes
+                        each board; if given, illegal moves are skipped over
+                        in the loop.
+
+        Returns
+        -------
+        moves:          NumPy array (N,) of integers
+                        Index in envs.engine.MOVES of the next move of each
+                        game.
+        """
+        n = len(states)
+        if self.previous_moves is None or len(self.previous_moves) != n:
+            self.previous_moves = np.full(n, -1, dtype=np.int64)
+
+        # MOVES runs clockwise, so the loop steps through it
+        step = 1 if self.clockwise else -1
+        moves = np.where(
+            self.previous_moves < 0,
+            MOVES.index(self.initial_move),
+            (self.previous_moves + step) % 4
+        )
+
+        # skip ahead past the illegal moves of games with a legal move
+        if legal_masks is not None:
+            legal = np.asarray(legal_masks, dtype=bool)
+            games = np.arange(n)
+            has_legal = legal.any(axis=1)
+            for _ in range(len(MOVES) - 1):
+                skip = has_legal & ~legal[games, moves]
+                moves[skip] = (moves[skip] + step) % 4
+
+        self.previous_moves = moves.copy()
+
+        return moves
+
+    def reset_games(self, games):
+        """
+        Restart the loop of some games of a batch; see
+        BaseAgent.reset_games.
+
+        Parameters
+        ----------
+        games:      NumPy array of integers
+                    Rows of the batch passed to next_moves starting new games.
+
+        Returns
+        -------
+        None
+        """
+        if self.previous_moves is not None:
+            self.previous_moves[games] = -1
@@ -0,0 +1,313 @@
+import importlib
+import inspect
+import json
+
+import numpy as np
+
+from representations.base import BaseRepresentation
+
+
+# A checkpoint is one file: a 16 byte header (the magic bytes below and the
+# length of the JSON document as a little-endian uint64), a JSON document
+# describing the saved object, then the raw bytes of its arrays. The document
+# and every array start on a multiple of ALIGNMENT bytes, so arrays can be
+# memory-mapped in place.
+#
+# In the document, an agent or representation is stored as
+#     {"__object__": "module:Class", "params": {...}, "arrays": {...}}
+# where params are the values returned by get_params (nested agents and
+# representations stored the same way) and arrays map the names returned by
+# get_arrays to array references. An array reference is
+#     {"__array__": "name"}
+# naming an entry of the top-level "arrays" table, which gives the dtype,
+# shape and offset (from the start of the array data) of each array.
+
+MAGIC = b'A2048CKP'
+VERSION = 1
+ALIGNMENT = 64
+
+# packages a checkpoint may name classes from; nothing else is imported
+ALLOWED_PACKAGES = ('agents', 'representations')
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('length', '<u8')
+])
+
+
+def _align(n):
+    """
+    Round a byte count up to a multiple of ALIGNMENT.
+    """
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def _allowed_classes():
+    """
+    Base classes of the objects a checkpoint may hold.
+    """
+    # imported here as agents.base imports this module
+    from agents.base import BaseAgent
+
+    return (BaseAgent, BaseRepresentation)
+
+
+def _encode(value, path, blobs):
+    """
+    Convert a value to its JSON form, collecting its arrays.
+
+    Parameters
+    ----------
+    value:      object
+                Value to convert.
+
+    path:       string
+                Dotted name of the value, used to name its arrays.
+
+    blobs:      dictionary
+                Arrays collected so far, by name; updated.
+
+    Returns
+    -------
+    encoded:    object
+                JSON-serializable form of the value.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise TypeError(
+                'Cannot save {p}: arrays of Python objects are not '
+                'supported.'.format(p=path)
+            )
+        blobs[path] = value
+        return {'__array__': path}
+
+    if isinstance(value, (list, tuple)):
+        return [_encode(v, '{p}.{i}'.format(p=path, i=i), blobs)
+                for i, v in enumerate(value)]
+
+    if isinstance(value, dict):
+        return {str(k): _encode(v, '{p}.{k}'.format(p=path, k=k), blobs)
+                for k, v in value.items()}
+
+    if isinstance(value, _allowed_classes()):
+        cls = value.__class__
+        params = dict()
+        for key, param in value.get_params().items():
+            # skip methods shadowing constructor parameters (such as
+            # initialize); they take their default when loaded
+            if inspect.ismethod(param):
+                continue
+            params[key] = _encode(
+                param, '{p}.{k}'.format(p=path, k=key), blobs
+            )
+
+        arrays = {
+            key: _encode(np.asarray(array),
+                         '{p}.{k}'.format(p=path, k=key), blobs)
+            for key, array in value.get_arrays().items()
+        }
+
+        return {
+            '__object__': '{m}:{c}'.format(m=cls.__module__,
+                                           c=cls.__qualname__),
+            'params': params,
+            'arrays': arrays
+        }
+
+    raise TypeError(
+        'Cannot save {p} of type {t}.'.format(p=path, t=type(value).__name__)
+    )
+
+
+def _decode(value, arrays):
+    """
+    Rebuild a value from its JSON form.
+
+    Parameters
+    ----------
+    value:      object
+                JSON form of the value.
+
+    arrays:     dictionary
+                Loaded arrays, by name.
+
+    Returns
+    -------
+    decoded:    object
+                Rebuilt value.
+    """
+    if isinstance(value, list):
+        return [_decode(v, arrays) for v in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    if '__array__' in value:
+        return arrays[value['__array__']]
+
+    if '__object__' not in value:
+        return {k: _decode(v, arrays) for k, v in value.items()}
+
+    # only agents and representations of this package are ever imported
+    # and constructed
+    module_name, _, class_name = value['__object__'].partition(':')
+    if module_name.partition('.')[0] not in ALLOWED_PACKAGES:
+        raise ValueError(
+            'Checkpoint refers to {o}, which is not an agent or '
+            'representation.'.format(o=value['__object__'])
+        )
+
+    cls = getattr(importlib.import_module(module_name), class_name, None)
+    if not (inspect.isclass(cls) and issubclass(cls, _allowed_classes())):
+        raise ValueError(
+            'Checkpoint refers to {o}, which is not an agent or '
+            'representation.'.format(o=value['__object__'])
+        )
+
+    params = {k: _decode(v, arrays) for k, v in value['params'].items()}
+    saved = {k: _decode(v, arrays) for k, v in value['arrays'].items()}
+
+    # saved arrays replace the random ones
+    if saved and 'initialize' in cls._get_param_names():
+        params['initialize'] = False
+
+    obj = cls(**params)
+    if saved:
+        obj.set_arrays(saved)
+
+    return obj
+
+
+def save_checkpoint(obj, filename):
+    """
+    Save an agent or representation to a checkpoint file.
+
+    Parameters
+    ----------
+    obj:        BaseAgent or BaseRepresentation object
+                Object to save, from its parameters and arrays.
+
+    filename:   string
+                File name for the checkpoint.
+
+    Returns
+    -------
+    None
+    """
+    blobs = dict()
+    document = {'version': VERSION, 'object': _encode(obj, 'object', blobs)}
+
+    # lay the arrays out one after the other, aligned
+    table = dict()
+    offset = 0
+    for name, array in blobs.items():
+        table[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset
+        }
+        offset = _align(offset + array.nbytes)
+    document['arrays'] = table
+
+    text = json.dumps(document).encode('utf-8')
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['length'] = len(text)
+    start = _align(HEADER_DTYPE.itemsize + len(text))
+
+    with open(filename, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(text)
+        f.write(b'\0' * (start - HEADER_DTYPE.itemsize - len(text)))
+
+        for name, array in blobs.items():
+            f.seek(start + table[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+def read_header(filename):
+    """
+    Read the JSON document of a checkpoint file.
+
+    Parameters
+    ----------
+    filename:   string
+                File name of the checkpoint.
+
+    Returns
+    -------
+    document:   dictionary
+                Description of the saved object and its arrays.
+
+    start:      integer
+                Position in the file of the array data.
+    """
+    with open(filename, 'rb') as f:
+        header = np.frombuffer(
+            f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE
+        )
+        if len(header) == 0 or header['magic'][0] != MAGIC:
+            raise ValueError(
+                '{f} is not a checkpoint file.'.format(f=filename)
+            )
+
+        length = int(header['length'][0])
+        document = json.loads(f.read(length).decode('utf-8'))
+
+    if document.get('version') != VERSION:
+        raise ValueError(
+            'Unsupported checkpoint version {v}.'.format(
+                v=document.get('version')
+            )
+        )
+
+    return document, _align(HEADER_DTYPE.itemsize + length)
+
+
+def load_checkpoint(filename, mmap_mode='r'):
+    """
+    Load an agent or representation saved by save_checkpoint.
+
+    Parameters
+    ----------
+    filename:   string
+                File name of the checkpoint.
+
+    mmap_mode:  string or None, default r
+                Memory-map the arrays with this mode instead of reading them
+                (see numpy.memmap): the default shares one read-only copy
+                between processes, c gives private writable copies of the
+                pages written to, and None reads the arrays into memory.
+
+    Returns
+    -------
+    obj:        BaseAgent or BaseRepresentation object
+                Loaded object.
+    """
+    document, start = read_header(filename)
+
+    arrays = dict()
+    for name, entry in document['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        offset = start + entry['offset']
+
+        if mmap_mode is None or int(np.prod(shape)) == 0:
+            count = int(np.prod(shape))
+            array = np.fromfile(
+                filename, dtype=dtype, count=count, offset=offset
+            ).reshape(shape)
+        else:
+            array = np.memmap(
+                filename, dtype=dtype, mode=mmap_mode, offset=offset,
+                shape=shape
+            )
+        arrays[name] = array
+
+    return _decode(document['object'], arrays)
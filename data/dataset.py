@@ -0,0 +1,336 @@
+import queue
+import threading
+
+import numpy as np
+
+from data.trajectory import NO_MOVE, TrajectoryReader, unpack_boards
+from envs.symmetry import MOVE_PERMUTATIONS, N_SYMMETRIES, transform_boards
+
+
+def shard_returns(records):
+    """
+    Score gained from each record to the end of its game.
+
+    Parameters
+    ----------
+    records:    NumPy array of STEP_DTYPE
+                Records of whole games, in order.
+
+    Returns
+    -------
+    returns:    NumPy array of int64
+                Sum of the score gained by each record's move and every
+                following move of the same game.
+    """
+    n = len(records)
+    score_add = records['score_add'].astype(np.int64)
+
+    # suffix sums over the whole shard, with a trailing zero
+    suffix = np.zeros(n + 1, dtype=np.int64)
+    suffix[:n] = np.cumsum(score_add[::-1])[::-1]
+
+    # index one past the last record of each record's game
+    ends = np.append(np.flatnonzero(np.diff(records['game']) != 0) + 1, n)
+    end = ends[np.searchsorted(ends, np.arange(n), side='right')]
+
+    return suffix[:n] - suffix[end]
+
+
+class TrajectoryDataset:
+    """
+    Class object streaming shuffled minibatches from recorded trajectories.
+
+    Notes
+    -----
+    Shards are memory-mapped and read one chunk at a time into a bounded
+    shuffle buffer; each minibatch is drawn at random from the buffer and
+    replaced by the next records read. Memory use is therefore bounded by the
+    buffer, whatever the size of the corpus. With n_workers background
+    threads, each thread streams its own share of the shards through its own
+    buffer, and minibatches are queued ahead of the consumer.
+
+    Parameters
+    ----------
+    path:           string
+                    Directory holding the trajectory shard files.
+
+    batch_size:     integer, default 256
+                    Number of records per minibatch.
+
+    shuffle_buffer: integer, default 65536
+                    Number of records held in each shuffle buffer.
+
+    augment:        bool, default True
+                    If true, each board (and its move) is transformed by a
+                    random one of the 8 board symmetries.
+
+    exponents:      bool, default False
+                    If true, boards are yielded as tile exponents; otherwise
+                    as tile values (0 for empty cells), the inputs expected by
+                    NeuralNetworkRepresentation.
+
+    n_workers:      integer, default 0
+                    Number of background threads preparing minibatches (none
+                    if 0).
+
+    prefetch:       integer, default 8
+                    Number of minibatches queued ahead by background threads.
+
+    seed:           integer, default 1234
+                    Seed for shuffling and augmentation.
+    """
+    def __init__(self,
+                 path,
+                 batch_size=256,
+                 shuffle_buffer=65536,
+                 augment=True,
+                 exponents=False,
+                 n_workers=0,
+                 prefetch=8,
+                 seed=1234):
+        self.path = path
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.augment = augment
+        self.exponents = exponents
+        self.n_workers = n_workers
+        self.prefetch = prefetch
+        self.seed = seed
+
+        self.reader = TrajectoryReader(path)
+        self._epoch = 0
+
+    def _chunks(self, shards):
+        """
+        Read the usable records of some shards, a chunk at a time.
+
+        Parameters
+        ----------
+        shards:     list
+                    Indices of the shards to read, in order.
+
+        Returns
+        -------
+        chunks:     generator of tuples
+                    Packed boards, moves and returns of each chunk.
+        """
+        for i in shards:
+            records = self.reader.shard(i)
+            if len(records) == 0:
+                continue
+
+            returns = shard_returns(records)
+
+            for start in range(0, len(records), self.reader.chunk_size):
+                stop = start + self.reader.chunk_size
+                chunk = np.array(records[start:stop])
+                keep = chunk['move'] != NO_MOVE
+
+                yield (
+                    chunk['board'][keep],
+                    chunk['move'][keep].astype(np.int64),
+                    returns[start:stop][keep].astype(np.float32)
+                )
+
+    def _make_batch(self, boards, moves, returns, rng):
+        """
+        Unpack, and optionally augment, a minibatch.
+
+        Parameters
+        ----------
+        boards:     NumPy array (B,) of uint64
+                    Packed boards.
+
+        moves:      NumPy array (B,)
+                    Index of each move in envs.engine.MOVES.
+
+        returns:    NumPy array (B,)
+                    Score gained from each move to the end of its game.
+
+        rng:        NumPy Generator object
+                    Random number generator choosing the symmetries.
+
+        Returns
+        -------
+        batch:      tuple of NumPy arrays
+                    Boards (B, 16), moves (B,) and returns (B,).
+        """
+        boards = unpack_boards(boards)
+
+        if self.augment:
+            symmetries = rng.integers(N_SYMMETRIES, size=len(boards))
+            boards = transform_boards(boards, symmetries)
+            moves = MOVE_PERMUTATIONS[symmetries, moves]
+
+        if not self.exponents:
+            boards = np.where(boards > 0, np.exp2(boards), 0).astype(
+                np.float32
+            )
+
+        return boards, moves, returns
+
+    def _batches(self, shards, rng):
+        """
+        Stream shuffled minibatches from some shards.
+
+        Parameters
+        ----------
+        shards:     list
+                    Indices of the shards to read, in order.
+
+        rng:        NumPy Generator object
+                    Random number generator for shuffling and augmentation.
+
+        Returns
+        -------
+        batches:    generator of tuples
+                    Boards, moves and returns of each minibatch.
+        """
+        size = self.shuffle_buffer
+        buffer = (
+            np.zeros(size, dtype=np.uint64),
+            np.zeros(size, dtype=np.int64),
+            np.zeros(size, dtype=np.float32)
+        )
+        n_buffered = 0
+
+        # records read but not yet buffered
+        pending = (
+            np.zeros(0, dtype=np.uint64),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.float32)
+        )
+
+        for chunk in self._chunks(shards):
+            pending = tuple(
+                np.concatenate(pair) for pair in zip(pending, chunk)
+            )
+            start = 0
+
+            # fill the buffer
+            n = min(size - n_buffered, len(pending[0]))
+            for buf, new in zip(buffer, pending):
+                buf[n_buffered:n_buffered + n] = new[:n]
+            n_buffered += n
+            start += n
+
+            # emit random records, replacing them with incoming ones
+            while (n_buffered == size and
+                   len(pending[0]) - start >= self.batch_size):
+                slots = rng.choice(size, size=self.batch_size, replace=False)
+                batch = tuple(buf[slots] for buf in buffer)
+
+                for buf, new in zip(buffer, pending):
+                    buf[slots] = new[start:start + self.batch_size]
+                start += self.batch_size
+
+                yield self._make_batch(*batch, rng)
+
+            pending = tuple(new[start:] for new in pending)
+
+        # drain the buffer and the pending records in random order
+        remaining = tuple(
+            np.concatenate([buf[:n_buffered], new])
+            for buf, new in zip(buffer, pending)
+        )
+        order = rng.permutation(len(remaining[0]))
+        for start in range(0, len(order), self.batch_size):
+            slots = order[start:start + self.batch_size]
+            yield self._make_batch(*(arr[slots] for arr in remaining), rng)
+
+    def _worker(self, shards, rng, batches, stop):
+        """
+        Stream minibatches into a queue. Runs on a background thread.
+
+        Parameters
+        ----------
+        shards:     list
+                    Indices of the shards to read, in order.
+
+        rng:        NumPy Generator object
+                    Random number generator for this thread.
+
+        batches:    Queue object
+                    Queue receiving the minibatches, then None, or the
+                    exception which stopped the thread.
+
+        stop:       Event object
+                    Set when the consumer stops iterating; the thread then
+                    returns without queuing anything more.
+
+        Returns
+        -------
+        None
+        """
+        def put(item):
+            # wait for room in the queue, unless the consumer has gone
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for batch in self._batches(shards, rng):
+                if not put(batch):
+                    return
+        except Exception as error:
+            put(error)
+        else:
+            put(None)
+
+    def __iter__(self):
+        """
+        Stream one epoch of shuffled minibatches.
+
+        Returns
+        -------
+        batches:    generator of tuples
+                    Boards (B, 16), moves (B,) and returns (B,) of each
+                    minibatch; the last minibatches of an epoch may be smaller.
+        """
+        # a different, reproducible shuffle each epoch
+        sequence = np.random.SeedSequence([self.seed, self._epoch])
+        self._epoch += 1
+        rng = np.random.default_rng(sequence)
+
+        shards = rng.permutation(len(self.reader.filenames)).tolist()
+
+        if self.n_workers == 0:
+            yield from self._batches(shards, rng)
+            return
+
+        # each thread streams every n_workers-th shard
+        batches = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        rngs = [np.random.default_rng(s)
+                for s in sequence.spawn(self.n_workers)]
+        threads = [
+            threading.Thread(
+                target=self._worker,
+                args=(shards[w::self.n_workers], rngs[w], batches, stop),
+                daemon=True
+            )
+            for w in range(self.n_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            n_running = len(threads)
+            while n_running > 0:
+                batch = batches.get()
+                if batch is None:
+                    n_running -= 1
+                elif isinstance(batch, Exception):
+                    raise batch
+                else:
+                    yield batch
+        finally:
+            # stop the threads however the iteration ends, including a
+            # break or an error, so they release their shards
+            stop.set()
+            for thread in threads:
+                thread.join()
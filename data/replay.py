@@ -0,0 +1,287 @@
+import numpy as np
+
+from data.trajectory import pack_boards, unpack_boards
+
+
+class SumTree:
+    """
+    Class object for a sum-tree over a fixed number of priorities.
+
+    Notes
+    -----
+    The tree is a flat array: node k has children 2k and 2k + 1, the root is
+    node 1 and the leaves are the last capacity nodes, so every node holds the
+    sum of the leaves below it. Updating a batch of leaves and finding the
+    leaves at a batch of cumulative sums both walk the tree one level at a
+    time for the whole batch, taking O(log n) NumPy operations.
+
+    Parameters
+    ----------
+    capacity:   integer
+                Number of leaves; rounded up to a power of two.
+    """
+    def __init__(self, capacity):
+        self.depth = max(int(np.ceil(np.log2(max(capacity, 1)))), 0)
+        self.capacity = 2 ** self.depth
+        self.tree = np.zeros(2 * self.capacity, dtype=np.float64)
+
+    @property
+    def total(self):
+        """
+        Sum of all priorities.
+        """
+        return self.tree[1]
+
+    def get(self, indices):
+        """
+        Priorities of some leaves.
+
+        Parameters
+        ----------
+        indices:    NumPy array of integers
+                    Leaf indices.
+
+        Returns
+        -------
+        priorities: NumPy array of floats
+                    Priority of each leaf.
+        """
+        return self.tree[self.capacity + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        """
+        Set the priorities of some leaves.
+
+        Parameters
+        ----------
+        indices:    NumPy array of integers
+                    Leaf indices; if repeated, the last priority given wins.
+
+        priorities: NumPy array of floats
+                    New priority of each leaf.
+
+        Returns
+        -------
+        None
+        """
+        nodes = self.capacity + np.asarray(indices, dtype=np.int64)
+        self.tree[nodes] = priorities
+
+        # recompute the sums above the changed leaves, level by level
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """
+        Leaves at some cumulative sums of the priorities.
+
+        Parameters
+        ----------
+        values:     NumPy array of floats
+                    Cumulative sums, between 0 and total.
+
+        Returns
+        -------
+        indices:    NumPy array of integers
+                    Index of the leaf whose priority interval holds each
+                    value.
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+
+        for _ in range(self.depth):
+            left = self.tree[2 * nodes]
+            right = values >= left
+            values -= left * right
+            nodes = 2 * nodes + right
+
+        return nodes - self.capacity
+
+
+class PrioritizedReplayBuffer:
+    """
+    Class object for a prioritized experience replay buffer.
+
+    Notes
+    -----
+    Transitions are stored in preallocated arrays used as a ring, the oldest
+    transitions being overwritten once the buffer is full. Boards are packed
+    into 64 bit integers, so a transition costs 22 bytes plus 16 bytes of
+    sum-tree, and tens of millions of transitions fit in a few GB without a
+    Python object per transition.
+
+    Transitions are sampled with probability proportional to their priority,
+    (|TD error| + epsilon) ** alpha, stratified over the total priority, and
+    returned with importance sampling weights correcting for the bias.
+
+    Parameters
+    ----------
+    capacity:   integer, default 1048576
+                Maximum number of transitions held.
+
+    alpha:      float, default 0.6
+                How much priorities skew sampling; 0 samples uniformly.
+
+    beta:       float, default 0.4
+                How much importance sampling weights correct for the skew;
+                1 corrects fully.
+
+    epsilon:    float, default 1e-6
+                Added to each error so no transition has zero priority.
+
+    seed:       integer, default 1234
+                Seed for sampling.
+    """
+    def __init__(self,
+                 capacity=1048576,
+                 alpha=0.6,
+                 beta=0.4,
+                 epsilon=1e-6,
+                 seed=1234):
+        self.capacity = capacity
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.seed = seed
+
+        self.boards = np.zeros(capacity, dtype=np.uint64)
+        self.moves = np.zeros(capacity, dtype=np.uint8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_boards = np.zeros(capacity, dtype=np.uint64)
+        self.dones = np.zeros(capacity, dtype=bool)
+
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.rng = np.random.default_rng(seed)
+
+        # next slot to write and number of slots written
+        self._position = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, boards, moves, rewards, next_boards, dones):
+        """
+        Store a batch of transitions, with the highest priority seen so far.
+
+        Parameters
+        ----------
+        boards:         NumPy array (N, 16)
+                        Tile exponents of each board before the move.
+
+        moves:          NumPy array (N,)
+                        Index in envs.engine.MOVES of each move.
+
+        rewards:        NumPy array (N,)
+                        Reward of each move.
+
+        next_boards:    NumPy array (N, 16)
+                        Tile exponents of each board after the move and the
+                        new tile.
+
+        dones:          NumPy array (N,) of booleans
+                        Whether or not each move ended its game.
+
+        Returns
+        -------
+        indices:        NumPy array (N,)
+                        Slot of each transition.
+        """
+        n = len(moves)
+        if n > self.capacity:
+            raise ValueError(
+                'Cannot add {n} transitions to a buffer of capacity '
+                '{c}.'.format(n=n, c=self.capacity)
+            )
+
+        indices = (self._position + np.arange(n)) % self.capacity
+
+        self.boards[indices] = pack_boards(boards)
+        self.moves[indices] = moves
+        self.rewards[indices] = rewards
+        self.next_boards[indices] = pack_boards(next_boards)
+        self.dones[indices] = dones
+        self.tree.update(indices, np.full(n, self.max_priority))
+
+        self._position = (self._position + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+        return indices
+
+    def sample(self, batch_size):
+        """
+        Sample a batch of transitions by priority.
+
+        Parameters
+        ----------
+        batch_size:     integer
+                        Number of transitions sampled.
+
+        Returns
+        -------
+        indices:        NumPy array (batch_size,)
+                        Slot of each transition, for update_priorities.
+
+        boards:         NumPy array (batch_size, 16)
+                        Tile exponents of each board before the move.
+
+        moves:          NumPy array (batch_size,)
+                        Index in envs.engine.MOVES of each move.
+
+        rewards:        NumPy array (batch_size,)
+                        Reward of each move.
+
+        next_boards:    NumPy array (batch_size, 16)
+                        Tile exponents of each board after the move.
+
+        dones:          NumPy array (batch_size,) of booleans
+                        Whether or not each move ended its game.
+
+        weights:        NumPy array (batch_size,)
+                        Importance sampling weight of each transition,
+                        scaled so the largest in the batch is 1.
+        """
+        if self._size == 0:
+            raise ValueError('Cannot sample from an empty buffer.')
+
+        # one value in each of batch_size equal slices of the total
+        total = self.tree.total
+        values = (np.arange(batch_size) + self.rng.random(batch_size))
+        values *= total / batch_size
+        indices = np.minimum(self.tree.find(values), self._size - 1)
+
+        probabilities = self.tree.get(indices) / total
+        weights = (self._size * probabilities) ** -self.beta
+        weights /= weights.max()
+
+        return (
+            indices,
+            unpack_boards(self.boards[indices]),
+            self.moves[indices].astype(np.int64),
+            self.rewards[indices],
+            unpack_boards(self.next_boards[indices]),
+            self.dones[indices],
+            weights.astype(np.float32)
+        )
+
+    def update_priorities(self, indices, errors):
+        """
+        Set the priorities of sampled transitions from their TD errors.
+
+        Parameters
+        ----------
+        indices:    NumPy array
+                    Slots returned by sample.
+
+        errors:     NumPy array
+                    TD error of each transition.
+
+        Returns
+        -------
+        None
+        """
+        priorities = (np.abs(errors) + self.epsilon) ** self.alpha
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
@@ -0,0 +1,370 @@
+import os
+import glob
+
+import numpy as np
+
+from envs.bitboard import to_board
+from envs.engine import MOVES
+
+
+# Trajectories are stored in shard files of fixed-width binary records, one
+# record per move. Each shard starts with a 16 byte header: the magic bytes
+# below, the format version and the record size (both little-endian uint32).
+
+MAGIC = b'A2048TRJ'
+VERSION = 1
+
+STEP_DTYPE = np.dtype([
+    ('board', '<u8'),       # board before the move, as a 64-bit bitboard
+    ('game', '<u4'),        # game number within the trajectory directory
+    ('score_add', '<u4'),   # score gained by the move
+    ('move', 'u1'),         # index of the move in envs.engine.MOVES
+    ('condition', 'u1')     # game condition after the move
+])
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('record_size', '<u4')
+])
+
+# move value recorded when no move is given
+NO_MOVE = 255
+
+_SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+
+
+def pack_boards(boards):
+    """
+    Pack boards of tile exponents into bitboards.
+
+    Parameters
+    ----------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each board.
+
+    Returns
+    -------
+    packed:     NumPy array (N,) of uint64
+                64-bit board of each board.
+    """
+    boards = np.asarray(boards, dtype=np.uint64)
+
+    return np.bitwise_or.reduce(boards << _SHIFTS, axis=-1)
+
+
+def unpack_boards(packed):
+    """
+    Unpack bitboards into boards of tile exponents.
+
+    Parameters
+    ----------
+    packed:     NumPy array (N,) of uint64
+                64-bit board of each board.
+
+    Returns
+    -------
+    boards:     NumPy array (N, 16) of uint8
+                Tile exponents of each board.
+    """
+    packed = np.asarray(packed, dtype=np.uint64)
+
+    return ((packed[..., np.newaxis] >> _SHIFTS) & np.uint64(0xF)).astype(
+        np.uint8
+    )
+
+
+def _to_bitboard(state):
+    """
+    Convert a board in any of the supported layouts to a bitboard.
+
+    Parameters
+    ----------
+    state:      list, integer or NumPy array (16,)
+                Tiles in the GameEnv.get_tiles layout, a 64-bit board, or
+                tile exponents.
+
+    Returns
+    -------
+    board:      integer
+                64-bit board.
+    """
+    if isinstance(state, (int, np.integer)):
+        return int(state)
+    if isinstance(state, np.ndarray):
+        return int(pack_boards(state))
+
+    return to_board(state)
+
+
+class TrajectoryRecorder:
+    """
+    Class object recording game trajectories to compact binary files.
+
+    Notes
+    -----
+    Records are buffered in a preallocated NumPy array and appended to the
+    current shard one chunk at a time. Files are only ever appended to: a
+    recorder opening a directory which already holds shards continues in a
+    new shard, numbering its games after the recorded ones. A shard is closed
+    once it holds shard_size records, but only between games, so no game spans
+    two shards.
+
+    Parameters
+    ----------
+    path:           string
+                    Directory holding the shard files; created if missing.
+
+    chunk_size:     integer, default 4096
+                    Number of records buffered before writing.
+
+    shard_size:     integer, default 1048576
+                    Number of records after which a new shard is started.
+
+    Attributes
+    ----------
+    game:           integer
+                    Number of the game being recorded.
+    """
+    def __init__(self, path, chunk_size=4096, shard_size=1048576):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.shard_size = shard_size
+
+        os.makedirs(path, exist_ok=True)
+
+        self._buffer = np.zeros(chunk_size, dtype=STEP_DTYPE)
+        self._n_buffered = 0
+        self._file = None
+        self._n_shard = 0
+
+        # continue numbering games and shards after any recorded ones
+        reader = TrajectoryReader(path)
+        self._next_shard = len(reader.filenames)
+        self.game = 0
+        if len(reader.filenames) > 0:
+            last = reader.shard(len(reader.filenames) - 1)
+            if len(last) > 0:
+                self.game = int(last['game'][-1]) + 1
+
+    def _open_shard(self):
+        """
+        Start a new shard file and write its header.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        filename = os.path.join(
+            self.path,
+            'trajectory-{:05d}.bin'.format(self._next_shard)
+        )
+        self._next_shard += 1
+
+        self._file = open(filename, 'xb')
+        header = np.array(
+            [(MAGIC, VERSION, STEP_DTYPE.itemsize)],
+            dtype=HEADER_DTYPE
+        )
+        header.tofile(self._file)
+        self._n_shard = 0
+
+    def record(self, state, move, score_add, condition):
+        """
+        Record one move.
+
+        Parameters
+        ----------
+        state:      list, integer or NumPy array (16,)
+                    Board before the move: tiles in the GameEnv.get_tiles
+                    layout, a 64-bit board, or tile exponents.
+
+        move:       unicode literal, integer or None
+                    Move made: a Selenium webdriver arrow key or an index in
+                    envs.engine.MOVES.
+
+        score_add:  integer
+                    Score gained by the move.
+
+        condition:  integer
+                    Game condition after the move.
+
+        Returns
+        -------
+        None
+        """
+        if move is None:
+            move = NO_MOVE
+        elif not isinstance(move, (int, np.integer)):
+            move = MOVES.index(move)
+
+        self._buffer[self._n_buffered] = (
+            _to_bitboard(state),
+            self.game,
+            score_add,
+            move,
+            condition
+        )
+        self._n_buffered += 1
+
+        if self._n_buffered == self.chunk_size:
+            self.flush()
+
+    def end_game(self):
+        """
+        Mark the end of the game being recorded; following records belong to
+        the next game.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.game += 1
+
+        # start a new shard between games once the current one is full
+        if self._file is not None and (
+                self._n_shard + self._n_buffered >= self.shard_size):
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def flush(self):
+        """
+        Write the buffered records.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        if self._n_buffered == 0:
+            return
+
+        if self._file is None:
+            self._open_shard()
+
+        self._buffer[:self._n_buffered].tofile(self._file)
+        self._file.flush()
+        self._n_shard += self._n_buffered
+        self._n_buffered = 0
+
+    def close(self):
+        """
+        Write the buffered records and close the current shard.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.flush()
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """
+    Class object streaming game trajectories written by a TrajectoryRecorder.
+
+    Notes
+    -----
+    Shards are memory-mapped, so records are read from disk only as they are
+    used, and iterating over the reader yields chunks of records as NumPy
+    structured arrays (fields board, game, score_add, move and condition).
+
+    Parameters
+    ----------
+    path:       string
+                Directory holding the shard files.
+
+    chunk_size: integer, default 65536
+                Number of records per chunk yielded when iterating.
+    """
+    def __init__(self, path, chunk_size=65536):
+        self.path = path
+        self.chunk_size = chunk_size
+
+        self.filenames = sorted(
+            glob.glob(os.path.join(path, 'trajectory-*.bin'))
+        )
+
+    def shard(self, i):
+        """
+        Memory-map one shard.
+
+        Parameters
+        ----------
+        i:          integer
+                    Index of the shard.
+
+        Returns
+        -------
+        records:    NumPy memmap (n_records,) of STEP_DTYPE
+                    Read-only records of the shard.
+        """
+        filename = self.filenames[i]
+
+        header = np.fromfile(filename, dtype=HEADER_DTYPE, count=1)
+        if (len(header) == 0 or header['magic'][0] != MAGIC or
+                header['record_size'][0] != STEP_DTYPE.itemsize):
+            raise ValueError('{} is not a trajectory file'.format(filename))
+
+        # ignore any partially written record at the end
+        size = os.path.getsize(filename) - HEADER_DTYPE.itemsize
+        n_records = size // STEP_DTYPE.itemsize
+        if n_records == 0:
+            return np.zeros(0, dtype=STEP_DTYPE)
+
+        return np.memmap(
+            filename,
+            dtype=STEP_DTYPE,
+            mode='r',
+            offset=HEADER_DTYPE.itemsize,
+            shape=(n_records,)
+        )
+
+    def shards(self):
+        """
+        Memory-map each shard in turn.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        records:    generator of NumPy memmaps
+                    Records of each shard.
+        """
+        for i in range(len(self.filenames)):
+            yield self.shard(i)
+
+    def __iter__(self):
+        for records in self.shards():
+            for start in range(0, len(records), self.chunk_size):
+                yield records[start:start + self.chunk_size]
+
+    def __len__(self):
+        return sum(len(records) for records in self.shards())
@@ -0,0 +1,435 @@
+import numpy as np
+
+from envs.bitboard import _build_tables
+from envs.engine import MOVES
+
+
+# Boards are held as NumPy arrays of 16 tile exponents (0 for an empty cell,
+# 1 for a 2, 2 for a 4, ...), with the cell in row r (top to bottom) and
+# column c (left to right) at index 4 * r + c. Moves are indexed in the order
+# of envs.engine.MOVES: 0 up, 1 right, 2 down, 3 left.
+
+# for each move, the cells of the board ordered so that every group of four
+# is a line of the board running in the direction of the move
+LINES = np.array([
+    [4 * j + c for c in range(4) for j in range(4)],            # up
+    [4 * r + 3 - j for r in range(4) for j in range(4)],        # right
+    [4 * (3 - j) + c for c in range(4) for j in range(4)],      # down
+    [4 * r + j for r in range(4) for j in range(4)]             # left
+])
+
+# weights packing four exponents into a 16-bit row index
+_ROW_WEIGHTS = np.array([1, 16, 256, 4096], dtype=np.int64)
+
+# NumPy lookup tables, populated by _build_np_tables()
+_np_tables = {}
+
+
+def _build_np_tables():
+    """
+    Build the NumPy row lookup tables from the bitboard tables.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    tables:     dictionary
+                Lookup tables indexed by a 16-bit row:
+                    cells:      (65536, 4) exponents after moving left
+                    score:      score gained moving left
+                    changed:    whether or not moving left changes the row
+    """
+    if len(_np_tables) > 0:
+        return _np_tables
+
+    tables = _build_tables()
+    left = np.array(tables['left'], dtype=np.int64)
+
+    _np_tables.update(
+        cells=tables['left_cells'],
+        score=np.array(tables['score'], dtype=np.int64),
+        changed=left != np.arange(left.size)
+    )
+
+    return _np_tables
+
+
+def move_indices(moves):
+    """
+    Convert Selenium webdriver arrow keys to move indices.
+
+    Parameters
+    ----------
+    moves:      iterable
+                Maneuvers encoded as Selenium webdriver arrow keys.
+
+    Returns
+    -------
+    indices:    NumPy array of integers
+                Index of each maneuver in envs.engine.MOVES.
+    """
+    return np.array([MOVES.index(move) for move in moves], dtype=np.int64)
+
+
+def row_indices(boards, move):
+    """
+    Pack the lines of boards running in the direction of a move into 16-bit
+    row table indices.
+
+    Parameters
+    ----------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each board.
+
+    move:       integer
+                Index of the move in envs.engine.MOVES.
+
+    Returns
+    -------
+    rows:       NumPy array (N, 4)
+                Row table index of each line.
+    """
+    lines = boards[:, LINES[move]].reshape(-1, 4, 4).astype(np.int64)
+
+    return lines @ _ROW_WEIGHTS
+
+
+def move_boards(boards, moves):
+    """
+    Apply one move to each of a set of boards, without placing new tiles.
+
+    Parameters
+    ----------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each board.
+
+    moves:      NumPy array (N,)
+                Index in envs.engine.MOVES of the move made on each board.
+
+    Returns
+    -------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each board after its move.
+
+    score_add:  NumPy array (N,)
+                Score gained by each move.
+
+    moved:      NumPy array (N,) of booleans
+                Whether or not each move changed its board.
+    """
+    tables = _np_tables or _build_np_tables()
+    moves = np.asarray(moves)
+
+    new_boards = boards.copy()
+    score_add = np.zeros(len(boards), dtype=np.int64)
+    moved = np.zeros(len(boards), dtype=bool)
+
+    # process the boards making the same move together
+    for move in range(4):
+        games = np.flatnonzero(moves == move)
+        if games.size == 0:
+            continue
+
+        rows = row_indices(boards[games], move)
+        lines = tables['cells'][rows].reshape(-1, 16)
+
+        new_boards[games[:, None], LINES[move]] = lines
+        score_add[games] = tables['score'][rows].sum(axis=1)
+        moved[games] = tables['changed'][rows].any(axis=1)
+
+    return new_boards, score_add, moved
+
+
+def legal_moves(boards):
+    """
+    Determine which moves change each of a set of boards.
+
+    Parameters
+    ----------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each board.
+
+    Returns
+    -------
+    legal:      NumPy array (N, 4) of booleans
+                Whether or not each move in envs.engine.MOVES changes each
+                board.
+    """
+    tables = _np_tables or _build_np_tables()
+
+    legal = np.empty((len(boards), 4), dtype=bool)
+    for move in range(4):
+        rows = row_indices(boards, move)
+        legal[:, move] = tables['changed'][rows].any(axis=1)
+
+    return legal
+
+
+def board_to_tiles(board):
+    """
+    Convert a board of tile exponents to the GameEnv.get_tiles layout.
+
+    Parameters
+    ----------
+    board:      NumPy array (16,)
+                Tile exponents, row by row (0 for empty cells).
+
+    Returns
+    -------
+    tiles:      list
+                Each sublist represents a row starting from top to bottom.
+                Each element represents a tile (None when empty), starting
+                from left to right.
+    """
+    return [[1 << int(e) if e else None for e in row]
+            for row in np.reshape(board, (4, 4))]
+
+
+def spawn_tiles(boards, games, streams):
+    """
+    Place a new tile (2 with probability 0.9, otherwise 4) on a randomly
+    chosen empty cell of some of a set of boards, in place.
+
+    Parameters
+    ----------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each board.
+
+    games:      NumPy array of integers
+                Indices of the boards receiving a new tile. Each must have at
+                least one empty cell.
+
+    streams:    RandomStreams object
+                Random number streams, one per board.
+
+    Returns
+    -------
+    None
+    """
+    if len(games) == 0:
+        return
+
+    # choose the k-th empty cell of each board
+    empty = boards[games] == 0
+    n_empty = empty.sum(axis=1)
+    k = (streams.random(games) * n_empty).astype(np.int64)
+    cells = np.argmax(np.cumsum(empty, axis=1) > k[:, None], axis=1)
+
+    # choose the tile value
+    values = np.where(streams.random(games) < 0.9, 1, 2)
+
+    boards[games, cells] = values
+
+
+class RandomStreams:
+    """
+    Independent, vectorized random number streams.
+
+    Notes
+    -----
+    Each stream is a SplitMix64 generator, so drawing from any subset of the
+    streams is a handful of NumPy operations regardless of how many streams
+    there are. The initial stream states are drawn from a NumPy SeedSequence,
+    so the streams are reproducible given the seed and number of streams.
+
+    Parameters
+    ----------
+    n_streams:  integer
+                Number of streams.
+
+    seed:       integer, default 1234
+                Seed for the random number streams.
+    """
+    _gamma = np.uint64(0x9E3779B97F4A7C15)
+    _mix_1 = np.uint64(0xBF58476D1CE4E5B9)
+    _mix_2 = np.uint64(0x94D049BB133111EB)
+
+    def __init__(self, n_streams, seed=1234):
+        self.n_streams = n_streams
+        self.seed = seed
+
+        sequence = np.random.SeedSequence(seed)
+        self.state = sequence.generate_state(n_streams, dtype=np.uint64)
+
+    def random(self, streams=None):
+        """
+        Draw a uniform random number in [0, 1) from each of a set of streams.
+
+        Parameters
+        ----------
+        streams:    NumPy array of integers or None, default None
+                    Indices of the streams to draw from (all if None).
+
+        Returns
+        -------
+        u:          NumPy array of floats
+                    One random number per selected stream.
+        """
+        if streams is None:
+            streams = slice(None)
+
+        # advance the selected streams
+        z = self.state[streams] + self._gamma
+        self.state[streams] = z
+
+        # mix the state into the output
+        z = (z ^ (z >> np.uint64(30))) * self._mix_1
+        z = (z ^ (z >> np.uint64(27))) * self._mix_2
+        z = z ^ (z >> np.uint64(31))
+
+        # keep the top 53 bits as the mantissa of a double
+        return (z >> np.uint64(11)) * (1.0 / (1 << 53))
+
+
+class BatchGameEnv:
+    """
+    A vectorized, in-process 2048 environment stepping many games at once.
+
+    Notes
+    -----
+    All boards are held in a single NumPy array and every step moves all of
+    them with a handful of table lookups, so the cost per game is a small
+    fraction of stepping GameEngine objects one by one. Moves that do not
+    change a board are ignored, as in the browser. Finished games are reset
+    automatically; their final scores and boards are kept in the final_scores
+    and final_boards attributes until they finish again.
+
+    Parameters
+    ----------
+    n_games:    integer, default 4096
+                Number of games played at once.
+
+    seed:       integer, default 1234
+                Seed for the random number streams placing new tiles; each
+                game draws from its own stream.
+
+    Attributes
+    ----------
+    max_iter:       integer, 10000
+                    Maximum number of game moves before a game is stopped.
+
+    boards:         NumPy array (n_games, 16)
+                    Tile exponents of each board.
+
+    scores:         NumPy array (n_games,)
+                    Current score of each game.
+
+    n_moves:        NumPy array (n_games,)
+                    Number of moves made in each game.
+
+    final_scores:   NumPy array (n_games,)
+                    Score of the last finished game in each slot.
+
+    final_boards:   NumPy array (n_games, 16)
+                    Board of the last finished game in each slot.
+    """
+
+    max_iter = 10000
+
+    def __init__(self, n_games=4096, seed=1234):
+        self.n_games = n_games
+        self.seed = seed
+
+        self.streams = RandomStreams(n_games, seed=seed)
+
+        self.boards = np.zeros((n_games, 16), dtype=np.uint8)
+        self.scores = np.zeros(n_games, dtype=np.int64)
+        self.n_moves = np.zeros(n_games, dtype=np.int64)
+        self.final_scores = np.zeros(n_games, dtype=np.int64)
+        self.final_boards = np.zeros((n_games, 16), dtype=np.uint8)
+
+        self.reset()
+
+    def reset(self, games=None):
+        """
+        Start new games.
+
+        Parameters
+        ----------
+        games:      NumPy array of integers or None, default None
+                    Indices of the games to reset (all if None).
+
+        Returns
+        -------
+        boards:     NumPy array (n_games, 16)
+                    Tile exponents of each board.
+
+        legal:      NumPy array (n_games, 4) of booleans
+                    Whether or not each move in envs.engine.MOVES changes each
+                    board.
+        """
+        if games is None:
+            games = np.arange(self.n_games)
+
+        self._reset(games)
+
+        return self.boards.copy(), legal_moves(self.boards)
+
+    def _reset(self, games):
+        """
+        Clear the boards of some games and place their two starting tiles.
+
+        Parameters
+        ----------
+        games:      NumPy array of integers
+                    Indices of the games to reset.
+
+        Returns
+        -------
+        None
+        """
+        self.boards[games] = 0
+        self.scores[games] = 0
+        self.n_moves[games] = 0
+        spawn_tiles(self.boards, games, self.streams)
+        spawn_tiles(self.boards, games, self.streams)
+
+    def step(self, moves):
+        """
+        Make one move in every game.
+
+        Parameters
+        ----------
+        moves:      NumPy array (n_games,)
+                    Index in envs.engine.MOVES of the move made in each game.
+
+        Returns
+        -------
+        boards:     NumPy array (n_games, 16)
+                    Tile exponents of each board after the move; finished
+                    games have already been reset.
+
+        score_add:  NumPy array (n_games,)
+                    Score gained by each move.
+
+        done:       NumPy array (n_games,) of booleans
+                    Whether or not each game finished with this move.
+
+        legal:      NumPy array (n_games, 4) of booleans
+                    Whether or not each move in envs.engine.MOVES changes each
+                    returned board.
+        """
+        boards, score_add, moved = move_boards(self.boards, moves)
+
+        # place a new tile on the boards which changed
+        spawn_tiles(boards, np.flatnonzero(moved), self.streams)
+
+        self.boards = boards
+        self.scores += score_add
+        self.n_moves += 1
+
+        # a game is over when no move changes its board
+        legal = legal_moves(boards)
+        done = ~legal.any(axis=1) | (self.n_moves >= self.max_iter)
+
+        # record and restart the finished games
+        finished = np.flatnonzero(done)
+        if finished.size > 0:
+            self.final_scores[finished] = self.scores[finished]
+            self.final_boards[finished] = self.boards[finished]
+            self._reset(finished)
+            legal[finished] = legal_moves(self.boards[finished])
+
+        return self.boards.copy(), score_add, done, legal
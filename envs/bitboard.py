@@ -0,0 +1,631 @@
+import random
+
+import numpy as np
+
+from envs.engine import GameEngine, MOVES
+
+
+# Bitboard representation of the 2048 board.
+#
+# Notes
+# -----
+# The board is stored as a single 64-bit integer of 4-bit tile exponents (0 for
+# an empty cell, 1 for a 2, 2 for a 4, ..., 15 for a 32768). The cell in row r
+# (top to bottom) and column c (left to right) occupies bits 4 * (4 * r + c)
+# through 4 * (4 * r + c) + 3, so each row is a 16-bit integer with its leftmost
+# cell in the lowest nibble.
+#
+# Moves are made with 65536-entry lookup tables, indexed by a 16-bit row, which
+# are built once on first use. Up and down moves transpose the board and look
+# up the columns in tables which scatter the result straight back into column
+# positions. Two 32768 tiles are not merged, as the exponent would overflow its
+# nibble.
+
+ROW_MASK = 0xFFFF
+
+# lookup tables, populated by _build_tables()
+_tables = {}
+
+
+def _merge_row(cells):
+    """
+    Slide and merge a row of tile exponents towards its first element.
+
+    Parameters
+    ----------
+    cells:      list
+                Four tile exponents, ordered in the direction of the move.
+
+    Returns
+    -------
+    merged:     list
+                Four tile exponents after the move.
+
+    score_add:  integer
+                Score gained by the merges in this row.
+    """
+    # drop the empty cells
+    values = [val for val in cells if val != 0]
+
+    # merge each pair of equal neighbours at most once
+    merged = []
+    score_add = 0
+    i = 0
+    while i < len(values):
+        if (i + 1 < len(values) and values[i] == values[i + 1] and
+                values[i] < 15):
+            merged.append(values[i] + 1)
+            score_add += 2 ** (values[i] + 1)
+            i += 2
+        else:
+            merged.append(values[i])
+            i += 1
+
+    # pad back out to the full row length
+    merged += [0] * (4 - len(merged))
+
+    return merged, score_add
+
+
+def _build_tables():
+    """
+    Build the row lookup tables.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    tables:     dictionary
+                Lookup tables indexed by a 16-bit row:
+                    left:       row after moving left
+                    right:      row after moving right
+                    up:         row after moving left, scattered into a column
+                    down:       row after moving right, scattered into a column
+                    score:      score gained moving left
+                    score_rev:  score gained moving right
+                    reverse:    row with its cells in reverse order
+                    cells:      NumPy array (65536, 4) of the row's exponents
+                    left_cells: NumPy array (65536, 4) of the row's exponents
+                                after moving left
+    """
+    if len(_tables) > 0:
+        return _tables
+
+    n = 1 << 16
+    left = [0] * n
+    score = [0] * n
+    reverse = [0] * n
+    cells = np.empty((n, 4), dtype=np.uint8)
+    left_cells = np.empty((n, 4), dtype=np.uint8)
+
+    for row in range(n):
+        line = [(row >> (4 * i)) & 0xF for i in range(4)]
+        merged, score_add = _merge_row(line)
+
+        cells[row] = line
+        left_cells[row] = merged
+        left[row] = (merged[0] | (merged[1] << 4) | (merged[2] << 8) |
+                     (merged[3] << 12))
+        score[row] = score_add
+        reverse[row] = (line[3] | (line[2] << 4) | (line[1] << 8) |
+                        (line[0] << 12))
+
+    # right moves are left moves of the reversed row
+    right = [reverse[left[reverse[row]]] for row in range(n)]
+    score_rev = [score[reverse[row]] for row in range(n)]
+
+    # column tables scatter the row's nibbles into a column of the board
+    up = [_unpack_col(left[row]) for row in range(n)]
+    down = [_unpack_col(right[row]) for row in range(n)]
+
+    _tables.update(
+        left=left,
+        right=right,
+        up=up,
+        down=down,
+        score=score,
+        score_rev=score_rev,
+        reverse=reverse,
+        cells=cells,
+        left_cells=left_cells
+    )
+
+    return _tables
+
+
+def _unpack_col(row):
+    """
+    Scatter the four nibbles of a 16-bit row into the first column of a board.
+
+    Parameters
+    ----------
+    row:        integer
+                16-bit row.
+
+    Returns
+    -------
+    col:        integer
+                64-bit board with the row's nibbles in column 0.
+    """
+    return ((row & 0xF) | ((row & 0xF0) << 12) | ((row & 0xF00) << 24) |
+            ((row & 0xF000) << 36))
+
+
+def transpose(board):
+    """
+    Transpose a board, swapping rows and columns.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    board:      integer
+                Transposed 64-bit board.
+    """
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def to_board(tiles):
+    """
+    Convert tiles in the GameEnv.get_tiles layout to a bitboard.
+
+    Parameters
+    ----------
+    tiles:      list
+                Each sublist represents a row starting from top to bottom.
+                Each element represents a tile (None when empty), starting
+                from left to right.
+
+    Returns
+    -------
+    board:      integer
+                64-bit board.
+    """
+    board = 0
+    for r, row in enumerate(tiles):
+        for c, val in enumerate(row):
+            if val:
+                board |= (int(val).bit_length() - 1) << (4 * (4 * r + c))
+
+    return board
+
+
+def to_tiles(board):
+    """
+    Convert a bitboard to tiles in the GameEnv.get_tiles layout.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    tiles:      list
+                Each sublist represents a row starting from top to bottom.
+                Each element represents a tile (None when empty), starting
+                from left to right.
+    """
+    tiles = []
+    for r in range(4):
+        row = []
+        for c in range(4):
+            exp = (board >> (4 * (4 * r + c))) & 0xF
+            row.append(1 << exp if exp > 0 else None)
+        tiles.append(row)
+
+    return tiles
+
+
+def move_left(board):
+    """
+    Move a board left.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    board:      integer
+                64-bit board after the move.
+
+    score_add:  integer
+                Score gained by the move.
+    """
+    tables = _tables or _build_tables()
+    left = tables['left']
+    score = tables['score']
+
+    r0 = board & ROW_MASK
+    r1 = (board >> 16) & ROW_MASK
+    r2 = (board >> 32) & ROW_MASK
+    r3 = (board >> 48) & ROW_MASK
+
+    new_board = (left[r0] | (left[r1] << 16) | (left[r2] << 32) |
+                 (left[r3] << 48))
+
+    return new_board, score[r0] + score[r1] + score[r2] + score[r3]
+
+
+def move_right(board):
+    """
+    Move a board right.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    board:      integer
+                64-bit board after the move.
+
+    score_add:  integer
+                Score gained by the move.
+    """
+    tables = _tables or _build_tables()
+    right = tables['right']
+    score = tables['score_rev']
+
+    r0 = board & ROW_MASK
+    r1 = (board >> 16) & ROW_MASK
+    r2 = (board >> 32) & ROW_MASK
+    r3 = (board >> 48) & ROW_MASK
+
+    new_board = (right[r0] | (right[r1] << 16) | (right[r2] << 32) |
+                 (right[r3] << 48))
+
+    return new_board, score[r0] + score[r1] + score[r2] + score[r3]
+
+
+def move_up(board):
+    """
+    Move a board up.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    board:      integer
+                64-bit board after the move.
+
+    score_add:  integer
+                Score gained by the move.
+    """
+    tables = _tables or _build_tables()
+    up = tables['up']
+    score = tables['score']
+
+    # the rows of the transposed board are the columns of the board
+    t = transpose(board)
+    c0 = t & ROW_MASK
+    c1 = (t >> 16) & ROW_MASK
+    c2 = (t >> 32) & ROW_MASK
+    c3 = (t >> 48) & ROW_MASK
+
+    new_board = up[c0] | (up[c1] << 4) | (up[c2] << 8) | (up[c3] << 12)
+
+    return new_board, score[c0] + score[c1] + score[c2] + score[c3]
+
+
+def move_down(board):
+    """
+    Move a board down.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    board:      integer
+                64-bit board after the move.
+
+    score_add:  integer
+                Score gained by the move.
+    """
+    tables = _tables or _build_tables()
+    down = tables['down']
+    score = tables['score_rev']
+
+    # the rows of the transposed board are the columns of the board
+    t = transpose(board)
+    c0 = t & ROW_MASK
+    c1 = (t >> 16) & ROW_MASK
+    c2 = (t >> 32) & ROW_MASK
+    c3 = (t >> 48) & ROW_MASK
+
+    new_board = down[c0] | (down[c1] << 4) | (down[c2] << 8) | (down[c3] << 12)
+
+    return new_board, score[c0] + score[c1] + score[c2] + score[c3]
+
+
+# move functions in the order of MOVES
+MOVE_FUNCTIONS = [move_up, move_right, move_down, move_left]
+
+_move_functions = dict(zip(MOVES, MOVE_FUNCTIONS))
+
+
+def make_move(board, key):
+    """
+    Move a board in the direction of a Selenium webdriver arrow key.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    key:        unicode literal
+                Maneuver encoded as one of the Selenium webdriver arrow keys.
+
+    Returns
+    -------
+    board:      integer
+                64-bit board after the move.
+
+    score_add:  integer
+                Score gained by the move.
+
+    moved:      bool
+                Whether or not the move changed the board.
+    """
+    try:
+        new_board, score_add = _move_functions[key](board)
+    except KeyError:
+        raise ValueError('Unknown move {}'.format(repr(key)))
+
+    return new_board, score_add, new_board != board
+
+
+def legal_moves(board):
+    """
+    Which moves change a board.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    legal:      list of bools
+                Whether or not each move in envs.engine.MOVES changes the
+                board.
+    """
+    return [move(board)[0] != board for move in MOVE_FUNCTIONS]
+
+
+def count_empty(board):
+    """
+    Count the empty cells of a board.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    n_empty:    integer
+                Number of empty cells.
+    """
+    # fold each nibble to a single bit which is set when the nibble is nonzero
+    board |= board >> 2
+    board |= board >> 1
+    board &= 0x1111111111111111
+
+    return 16 - bin(board).count('1')
+
+
+def max_exponent(board):
+    """
+    Find the exponent of the largest tile on a board.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    exponent:   integer
+                Exponent of the largest tile (0 for an empty board).
+    """
+    exponent = 0
+    while board:
+        exponent = max(exponent, board & 0xF)
+        board >>= 4
+
+    return exponent
+
+
+def spawn_tile(board, rng=random):
+    """
+    Place a new tile (2 with probability 0.9, otherwise 4) on a randomly
+    chosen empty cell.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    rng:        random.Random object, default random module
+                Random number generator choosing the cell and the tile.
+
+    Returns
+    -------
+    board:      integer
+                64-bit board with the new tile (unchanged if it is full).
+    """
+    cells = [i for i in range(16) if (board >> (4 * i)) & 0xF == 0]
+
+    if len(cells) > 0:
+        cell = cells[rng.randrange(len(cells))]
+        board |= (1 if rng.random() < 0.9 else 2) << (4 * cell)
+
+    return board
+
+
+class BitboardEngine(GameEngine):
+    """
+    A headless, in-process implementation of the 2048 game backed by a
+    bitboard. It behaves like GameEngine, including the GameEnv compatible
+    state retrieval methods, but makes moves with precomputed lookup tables.
+
+    Parameters
+    ----------
+    seed:           integer, default 1234
+                    Seed for the random number generator placing new tiles.
+
+    keep_playing:   bool, default False
+                    If true, the game continues after the winning tile has
+                    been reached (as when clicking "Keep going" in the browser).
+
+    Attributes
+    ----------
+    board:      integer
+                Current 64-bit board.
+    """
+
+    def reset(self):
+        """
+        Start a new game: clear the board and place the two starting tiles.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.board = spawn_tile(spawn_tile(0, self._random), self._random)
+        self.score = 0
+        self.score_add = 0
+        self.won = False
+
+    @property
+    def tiles(self):
+        """
+        Current board in the GameEnv.get_tiles layout.
+        """
+        return to_tiles(self.board)
+
+    def send_keys(self, move):
+        """
+        Make a move in the game.
+
+        Parameters
+        ----------
+        move:       unicode literal
+                    Maneuver encoded as one of the Selenium webdriver arrow
+                    keys.
+
+        Returns
+        -------
+        moved:      bool
+                    Whether or not the move changed the board.
+        """
+        # as in the browser, a finished game ignores further moves
+        if self.get_condition() != self.game_on:
+            return False
+
+        board, score_add, moved = make_move(self.board, move)
+
+        # the score addition only changes when the board does
+        if moved:
+            self.score += score_add
+            self.score_add = score_add
+
+            # check whether the winning tile was reached
+            if max_exponent(board) >= self.win_value.bit_length() - 1:
+                self.won = True
+
+            self.board = spawn_tile(board, self._random)
+
+        return moved
+
+    def get_tiles(self, driver=None):
+        """
+        Retrieve the current tiles and their locations.
+
+        Parameters
+        ----------
+        driver:     ignored
+                    Accepted for compatibility with GameEnv.
+
+        Returns
+        -------
+        tiles:      list
+                    Each sublist represents a row starting from top to bottom.
+                    Each element represents a tile, starting from left to right.
+        """
+        return to_tiles(self.board)
+
+    def get_condition(self, driver=None):
+        """
+        Retrieve the current game condition.
+
+        Parameters
+        ----------
+        driver:     ignored
+                    Accepted for compatibility with GameEnv.
+
+        Returns
+        -------
+        condition:  integer
+                    Current condition of the game using the class attributes:
+                        0: game in play
+                        1: game won
+                        2: game over
+                        3: game error
+        """
+        board = self.board
+
+        if self.won and not self.keep_playing:
+            condition = self.game_won
+        elif count_empty(board) > 0:
+            condition = self.game_on
+        elif any(legal_moves(board)):
+            condition = self.game_on
+        else:
+            condition = self.game_over
+
+        return condition
+
+    def get_legal_moves(self, driver=None):
+        """
+        Retrieve which moves change the current board.
+
+        Parameters
+        ----------
+        driver:     ignored
+                    Accepted for compatibility with GameEnv.
+
+        Returns
+        -------
+        legal:      list of bools
+                    Whether or not each move in envs.engine.MOVES changes
+                    the board.
+        """
+        return legal_moves(self.board)
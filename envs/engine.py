@@ -0,0 +1,372 @@
+import random
+
+from selenium.webdriver.common.keys import Keys
+
+
+# moves in the order used throughout Agent-2048 (clockwise, starting with up)
+MOVES = [
+    Keys.ARROW_UP,
+    Keys.ARROW_RIGHT,
+    Keys.ARROW_DOWN,
+    Keys.ARROW_LEFT
+]
+
+
+class GameEngine:
+    """
+    A headless, in-process implementation of the 2048 game. It mirrors the
+    state retrieval interface of GameEnv so game loops written against the
+    browser environment can run without a browser or a server.
+
+    Notes
+    -----
+    The engine also plays the role of the game element: moves are made by
+    calling send_keys with one of the Selenium webdriver arrow keys, exactly
+    like the element returned by find_element_by_class_name("game-container").
+    The driver arguments of the state retrieval methods are accepted, and
+    ignored, for compatibility with GameEnv.
+
+    Parameters
+    ----------
+    seed:           integer, default 1234
+                    Seed for the random number generator placing new tiles.
+
+    keep_playing:   bool, default False
+                    If true, the game continues after the winning tile has
+                    been reached (as when clicking "Keep going" in the browser).
+
+    Attributes
+    ----------
+    game_on:    integer, 0
+                Indicates the game condition is game in play.
+
+    game_won:   integer, 1
+                Indicates the game condition is game won.
+
+    game_over:  integer, 2
+                Indicates the game condition is game over.
+
+    game_error: integer, 3
+                Indicates an error associated with the game condition.
+
+    max_iter:   integer, 10000
+                Maximum number of game moves before timeout.
+
+    win_value:  integer, 2048
+                Tile value which wins the game.
+    """
+
+    game_on = 0
+    game_won = 1
+    game_over = 2
+    game_error = 3
+    max_iter = 10000
+    win_value = 2048
+
+    def __init__(self, seed=1234, keep_playing=False):
+        self.seed = seed
+        self.keep_playing = keep_playing
+
+        # random number generator owned by this game
+        self._random = random.Random(seed)
+
+        # start a new game
+        self.reset()
+
+    def reset(self):
+        """
+        Start a new game: clear the board and place the two starting tiles.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.tiles = [[None] * 4 for _ in range(4)]
+        self.score = 0
+        self.score_add = 0
+        self.won = False
+
+        # the game starts with two random tiles
+        self._add_random_tile()
+        self._add_random_tile()
+
+    def _add_random_tile(self):
+        """
+        Place a new tile (2 with probability 0.9, otherwise 4) on a randomly
+        chosen empty cell.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        # locate the empty cells
+        cells = [(row, col) for row in range(4) for col in range(4)
+                 if self.tiles[row][col] is None]
+
+        if len(cells) > 0:
+            row, col = cells[self._random.randrange(len(cells))]
+            self.tiles[row][col] = 2 if self._random.random() < 0.9 else 4
+
+    @staticmethod
+    def _merge_line(line):
+        """
+        Slide and merge a single line of tiles towards its first element.
+
+        Parameters
+        ----------
+        line:       list
+                    Four tile values (None for empty cells), ordered in the
+                    direction of the move.
+
+        Returns
+        -------
+        merged:     list
+                    Four tile values after the move.
+
+        score_add:  integer
+                    Score gained by the merges in this line.
+        """
+        # drop the empty cells
+        values = [val for val in line if val is not None]
+
+        # merge each pair of equal neighbours at most once
+        merged = []
+        score_add = 0
+        i = 0
+        while i < len(values):
+            if i + 1 < len(values) and values[i] == values[i + 1]:
+                merged.append(values[i] * 2)
+                score_add += values[i] * 2
+                i += 2
+            else:
+                merged.append(values[i])
+                i += 1
+
+        # pad back out to the full line length
+        merged += [None] * (4 - len(merged))
+
+        return merged, score_add
+
+    @classmethod
+    def _move_tiles(cls, tiles, move):
+        """
+        Apply a move to a board without placing a new tile.
+
+        Parameters
+        ----------
+        tiles:      list
+                    Board in the GameEnv.get_tiles layout.
+
+        move:       unicode literal
+                    Maneuver encoded as one of the Selenium webdriver arrow
+                    keys.
+
+        Returns
+        -------
+        tiles:      list
+                    Board after the move.
+
+        score_add:  integer
+                    Score gained by the move.
+
+        moved:      bool
+                    Whether or not the move changed the board.
+        """
+        # gather the lines of the board, ordered in the direction of the move
+        if move == Keys.ARROW_LEFT:
+            lines = [[tiles[r][c] for c in range(4)] for r in range(4)]
+        elif move == Keys.ARROW_RIGHT:
+            lines = [[tiles[r][c] for c in range(3, -1, -1)] for r in range(4)]
+        elif move == Keys.ARROW_UP:
+            lines = [[tiles[r][c] for r in range(4)] for c in range(4)]
+        elif move == Keys.ARROW_DOWN:
+            lines = [[tiles[r][c] for r in range(3, -1, -1)] for c in range(4)]
+        else:
+            raise ValueError('Unknown move {}'.format(repr(move)))
+
+        # slide and merge each line
+        new_tiles = [[None] * 4 for _ in range(4)]
+        score_add = 0
+        for k, line in enumerate(lines):
+            merged, add = cls._merge_line(line)
+            score_add += add
+
+            # scatter the merged line back onto the board
+            for j, val in enumerate(merged):
+                if move == Keys.ARROW_LEFT:
+                    new_tiles[k][j] = val
+                elif move == Keys.ARROW_RIGHT:
+                    new_tiles[k][3 - j] = val
+                elif move == Keys.ARROW_UP:
+                    new_tiles[j][k] = val
+                else:
+                    new_tiles[3 - j][k] = val
+
+        moved = new_tiles != tiles
+
+        return new_tiles, score_add, moved
+
+    def send_keys(self, move):
+        """
+        Make a move in the game.
+
+        Parameters
+        ----------
+        move:       unicode literal
+                    Maneuver encoded as one of the Selenium webdriver arrow
+                    keys.
+
+        Returns
+        -------
+        moved:      bool
+                    Whether or not the move changed the board.
+        """
+        # as in the browser, a finished game ignores further moves
+        if self.get_condition() != self.game_on:
+            return False
+
+        tiles, score_add, moved = self._move_tiles(self.tiles, move)
+
+        # the score addition only changes when the board does
+        if moved:
+            self.tiles = tiles
+            self.score += score_add
+            self.score_add = score_add
+
+            # check whether the winning tile was reached
+            if any(val == self.win_value for row in tiles for val in row):
+                self.won = True
+
+            self._add_random_tile()
+
+        return moved
+
+    def move(self, move):
+        """
+        Make a move and retrieve the resulting game state; see GameEnv.move.
+
+        Parameters
+        ----------
+        move:       unicode literal
+                    Maneuver encoded as one of the Selenium webdriver arrow
+                    keys.
+
+        Returns
+        -------
+        state:      tuple
+                    Tiles, score, score added with this maneuver, condition
+                    of the game and whether or not the move changed the
+                    board.
+        """
+        moved = self.send_keys(move)
+        tiles, score, score_add, condition = self.get_state()
+
+        return tiles, score, score_add if moved else 0, condition, moved
+
+    def get_state(self, driver=None):
+        """
+        Retrieve the full game state; see GameEnv.get_state.
+
+        Parameters
+        ----------
+        driver:     ignored
+                    Accepted for compatibility with GameEnv.
+
+        Returns
+        -------
+        state:      tuple
+                    Tiles, score, score added with last maneuver and
+                    condition of the game.
+        """
+        score, score_add = self.get_score()
+
+        return self.get_tiles(), score, score_add, self.get_condition()
+
+    def get_score(self, driver=None):
+        """
+        Retrieve the current score for this game.
+
+        Parameters
+        ----------
+        driver:     ignored
+                    Accepted for compatibility with GameEnv.
+
+        Returns
+        -------
+        score:      integer
+                    Current score of this game.
+
+        score_add:  integer
+                    Score added with last maneuver.
+        """
+        return self.score, self.score_add
+
+    def get_tiles(self, driver=None):
+        """
+        Retrieve the current tiles and their locations.
+
+        Parameters
+        ----------
+        driver:     ignored
+                    Accepted for compatibility with GameEnv.
+
+        Returns
+        -------
+        tiles:      list
+                    Each sublist represents a row starting from top to bottom.
+                    Each element represents a tile, starting from left to right.
+        """
+        return [list(row) for row in self.tiles]
+
+    def get_legal_moves(self, driver=None):
+        """
+        Retrieve which moves change the current board.
+
+        Parameters
+        ----------
+        driver:     ignored
+                    Accepted for compatibility with GameEnv.
+
+        Returns
+        -------
+        legal:      list of bools
+                    Whether or not each move in MOVES changes the board.
+        """
+        return [self._move_tiles(self.tiles, move)[2] for move in MOVES]
+
+    def get_condition(self, driver=None):
+        """
+        Retrieve the current game condition.
+
+        Parameters
+        ----------
+        driver:     ignored
+                    Accepted for compatibility with GameEnv.
+
+        Returns
+        -------
+        condition:  integer
+                    Current condition of the game using the class attributes:
+                        0: game in play
+                        1: game won
+                        2: game over
+                        3: game error
+        """
+        if self.won and not self.keep_playing:
+            condition = self.game_won
+        elif any(val is None for row in self.tiles for val in row):
+            condition = self.game_on
+        elif any(self._move_tiles(self.tiles, move)[2] for move in MOVES):
+            condition = self.game_on
+        else:
+            condition = self.game_over
+
+        return condition
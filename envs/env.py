@@ -5,6 +5,11 @@ from threading import Thread
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys 
 
+from agents.sequential import SequentialAgent
+from envs.bitboard import legal_moves, to_board
+from envs.timing import MoveTimer
+from runners.game_runner import play_game
+
 
 class GameEnv:
     """
@@ -77,9 +82,215 @@ class GameEnv:
         # start the server 
         httpd.serve_forever()
 
-    def get_score(self, driver):
+    # JavaScript function reading the full game state. The game serializes
+    # its state to local storage, synchronously, every time it changes, but
+    # only redraws the page in a later animation frame, which background and
+    # headless pages may not run for a while. Tiles, score and condition are
+    # therefore read from the serialized state; the score added is that of
+    # the moves the page has not drawn yet, if any, otherwise the addition
+    # shown next to the score. The game clears its state once the game is
+    # over, in which case everything is parsed from the page instead. Its
+    # argument is the list of condition codes.
+    _read_state = """
+        function readState(codes) {
+            var tiles = [
+                [null, null, null, null],
+                [null, null, null, null],
+                [null, null, null, null],
+                [null, null, null, null]
+            ];
+            var state = JSON.parse(
+                window.localStorage.getItem('gameState') || 'null'
+            );
+
+            // the score container holds the score followed by the addition
+            var container = document.querySelector('div.score-container');
+            var scores = container.textContent.split('+');
+            var shownScore = parseInt(scores[0], 10);
+            var shownAdd = scores.length == 2 ? parseInt(scores[1], 10) : 0;
+
+            if (state !== null) {
+                // cells are indexed by column, then row
+                state.grid.cells.forEach(function (column, x) {
+                    column.forEach(function (cell, y) {
+                        if (cell !== null) {
+                            tiles[y][x] = cell.value;
+                        }
+                    });
+                });
+
+                var condition = codes[0];
+                if (state.over) {
+                    condition = codes[2];
+                } else if (state.won && !state.keepPlaying) {
+                    condition = codes[1];
+                }
+
+                return {
+                    tiles: tiles,
+                    score: state.score,
+                    // a new game the page has not drawn has a lower score
+                    score_add: state.score == shownScore ?
+                        shownAdd : Math.max(0, state.score - shownScore),
+                    condition: condition
+                };
+            }
+
+            // tiles merged in the last move linger in the DOM; keep the max
+            var elems = document.querySelectorAll('.tile-container .tile');
+            for (var i = 0; i < elems.length; i++) {
+                var name = elems[i].className;
+                var val = parseInt(name.match(/tile-(\\d+)/)[1], 10);
+                var pos = name.match(/tile-position-(\\d)-(\\d)/);
+                var row = parseInt(pos[2], 10) - 1;
+                var col = parseInt(pos[1], 10) - 1;
+                if (tiles[row][col] === null || val > tiles[row][col]) {
+                    tiles[row][col] = val;
+                }
+            }
+
+            var condition;
+            if (document.querySelector('div.game-over') !== null) {
+                condition = codes[2];
+            } else if (document.querySelector('div.game-won') !== null) {
+                condition = codes[1];
+            } else if (document.querySelector('div.game-container') !== null) {
+                condition = codes[0];
+            } else {
+                condition = codes[3];
+            }
+
+            return {
+                tiles: tiles,
+                score: shownScore,
+                score_add: shownAdd,
+                condition: condition
+            };
+        }
+    """
+
+    # JavaScript returning the full game state in a single round trip.
+    # Arguments are the condition codes.
+    _state_script = _read_state + """
+        return readState(arguments);
+    """
+
+    # Asynchronous JavaScript making a move and returning the settled state
+    # in the same round trip. The game's actuator is wrapped, once per page,
+    # to capture the state it is given every time the game changes (moves,
+    # including those not made by this script, and new games), keeping track
+    # of the score from the serialized state the hook starts from. A keydown
+    # event with the move's key code is then dispatched to the document; the
+    # game handles it synchronously, so whether the actuator ran tells at
+    # once whether the board changed. If so, the state is the captured one,
+    # without waiting for the page to render it, unless asked to wait for
+    # the actuator's animation frame; if not, the move was a no-op and the
+    # current state is read as by get_state, or taken from the last capture
+    # once the game is over and has cleared its serialized state. Arguments
+    # are the key code, whether to wait for the frame, the four condition
+    # codes and the callback.
+    _move_script = _read_state + """
+        var which = arguments[0];
+        var waitForFrame = arguments[1];
+        var codes = Array.prototype.slice.call(arguments, 2, 6);
+        var callback = arguments[arguments.length - 1];
+
+        if (typeof HTMLActuator === 'undefined') {
+            callback(null);
+            return;
+        }
+
+        var hook = window.agent2048Hook;
+        if (hook === undefined) {
+            hook = window.agent2048Hook = {
+                actuated: false,
+                state: null,
+                score: readState(codes).score
+            };
+            var actuate = HTMLActuator.prototype.actuate;
+            HTMLActuator.prototype.actuate = function (grid, metadata) {
+                actuate.call(this, grid, metadata);
+
+                var tiles = [[], [], [], []];
+                for (var y = 0; y < 4; y++) {
+                    for (var x = 0; x < 4; x++) {
+                        var cell = grid.cells[x][y];
+                        tiles[y].push(cell === null ? null : cell.value);
+                    }
+                }
+
+                var condition = codes[0];
+                if (metadata.over) {
+                    condition = codes[2];
+                } else if (metadata.terminated) {
+                    condition = codes[1];
+                }
+
+                // a new game starts again from a lower score
+                hook.state = {
+                    tiles: tiles,
+                    score: metadata.score,
+                    score_add: Math.max(0, metadata.score - hook.score),
+                    condition: condition
+                };
+                hook.score = metadata.score;
+                hook.actuated = true;
+            };
+        }
+
+        hook.actuated = false;
+        var event = new Event('keydown', {bubbles: true, cancelable: true});
+        Object.defineProperty(event, 'which', {value: which});
+        Object.defineProperty(event, 'keyCode', {value: which});
+        document.dispatchEvent(event);
+
+        // a move takes the captured state; a no-op leaves the current one,
+        // captured too once the game is over and its state cleared
+        var cleared = window.localStorage.getItem('gameState') === null;
+        var last = hook.actuated || (cleared && hook.state !== null) ?
+            hook.state : readState(codes);
+        var state = {
+            tiles: last.tiles,
+            score: last.score,
+            score_add: last.score_add,
+            condition: last.condition,
+            moved: hook.actuated
+        };
+        if (!hook.actuated) {
+            state.score_add = 0;
+            callback(state);
+            return;
+        }
+
+        if (!waitForFrame) {
+            callback(state);
+            return;
+        }
+
+        // the actuator renders in the frame it requested before this one;
+        // background pages may not render at all, so do not wait long
+        var done = false;
+        var finish = function () {
+            if (!done) {
+                done = true;
+                callback(state);
+            }
+        };
+        window.requestAnimationFrame(finish);
+        window.setTimeout(finish, 100);
+    """
+
+    # key codes of the arrow keys, as read by the game's input manager
+    _key_codes = {
+        Keys.ARROW_UP: 38,
+        Keys.ARROW_RIGHT: 39,
+        Keys.ARROW_DOWN: 40,
+        Keys.ARROW_LEFT: 37
+    }
+
+    def get_state(self, driver):
         """
-        Retrieve the current score for this game.
+        Retrieve the full game state with a single call into the browser.
 
         Parameters
         ----------
@@ -88,24 +299,122 @@ class GameEnv:
 
         Returns
         -------
+        tiles:      list
+                    Each sublist represents a row starting from top to bottom.
+                    Each element represents a tile, starting from left to right.
+
         score:      integer
                     Current score of this game. 
 
         score_add:  integer
                     Score added with last maneuver.
+
+        condition:  integer
+                    Current condition of the game using the class attributes:
+                        0: game in play
+                        1: game won
+                        2: game over 
+                        3: game error
+        """
+        state = driver.execute_script(
+            self._state_script,
+            self.game_on,
+            self.game_won,
+            self.game_over,
+            self.game_error
+        )
+
+        return (
+            state['tiles'], 
+            state['score'], 
+            state['score_add'], 
+            state['condition']
+        )
+
+    def move(self, driver, move, wait_for_frame=False):
+        """
+        Make a move and retrieve the resulting game state, in a single call
+        into the browser.
+
+        Parameters
+        ----------
+        driver:         webdriver object
+                        Selenium Driver object for interfacing with the game.
+
+        move:           unicode literal
+                        Maneuver encoded as one of the Selenium webdriver
+                        arrow keys.
+
+        wait_for_frame: bool, default False
+                        If true, return once the page has rendered the move;
+                        otherwise as soon as the game has made it.
+
+        Returns
+        -------
+        tiles:          list
+                        Each sublist represents a row starting from top to
+                        bottom. Each element represents a tile, starting from
+                        left to right.
+
+        score:          integer
+                        Current score of this game.
+
+        score_add:      integer
+                        Score added with this maneuver.
+
+        condition:      integer
+                        Current condition of the game; see get_state.
+
+        moved:          bool
+                        Whether or not the move changed the board.
+
+        Notes
+        -----
+        The state returned is the one the game computed for the move, so it
+        is never caught mid-animation, and a move which does not change the
+        board is reported as soon as the game has ignored it.
         """
-        # retrieve the scores div element from the html
-        elem = driver.find_element_by_css_selector('div.score-container')
+        state = driver.execute_async_script(
+            self._move_script,
+            self._key_codes[move],
+            wait_for_frame,
+            self.game_on,
+            self.game_won,
+            self.game_over,
+            self.game_error
+        )
+
+        if state is None:
+            raise RuntimeError(
+                'The page does not expose the game actuator (HTMLActuator).'
+            )
+
+        return (
+            state['tiles'],
+            state['score'],
+            state['score_add'],
+            state['condition'],
+            state['moved']
+        )
 
-        # parse scores out of the element
-        scores = elem.text.split('+')
+    def get_score(self, driver):
+        """
+        Retrieve the current score for this game.
 
-        # cast the scores to integers
-        score = int(scores[0])
-        if len(scores) == 2:
-            score_add = int(scores[1])
-        else:
-            score_add = 0
+        Parameters
+        ----------
+        driver:     webdriver object
+                    Selenium Driver object for interfacing with the game.
+
+        Returns
+        -------
+        score:      integer
+                    Current score of this game. 
+
+        score_add:  integer
+                    Score added with last maneuver.
+        """
+        _, score, score_add, _ = self.get_state(driver)
 
         return score, score_add
 
@@ -124,30 +433,34 @@ class GameEnv:
                     Each sublist represents a row starting from top to bottom.
                     Each element represents a tile, starting from left to right.
         """
-        # initialize the tiles list
-        tiles = [
-            [None, None, None, None],   # top row
-            [None, None, None, None],   # second row
-            [None, None, None, None],   # third row
-            [None, None, None, None]    # bottom row
-        ]
-
-        # loop through the tile html elements
-        for elem in driver.find_elements_by_class_name('tile'):
-            # retrieve the css classes assigned to the tile
-            attr = elem.get_attribute('class')
-
-            # parse row, column, value from css classes
-            row = int(attr.split()[2].split('-')[3]) - 1
-            col = int(attr.split()[2].split('-')[2]) - 1
-            val = int(attr.split()[1].split('-')[1])
-
-            # update the tiles list element; duplicates exist, be wary!
-            if tiles[row][col] is None or val > tiles[row][col]:
-                tiles[row][col] = val 
+        tiles, _, _, _ = self.get_state(driver)
 
         return tiles
 
+    def get_legal_moves(self, driver, tiles=None):
+        """
+        Retrieve which moves change the current board.
+
+        Parameters
+        ----------
+        driver:     webdriver object
+                    Selenium Driver object for interfacing with the game.
+
+        tiles:      list or None, default None
+                    Current tiles, if already known, saving a call into the
+                    browser.
+
+        Returns
+        -------
+        legal:      list of bools
+                    Whether or not each move in envs.engine.MOVES (up,
+                    right, down, left) changes the board.
+        """
+        if tiles is None:
+            tiles = self.get_tiles(driver)
+
+        return legal_moves(to_board(tiles))
+
     def get_condition(self, driver):
         """
         Retrieve the current game condition.
@@ -166,31 +479,7 @@ class GameEnv:
                         2: game over 
                         3: game error
         """
-        # try to retrieve game condition elements
-        try:
-            elem_over = driver.find_element_by_css_selector('div.game-over')
-        except:
-            elem_over = None 
-
-        try:
-            elem_won = driver.find_element_by_css_selector('div.game-won')
-        except:
-            elem_won = None 
-
-        try:
-            elem_on = driver.find_element_by_css_selector('div.game-container')
-        except:
-            elem_on = None 
-
-        # set the game condition based on which elements were found
-        if elem_over is not None:
-            condition = self.game_over
-        elif elem_won is not None:
-            condition = self.game_won 
-        elif elem_on is not None:
-            condition = self.game_on 
-        else:
-            condition = self.game_error 
+        _, _, _, condition = self.get_state(driver)
 
         return condition 
 
@@ -198,7 +487,7 @@ class GameEnv:
 
 def main():
     """
-    Build a game environment and play a few moves.
+    Build a game environment and play a game.
 
     Parameters
     ----------
@@ -208,6 +497,9 @@ def main():
     -------
         0
     """
+    # imported here as envs.pool imports this module
+    from envs.pool import GameHandle
+
     host = '0.0.0.0'
     port = 8000
     game = GameEnv(path='~/Documents/code/2048', host=host, port=port)
@@ -220,43 +512,20 @@ def main():
     driver.set_window_position(600, 0)
     driver.set_window_size(768, 768)
 
-    # connect the driver to the server running the game
-    driver.get("http://{h}:{p}".format(h=host, p=port))
-
-    # retrieve the game element 
-    elem = driver.find_element_by_class_name("game-container")
-
-    # loop through a full game
-    i = 0
-    while game.get_condition(driver) != game.game_over and i < game.max_iter:
-        if i == 0 or last_move == 'down':
-            elem.send_keys(Keys.ARROW_RIGHT)
-            last_move = 'right' 
-        elif last_move == 'right':
-            elem.send_keys(Keys.ARROW_UP)
-            last_move = 'up'
-        elif last_move == 'up':
-            elem.send_keys(Keys.ARROW_LEFT)
-            last_move = 'left'
-        else:
-            elem.send_keys(Keys.ARROW_DOWN)
-            last_move = 'down'
-
-        score, _ = game.get_score(driver)
-        condition = game.get_condition(driver)
-
-        print('Iter: {iter}, Move: {m}, New score: {s}, Condition: {c}'.format(
-            iter=i,
-            m=last_move,
-            s=score,
-            c=condition
-        ))
-
-        i += 1
-
-    # get and print the current tiles
+    # start a fresh game, with a timer on the phases of each move
+    url = "http://{h}:{p}".format(h=host, p=port)
+    handle = GameHandle(driver, game, url)
+    handle.new_game()
+    timer = MoveTimer()
+
+    # play a full game, cycling right, up, left and down
+    agent = SequentialAgent(initial_move=Keys.ARROW_RIGHT, clockwise=False)
+    play_game(handle, agent, timer=timer, verbose=True)
+
+    # get and print the current tiles, and where the time went
     tiles = game.get_tiles(driver)
     print(tiles)
+    print(timer.to_json())
 
     return 0
 
@@ -0,0 +1,483 @@
+import os
+import queue
+import mimetypes
+import threading
+import http.server
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from envs.env import GameEnv
+
+
+class StaticFileServer:
+    """
+    A threaded HTTP server serving the 2048 game assets from memory.
+
+    Notes
+    -----
+    All files below the game folder are read once, on start, so serving them
+    neither touches the disk nor requires changing the working directory. Each
+    request is handled on its own thread, so many browsers can load the game
+    at once.
+
+    Parameters
+    ----------
+    path:   string
+            Folder path to the 2048 game repository.
+
+    host:   string of four positive integers seperated by periods
+            IP address of the host server.
+
+    port:   integer, default 0
+            Port to serve through; 0 picks a free port.
+    """
+
+    def __init__(self, path, host='127.0.0.1', port=0):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.httpd = None
+
+    def _load_files(self):
+        """
+        Read the game assets into memory.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        files:      dictionary
+                    Content type and contents of each file, keyed by its URL
+                    path.
+        """
+        root = os.path.expanduser(self.path)
+        files = dict()
+
+        for folder, _, names in os.walk(root):
+            # skip version control folders
+            if '.git' in os.path.relpath(folder, root).split(os.sep):
+                continue
+
+            for name in names:
+                filename = os.path.join(folder, name)
+                url = '/' + os.path.relpath(filename, root).replace(os.sep, '/')
+                content_type = (mimetypes.guess_type(name)[0] or
+                                'application/octet-stream')
+
+                with open(filename, 'rb') as f:
+                    files[url] = (content_type, f.read())
+
+        # the index page is also served at the root
+        if '/index.html' in files:
+            files['/'] = files['/index.html']
+
+        return files
+
+    def start(self):
+        """
+        Start serving on a background thread.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        files = self._load_files()
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                content_type, body = files.get(
+                    self.path.split('?')[0],
+                    (None, None)
+                )
+
+                if body is None:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # keep the console quiet
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(
+            (self.host, self.port),
+            Handler
+        )
+        self.httpd.daemon_threads = True
+
+        # record the port actually bound
+        self.port = self.httpd.server_address[1]
+
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+
+    def stop(self):
+        """
+        Stop serving.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    @property
+    def url(self):
+        """
+        URL of the game.
+        """
+        return 'http://{h}:{p}/'.format(h=self.host, p=self.port)
+
+
+class GameHandle:
+    """
+    A browser session playing the game, handed out by a BrowserPool.
+
+    Parameters
+    ----------
+    driver:     webdriver object
+                Selenium Driver object for interfacing with the game.
+
+    env:        GameEnv object
+                Environment used to retrieve the game state.
+
+    url:        string
+                URL of the game.
+
+    Attributes
+    ----------
+    elem:       webelement object
+                The game container element, receiving moves.
+
+    broken:     bool
+                Whether or not the session failed and must be replaced.
+    """
+
+    def __init__(self, driver, env, url):
+        self.driver = driver
+        self.env = env
+        self.url = url
+        self.elem = None
+        self.broken = False
+
+    def new_game(self):
+        """
+        Start a new game, discarding any game in progress.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        # the game resumes from local storage, so clear it before reloading
+        self.driver.get(self.url)
+        self.driver.execute_script('window.localStorage.clear();')
+        self.driver.refresh()
+
+        self.elem = self.driver.find_element_by_class_name('game-container')
+
+    def send_keys(self, move):
+        """
+        Make a move in the game.
+
+        Parameters
+        ----------
+        move:       unicode literal
+                    Maneuver encoded as one of the Selenium webdriver arrow
+                    keys.
+
+        Returns
+        -------
+        None
+        """
+        self.elem.send_keys(move)
+
+    def move(self, move, wait_for_frame=False):
+        """
+        Make a move and retrieve the resulting game state in one round trip;
+        see GameEnv.move.
+        """
+        return self.env.move(self.driver, move, wait_for_frame=wait_for_frame)
+
+    def get_state(self):
+        """
+        Retrieve the full game state; see GameEnv.get_state.
+        """
+        return self.env.get_state(self.driver)
+
+    def get_tiles(self):
+        """
+        Retrieve the current tiles; see GameEnv.get_tiles.
+        """
+        return self.env.get_tiles(self.driver)
+
+    def get_score(self):
+        """
+        Retrieve the current score; see GameEnv.get_score.
+        """
+        return self.env.get_score(self.driver)
+
+    def get_condition(self):
+        """
+        Retrieve the current game condition; see GameEnv.get_condition.
+        """
+        return self.env.get_condition(self.driver)
+
+    def get_legal_moves(self, tiles=None):
+        """
+        Retrieve which moves change the current board; see
+        GameEnv.get_legal_moves.
+        """
+        return self.env.get_legal_moves(self.driver, tiles=tiles)
+
+    def quit(self):
+        """
+        Close the browser session, ignoring failures of a broken session.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+
+
+class BrowserPool:
+    """
+    A pool of headless browser sessions playing the game, served by a single
+    in-memory StaticFileServer.
+
+    Notes
+    -----
+    Handles are checked out with acquire() and used by one thread at a time.
+    A session raising a WebDriverException, which includes calls exceeding the
+    page load or script timeouts, is closed and replaced by a fresh one when
+    its handle is returned. Browser sessions belong to the process that
+    started them; worker processes should each run their own pool.
+
+    Parameters
+    ----------
+    path:           string
+                    Folder path to the 2048 game repository.
+
+    n_sessions:     integer, default 4
+                    Number of browser sessions.
+
+    browser:        string, default firefox
+                    Headless browser to run: firefox or chrome.
+
+    host:           string of four positive integers seperated by periods
+                    IP address of the host server.
+
+    port:           integer, default 0
+                    Port to serve through; 0 picks a free port.
+
+    timeout:        float, default 30.0
+                    Seconds allowed for page loads and scripts before a
+                    session is considered hung.
+    """
+
+    def __init__(self,
+                 path,
+                 n_sessions=4,
+                 browser='firefox',
+                 host='127.0.0.1',
+                 port=0,
+                 timeout=30.0):
+        self.path = path
+        self.n_sessions = n_sessions
+        self.browser = browser
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+        self.server = StaticFileServer(path, host=host, port=port)
+        self._handles = queue.Queue()
+        self._all_handles = []
+        self._lock = threading.Lock()
+
+    def _create_driver(self):
+        """
+        Start a headless browser session.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        driver:     webdriver object
+                    Selenium Driver object for the new session.
+        """
+        if self.browser == 'firefox':
+            options = webdriver.FirefoxOptions()
+            options.add_argument('--headless')
+            driver = webdriver.Firefox(options=options)
+        elif self.browser == 'chrome':
+            options = webdriver.ChromeOptions()
+            options.add_argument('--headless')
+            options.add_argument('--no-sandbox')
+            driver = webdriver.Chrome(options=options)
+        else:
+            raise ValueError('Unknown browser {}'.format(self.browser))
+
+        driver.set_page_load_timeout(self.timeout)
+        driver.set_script_timeout(self.timeout)
+
+        return driver
+
+    def _create_handle(self):
+        """
+        Start a browser session on a new game.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        handle:     GameHandle object
+                    Handle for the new session.
+        """
+        env = GameEnv(path=self.path, host=self.server.host,
+                      port=self.server.port)
+        handle = GameHandle(self._create_driver(), env, self.server.url)
+
+        with self._lock:
+            self._all_handles.append(handle)
+
+        return handle
+
+    def start(self):
+        """
+        Start the file server and the browser sessions.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.server.start()
+
+        for _ in range(self.n_sessions):
+            self._handles.put(self._create_handle())
+
+    def _recycle(self, handle):
+        """
+        Replace a broken browser session with a fresh one.
+
+        Parameters
+        ----------
+        handle:     GameHandle object
+                    Handle of the broken session.
+
+        Returns
+        -------
+        handle:     GameHandle object
+                    Handle of the replacement session.
+        """
+        handle.quit()
+
+        with self._lock:
+            if handle in self._all_handles:
+                self._all_handles.remove(handle)
+
+        return self._create_handle()
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """
+        Check out a browser session for the duration of a with block.
+
+        Parameters
+        ----------
+        timeout:    float or None, default None
+                    Seconds to wait for a free session (forever if None).
+
+        Returns
+        -------
+        handle:     GameHandle object
+                    Handle of the checked out session, on a fresh game.
+        """
+        handle = self._handles.get(timeout=timeout)
+
+        try:
+            if handle.broken:
+                handle = self._recycle(handle)
+
+            handle.new_game()
+            yield handle
+        except WebDriverException:
+            handle.broken = True
+            raise
+        finally:
+            # replace broken sessions before returning them to the pool; a
+            # handle goes back whatever fails, so the pool keeps its size
+            try:
+                if handle.broken:
+                    handle = self._recycle(handle)
+            except Exception:
+                # keep the broken handle and try again on the next checkout
+                pass
+            finally:
+                self._handles.put(handle)
+
+    def close(self):
+        """
+        Close all browser sessions and stop the file server.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            handles = list(self._all_handles)
+            self._all_handles = []
+
+        for handle in handles:
+            handle.quit()
+
+        self.server.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,232 @@
+import numpy as np
+
+from envs.bitboard import transpose
+
+
+# The 8 symmetries of the board (rotations and reflections) are numbered 0-7.
+# Symmetry s applies, in turn: a left-right flip if bit 0 of s is set, an
+# up-down flip if bit 1 is set, and a transpose if bit 2 is set. Moves are
+# indexed in the order of envs.engine.MOVES: 0 up, 1 right, 2 down, 3 left.
+
+N_SYMMETRIES = 8
+
+
+def flip_horizontal(board):
+    """
+    Mirror a bitboard left to right.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    board:      integer
+                Mirrored 64-bit board.
+    """
+    # swap neighbouring nibbles, then neighbouring pairs of nibbles
+    board = (((board & 0xF0F0F0F0F0F0F0F0) >> 4) |
+             ((board & 0x0F0F0F0F0F0F0F0F) << 4))
+    board = (((board & 0xFF00FF00FF00FF00) >> 8) |
+             ((board & 0x00FF00FF00FF00FF) << 8))
+
+    return board
+
+
+def flip_vertical(board):
+    """
+    Mirror a bitboard top to bottom.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    board:      integer
+                Mirrored 64-bit board.
+    """
+    # swap neighbouring rows, then neighbouring pairs of rows
+    board = (((board & 0xFFFF0000FFFF0000) >> 16) |
+             ((board & 0x0000FFFF0000FFFF) << 16))
+    board = (((board & 0xFFFFFFFF00000000) >> 32) |
+             ((board & 0x00000000FFFFFFFF) << 32))
+
+    return board
+
+
+def transform_board(board, symmetry):
+    """
+    Apply a symmetry to a bitboard.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    symmetry:   integer
+                Index of the symmetry, 0-7.
+
+    Returns
+    -------
+    board:      integer
+                Transformed 64-bit board.
+    """
+    if symmetry & 1:
+        board = flip_horizontal(board)
+    if symmetry & 2:
+        board = flip_vertical(board)
+    if symmetry & 4:
+        board = transpose(board)
+
+    return board
+
+
+def _build_permutations():
+    """
+    Build the cell and move permutations of each symmetry.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    cells:      NumPy array (8, 16)
+                For each symmetry, the cell of the original board found at
+                each cell of the transformed board.
+
+    moves:      NumPy array (8, 4)
+                For each symmetry, the move on the transformed board which
+                corresponds to each move on the original board.
+    """
+    cells = np.empty((N_SYMMETRIES, 16), dtype=np.int64)
+    moves = np.empty((N_SYMMETRIES, 4), dtype=np.int64)
+
+    for symmetry in range(N_SYMMETRIES):
+        # (row, column) of the original cell found at each transformed cell
+        grid = np.arange(16).reshape(4, 4)
+        if symmetry & 1:
+            grid = grid[:, ::-1]
+        if symmetry & 2:
+            grid = grid[::-1, :]
+        if symmetry & 4:
+            grid = grid.T
+        cells[symmetry] = grid.ravel()
+
+        # follow each move through the same steps: up, right, down, left
+        mapping = np.arange(4)
+        if symmetry & 1:
+            mapping = np.array([0, 3, 2, 1])[mapping]
+        if symmetry & 2:
+            mapping = np.array([2, 1, 0, 3])[mapping]
+        if symmetry & 4:
+            mapping = np.array([3, 2, 1, 0])[mapping]
+        moves[symmetry] = mapping
+
+    return cells, moves
+
+
+CELL_PERMUTATIONS, MOVE_PERMUTATIONS = _build_permutations()
+
+# the inverse of each symmetry's move mapping
+INVERSE_MOVE_PERMUTATIONS = np.argsort(MOVE_PERMUTATIONS, axis=1)
+
+
+def transform_boards(boards, symmetries):
+    """
+    Apply a symmetry to each of a set of boards of tile exponents.
+
+    Parameters
+    ----------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each board.
+
+    symmetries: integer or NumPy array (N,)
+                Index of the symmetry, 0-7, applied to all or to each board.
+
+    Returns
+    -------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each transformed board.
+    """
+    cells = CELL_PERMUTATIONS[symmetries]
+
+    if cells.ndim == 1:
+        return boards[:, cells]
+
+    return np.take_along_axis(boards, cells, axis=1)
+
+
+def canonical_board(board):
+    """
+    Find the smallest of the 8 symmetric versions of a bitboard.
+
+    Parameters
+    ----------
+    board:      integer
+                64-bit board.
+
+    Returns
+    -------
+    canonical:  integer
+                Smallest symmetric version of the board.
+
+    symmetry:   integer
+                Index of the symmetry transforming the board into its
+                canonical version.
+    """
+    # the four flips, then their transposes: one operation per symmetry
+    flipped = flip_horizontal(board)
+    candidates = [board, flipped, flip_vertical(board), flip_vertical(flipped)]
+    candidates += [transpose(candidate) for candidate in candidates]
+
+    canonical = board
+    best = 0
+
+    for symmetry in range(1, N_SYMMETRIES):
+        if candidates[symmetry] < canonical:
+            canonical = candidates[symmetry]
+            best = symmetry
+
+    return canonical, best
+
+
+# bit position of each cell in a 64-bit board
+_SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+
+
+def canonical_boards(boards):
+    """
+    Find the smallest of the 8 symmetric versions of each of a set of boards
+    of tile exponents, as 64-bit boards; see canonical_board.
+
+    Parameters
+    ----------
+    boards:     NumPy array (N, 16)
+                Tile exponents of each board.
+
+    Returns
+    -------
+    canonical:  NumPy array (N,) of uint64
+                Smallest symmetric version of each board, as a 64-bit board.
+
+    symmetries: NumPy array (N,) of integers
+                Index of the symmetry transforming each board into its
+                canonical version.
+    """
+    boards = np.asarray(boards, dtype=np.uint64)
+
+    # every symmetric version of every board, packed
+    packed = np.empty((len(boards), N_SYMMETRIES), dtype=np.uint64)
+    for symmetry in range(N_SYMMETRIES):
+        packed[:, symmetry] = np.bitwise_or.reduce(
+            transform_boards(boards, symmetry) << _SHIFTS, axis=1
+        )
+
+    symmetries = np.argmin(packed, axis=1)
+    canonical = packed[np.arange(len(boards)), symmetries]
+
+    return canonical, symmetries
@@ -0,0 +1,392 @@
+import cProfile
+import csv
+import io
+import json
+import pstats
+import threading
+import time
+from array import array
+
+import numpy as np
+
+
+PERCENTILES = (50, 90, 99)
+
+
+class _NullPhase:
+    """
+    Context manager doing nothing, returned for every phase of a disabled
+    timer.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """
+    Context manager adding the time spent in its block to a list of samples.
+    """
+    def __init__(self, samples):
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+class MoveTimer:
+    """
+    Class object timing the phases of each move of a game loop.
+
+    Notes
+    -----
+    Each phase of a move (such as next_move, send_keys or get_state) is timed
+    by running it in a phase block:
+
+        with timer.phase('next_move'):
+            move = agent.next_move(tiles)
+
+    and the latency of every call is kept, as 8 bytes in an array, for the
+    summary percentiles and histograms. A disabled timer returns one shared
+    block doing nothing, so instrumented loops cost a method call per phase
+    when timing is off. Phases may be timed from several threads at once.
+
+    Moves and games are counted with count_move, start_game and end_game, and
+    give moves per second and games per hour over the wall time since the
+    timer was created (or reset). One game can also be profiled with
+    cProfile.
+
+    Parameters
+    ----------
+    enabled:        bool, default True
+                    Whether or not to record anything.
+
+    profile_game:   integer or None, default None
+                    Number, counting from 0 in start_game order, of the game
+                    to profile with cProfile (none if None).
+
+    Attributes
+    ----------
+    samples:        dictionary
+                    Latency of every call of each phase, in seconds.
+
+    profile:        pstats.Stats object or None
+                    Profile of the selected game, once it has ended.
+    """
+    def __init__(self, enabled=True, profile_game=None):
+        self.enabled = enabled
+        self.profile_game = profile_game
+
+        self.reset()
+
+    def reset(self):
+        """
+        Discard everything recorded and restart the wall clock.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.samples = dict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.n_moves = 0
+        self.n_games = 0
+        self._n_started = 0
+        self.profile = None
+        self._profiler = None
+        self._start = time.perf_counter()
+
+    def phase(self, name):
+        """
+        Block timing one call of a phase.
+
+        Parameters
+        ----------
+        name:       string
+                    Name of the phase.
+
+        Returns
+        -------
+        block:      context manager
+                    Block adding its duration to the phase's samples.
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+
+        # blocks are per thread, the samples they add to are shared
+        phases = getattr(self._local, 'phases', None)
+        if phases is None:
+            phases = self._local.phases = dict()
+
+        block = phases.get(name)
+        if block is None:
+            with self._lock:
+                samples = self.samples.setdefault(name, array('d'))
+            block = phases[name] = _Phase(samples)
+
+        return block
+
+    def count_move(self, n=1):
+        """
+        Count moves played.
+
+        Parameters
+        ----------
+        n:          integer, default 1
+                    Number of moves played, such as one per game of a batch.
+
+        Returns
+        -------
+        None
+        """
+        if self.enabled:
+            with self._lock:
+                self.n_moves += n
+
+    def start_game(self):
+        """
+        Mark the start of a game, profiling it if it is the selected one.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        game:       integer or None
+                    Number of the game, in start order, to give to end_game
+                    (None if the timer is disabled).
+
+        Notes
+        -----
+        cProfile follows the thread which starts the profiled game, so that
+        game should start and end on one thread.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            game = self._n_started
+            self._n_started += 1
+
+            if game == self.profile_game:
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+
+        return game
+
+    def end_game(self, game=None, n=1):
+        """
+        Mark the end of games, ending the profile of the selected one.
+
+        Parameters
+        ----------
+        game:       integer or None, default None
+                    Number returned by start_game; any game being profiled
+                    ends with it if None.
+
+        n:          integer, default 1
+                    Number of games which ended.
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if (self._profiler is not None and
+                    (game is None or game == self.profile_game)):
+                self._profiler.disable()
+                self.profile = pstats.Stats(self._profiler)
+                self._profiler = None
+
+            self.n_games += n
+
+    @property
+    def elapsed(self):
+        """
+        Wall time, in seconds, since the timer was created or reset.
+        """
+        return time.perf_counter() - self._start
+
+    def histogram(self, name, bins=None):
+        """
+        Histogram of the latencies of a phase.
+
+        Parameters
+        ----------
+        name:       string
+                    Name of the phase.
+
+        bins:       NumPy array or None, default None
+                    Bin edges, in seconds; 1 microsecond to 100 seconds in
+                    four bins per decade if None.
+
+        Returns
+        -------
+        counts:     NumPy array
+                    Number of calls in each bin.
+
+        bins:       NumPy array
+                    Bin edges, in seconds.
+        """
+        if bins is None:
+            bins = np.logspace(-6, 2, 33)
+
+        return np.histogram(np.array(self.samples[name]), bins=bins)
+
+    def summary(self):
+        """
+        Summarize the recorded timings.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        summary:    dictionary
+                    Elapsed seconds, moves, games, moves per second, games
+                    per hour and, for each phase, the number of calls and
+                    the total, mean, percentile and maximum latencies in
+                    seconds.
+        """
+        elapsed = self.elapsed
+        phases = dict()
+
+        for name, samples in self.samples.items():
+            x = np.array(samples) if len(samples) else np.zeros(1)
+            stats = {
+                'count': len(samples),
+                'total': float(np.sum(x)),
+                'mean': float(np.mean(x))
+            }
+            for q, value in zip(PERCENTILES, np.percentile(x, PERCENTILES)):
+                stats['p{q}'.format(q=q)] = float(value)
+            stats['max'] = float(np.max(x))
+
+            phases[name] = stats
+
+        return {
+            'elapsed': elapsed,
+            'moves': self.n_moves,
+            'games': self.n_games,
+            'moves_per_second': self.n_moves / elapsed,
+            'games_per_hour': 3600 * self.n_games / elapsed,
+            'phases': phases
+        }
+
+    def to_json(self, filename=None):
+        """
+        Export the summary as JSON.
+
+        Parameters
+        ----------
+        filename:   string or None, default None
+                    File to write the summary to (none if None).
+
+        Returns
+        -------
+        text:       string
+                    Summary as a JSON document.
+        """
+        text = json.dumps(self.summary(), indent=2)
+
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(text)
+
+        return text
+
+    def to_csv(self, filename=None):
+        """
+        Export the per-phase summary as CSV, one row per phase.
+
+        Parameters
+        ----------
+        filename:   string or None, default None
+                    File to write the summary to (none if None).
+
+        Returns
+        -------
+        text:       string
+                    Summary as CSV, with the run totals repeated on each row.
+        """
+        summary = self.summary()
+        stats = ['count', 'total', 'mean'] + [
+            'p{q}'.format(q=q) for q in PERCENTILES
+        ] + ['max']
+        totals = ['moves', 'games', 'moves_per_second', 'games_per_hour']
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['phase'] + stats + totals)
+        for name, phase in summary['phases'].items():
+            writer.writerow(
+                [name] + [phase[s] for s in stats] +
+                [summary[t] for t in totals]
+            )
+        text = out.getvalue()
+
+        if filename is not None:
+            with open(filename, 'w', newline='') as f:
+                f.write(text)
+
+        return text
+
+    def print_profile(self, sort='cumulative', limit=20):
+        """
+        Print the profile of the selected game.
+
+        Parameters
+        ----------
+        sort:       string, default cumulative
+                    Key to sort the functions by (see pstats.Stats).
+
+        limit:      integer, default 20
+                    Number of functions printed.
+
+        Returns
+        -------
+        None
+        """
+        if self.profile is None:
+            raise ValueError('No game has been profiled.')
+
+        self.profile.sort_stats(sort).print_stats(limit)
+
+    def dump_profile(self, filename):
+        """
+        Save the profile of the selected game, for pstats or snakeviz.
+
+        Parameters
+        ----------
+        filename:   string
+                    File name for the profile.
+
+        Returns
+        -------
+        None
+        """
+        if self.profile is None:
+            raise ValueError('No game has been profiled.')
+
+        self.profile.dump_stats(filename)
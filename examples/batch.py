@@ -0,0 +1,43 @@
+import numpy as np
+
+from envs.batch import BatchGameEnv
+
+
+def main():
+    """
+    Play many games at once, making random legal moves, on the batch
+    environment.
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    game = BatchGameEnv(n_games=4096, seed=1234)
+    rng = np.random.default_rng(1234)
+
+    # play until enough games have finished
+    boards, legal = game.reset()
+    scores = []
+    while len(scores) < 10000:
+        # pick a random legal move for each game
+        moves = np.argmax(rng.random(legal.shape) * legal, axis=1)
+        boards, _, done, legal = game.step(moves)
+
+        scores.extend(game.final_scores[done])
+
+    # inform the user of the results
+    print('Games: {n}, Mean score: {m:.1f}, Max score: {x}'.format(
+        n=len(scores),
+        m=np.mean(scores),
+        x=np.max(scores)
+    ))
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
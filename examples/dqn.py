@@ -0,0 +1,47 @@
+import numpy as np
+
+from agents.dqn import DQNAgent
+from envs.batch import BatchGameEnv
+
+
+def main():
+    """
+    Train a deep Q-network agent online on a batch of headless games.
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    env = BatchGameEnv(n_games=32, seed=1234)
+    agent = DQNAgent(epsilon=1.0, seed=1234)
+
+    boards, legal = env.reset()
+    n_finished = 0
+    for step in range(1, 20001):
+        # anneal exploration from fully random to mostly greedy
+        agent.epsilon = max(0.05, 1.0 - step / 10000)
+
+        moves = agent.act(boards, legal)
+        next_boards, score_add, done, legal = env.step(moves)
+        agent.observe(boards, moves, score_add, next_boards, done)
+        boards = next_boards
+
+        n_finished += int(done.sum())
+
+        # inform the user of the progress made
+        if step % 2000 == 0:
+            print('Step: {s}, Games: {g}, Mean final score: {m:.1f}'.format(
+                s=step,
+                g=n_finished,
+                m=np.mean(env.final_scores)
+            ))
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
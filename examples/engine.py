@@ -0,0 +1,67 @@
+from agents.sequential import SequentialAgent
+from data.trajectory import TrajectoryRecorder
+from envs import bitboard
+from envs.engine import GameEngine
+from envs.timing import MoveTimer
+
+
+def main():
+    """
+    Build a Sequential agent to play the game on the headless engine, recording
+    the game to the trajectories directory and timing each phase of a move.
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    # the engine acts as both the game environment and the game element
+    game = GameEngine(seed=1234)
+    agent = SequentialAgent()
+    timer = MoveTimer()
+
+    # loop through a full game, recording every move
+    i = 0
+    timer.start_game()
+    with TrajectoryRecorder('trajectories') as recorder:
+        tiles, score, _, condition = game.get_state()
+        while condition == game.game_on and i < game.max_iter:
+            # make the agents next move, among those changing the board, so
+            # that no moves which do nothing reach the recording
+            with timer.phase('next_move'):
+                legal = bitboard.legal_moves(bitboard.to_board(tiles))
+                move = agent.next_move(tiles, legal)
+
+            # make it and retrieve the updated game state in one call
+            with timer.phase('move'):
+                new_tiles, score, score_add, condition, _ = game.move(move)
+            # the score gained is 0 for a move which did not change the board
+            with timer.phase('record'):
+                recorder.record(tiles, move, score_add, condition)
+            tiles = new_tiles
+            timer.count_move()
+
+            # inform the user of the updated game state
+            print('Iter: {iter}, New score: {s}, Condition: {c}'.format(
+                iter=i,
+                s=score,
+                c=condition
+            ))
+
+            i += 1
+
+        recorder.end_game()
+    timer.end_game()
+
+    # print the final tiles and where the time went
+    print(game.get_tiles())
+    print(timer.to_csv())
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
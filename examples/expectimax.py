@@ -0,0 +1,47 @@
+from agents.expectimax import ExpectimaxAgent
+from envs.bitboard import BitboardEngine
+
+
+def main():
+    """
+    Build an Expectimax agent to play the game on the bitboard engine.
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    # the engine acts as both the game environment and the game element
+    game = BitboardEngine(seed=1234)
+    agent = ExpectimaxAgent()
+
+    # loop through a full game
+    i = 0
+    while game.get_condition() == game.game_on and i < game.max_iter:
+        # make the agents next move
+        game.send_keys(agent.next_move(game.board))
+
+        # retrieve the updated game state
+        score, _ = game.get_score()
+        condition = game.get_condition()
+
+        # inform the user of the updated game state
+        print('Iter: {iter}, New score: {s}, Condition: {c}'.format(
+            iter=i,
+            s=score,
+            c=condition
+        ))
+
+        i += 1
+
+    # print the final tiles
+    print(game.get_tiles())
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
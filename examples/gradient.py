@@ -0,0 +1,53 @@
+import numpy as np
+
+from data.dataset import TrajectoryDataset
+from representations.neural_network import NeuralNetworkRepresentation
+from representations.optimizers import Adam
+
+
+def main():
+    """
+    Train a neural network policy by policy gradient on the games recorded
+    to the trajectories directory (see examples/engine.py).
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    representation = NeuralNetworkRepresentation(
+        activation='softmax',
+        dtype='float32'
+    )
+    optimizer = Adam(learning_rate=0.001)
+    dataset = TrajectoryDataset('trajectories', batch_size=256, seed=1234)
+
+    for epoch in range(10):
+        losses = []
+        for boards, moves, returns in dataset:
+            # moves leading to more score than average are reinforced
+            advantages = returns - returns.mean()
+            advantages /= returns.std() + 1
+
+            losses.append(representation.fit_batch(
+                boards,
+                advantages,
+                moves=moves,
+                loss='policy',
+                optimizer=optimizer
+            ))
+
+        # inform the user of the progress made
+        print('Epoch: {e}, Mean loss: {l:.4f}'.format(
+            e=epoch,
+            l=np.mean(losses)
+        ))
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
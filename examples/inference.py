@@ -0,0 +1,86 @@
+import multiprocessing
+
+import numpy as np
+
+from agents.neural_network import NeuralNetworkAgent
+from envs.bitboard import BitboardEngine
+from representations.inference import InferenceServer
+from representations.neural_network import NeuralNetworkRepresentation
+from runners.game_runner import play_game
+
+
+def play(client, worker, n_games, scores):
+    """
+    Play games with a network evaluated by the inference server. Runs in
+    worker processes.
+
+    Parameters
+    ----------
+    client:     InferenceClient object
+                Worker's handle on the server, standing in for the network.
+
+    worker:     integer
+                Number of the worker, used to seed its games.
+
+    n_games:    integer
+                Number of games played.
+
+    scores:     multiprocessing Queue
+                Queue for the final score of each game.
+
+    Returns
+    -------
+    None
+    """
+    agent = NeuralNetworkAgent(representation=client)
+
+    for game_id in range(n_games):
+        game = BitboardEngine(seed=1000 * worker + game_id)
+        result = play_game(game, agent, game_id=game_id)
+        scores.put(result.score)
+
+
+def main():
+    """
+    Play games in several worker processes, one board at a time, with a
+    single process evaluating the network for all of them in micro-batches.
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    n_workers = 8
+    n_games = 4
+
+    representation = NeuralNetworkRepresentation(activation='relu')
+    scores = multiprocessing.Queue()
+
+    with InferenceServer(representation, n_clients=n_workers,
+                         max_batch_size=n_workers) as server:
+        workers = [
+            multiprocessing.Process(
+                target=play, args=(client, i, n_games, scores)
+            )
+            for i, client in enumerate(server.clients)
+        ]
+        for worker in workers:
+            worker.start()
+
+        results = [scores.get() for _ in range(n_workers * n_games)]
+        for worker in workers:
+            worker.join()
+
+        print('Mean score: {m:.1f}, Mean batch size: {b:.2f}'.format(
+            m=np.mean(results),
+            b=server.mean_batch_size
+        ))
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,14 @@
 import os 
-import pickle 
 from threading import Thread 
 from selenium import webdriver
-from selenium.webdriver.common.keys import Keys 
 
 from agents.sequential import SequentialAgent 
 from envs.env import GameEnv
+from envs.pool import GameHandle
+from runners.game_runner import play_game
 
 
-def create_agent(filename='demo.pkl'):
+def create_agent(filename='demo.ckpt'):
     """
     Create and save a simple agent to a file.
 
@@ -25,7 +25,7 @@ def create_agent(filename='demo.pkl'):
     if os.path.exists(filename):
         os.remove(filename)
 
-    # create and save agent to pickle file
+    # create and save agent to a checkpoint file
     agent = SequentialAgent() 
     agent.save(filename=filename)
 
@@ -45,10 +45,10 @@ def main():
     # build game environment
     game = GameEnv(path='~/Documents/code/2048')
 
-    # load agent from pickle file
-    filename = 'demo.pkl'
+    # load agent from the checkpoint file
+    filename = 'demo.ckpt'
     create_agent(filename)
-    agent = pickle.load(open(filename, 'rb'))
+    agent = SequentialAgent.load(filename)
     
     thread = Thread(target=game.start_server)
     thread.start()
@@ -58,30 +58,11 @@ def main():
     driver.set_window_position(600, 0)
     driver.set_window_size(768, 768)
 
-    # connect the driver to the server running the game
-    driver.get("http://{h}:{p}".format(h=game.host, p=game.port))
-
-    # retrieve the game element 
-    elem = driver.find_element_by_class_name("game-container")
-
-    # loop through a full game
-    i = 0
-    while game.get_condition(driver) != game.game_over and i < game.max_iter:
-        # make the agents next move
-        elem.send_keys(agent.next_move())
-
-        # retrieve the updated game state
-        score, _ = game.get_score(driver)
-        condition = game.get_condition(driver)
-
-        # inform the user of the updated game state
-        print('Iter: {iter}, New score: {s}, Condition: {c}'.format(
-            iter=i,
-            s=score,
-            c=condition
-        ))
-
-        i += 1
+    # start a fresh game and play it through
+    url = "http://{h}:{p}".format(h=game.host, p=game.port)
+    handle = GameHandle(driver, game, url)
+    handle.new_game()
+    play_game(handle, agent, verbose=True)
 
     return 0
 
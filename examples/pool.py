@@ -0,0 +1,37 @@
+from agents.random import RandomAgent
+from envs.pool import BrowserPool
+from envs.timing import MoveTimer
+from runners.game_runner import BrowserBackend, GameRunner
+
+
+def main():
+    """
+    Play several games at once on a pool of headless browsers.
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    timer = MoveTimer()
+
+    with BrowserPool(path='~/Documents/code/2048', n_sessions=4) as pool:
+        runner = GameRunner(
+            RandomAgent,
+            backend=BrowserBackend(pool),
+            n_games=8,
+            timer=timer
+        )
+        results = runner.run()
+
+    print('Scores: {}'.format([result.score for result in results]))
+    print(timer.to_csv())
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
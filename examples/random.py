@@ -1,9 +1,10 @@
 from threading import Thread 
 from selenium import webdriver
-from selenium.webdriver.common.keys import Keys 
 
 from agents.random import RandomAgent 
 from envs.env import GameEnv
+from envs.pool import GameHandle
+from runners.game_runner import play_game
 
 
 def main():
@@ -29,30 +30,11 @@ def main():
     driver.set_window_position(600, 0)
     driver.set_window_size(768, 768)
 
-    # connect the driver to the server running the game
-    driver.get("http://{h}:{p}".format(h=game.host, p=game.port))
-
-    # retrieve the game element 
-    elem = driver.find_element_by_class_name("game-container")
-
-    # loop through a full game
-    i = 0
-    while game.get_condition(driver) != game.game_over and i < game.max_iter:
-        # make the agents next move
-        elem.send_keys(agent.next_move())
-
-        # retrieve the updated game state
-        score, _ = game.get_score(driver)
-        condition = game.get_condition(driver)
-
-        # inform the user of the updated game state
-        print('Iter: {iter}, New score: {s}, Condition: {c}'.format(
-            iter=i,
-            s=score,
-            c=condition
-        ))
-
-        i += 1
+    # start a fresh game and play it through
+    url = "http://{h}:{p}".format(h=game.host, p=game.port)
+    handle = GameHandle(driver, game, url)
+    handle.new_game()
+    play_game(handle, agent, verbose=True)
 
     return 0
 
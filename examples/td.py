@@ -0,0 +1,49 @@
+import numpy as np
+
+from agents.ntuple import NTupleAgent
+from envs.bitboard import BitboardEngine
+from representations.ntuple import NTupleRepresentation
+from trainers.td import TDTrainer
+
+
+def main():
+    """
+    Train an n-tuple network by temporal difference learning, save its
+    weights, and play a game with them.
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    trainer = TDTrainer(n_games=500, seed=1234)
+    trainer.fit()
+
+    # inform the user of the progress made
+    for start in range(0, len(trainer.scores), 100):
+        print('Games {a}-{b}: Mean score: {m:.1f}'.format(
+            a=start,
+            b=start + 99,
+            m=np.mean(trainer.scores[start:start + 100])
+        ))
+
+    # save the weights and play a game with a memory-mapped copy
+    trainer.representation.save_weights('ntuple.npy')
+    representation = NTupleRepresentation()
+    representation.load_weights('ntuple.npy')
+    agent = NTupleAgent(representation=representation)
+
+    game = BitboardEngine(seed=1234)
+    while game.get_condition() == game.game_on:
+        game.send_keys(agent.next_move(game.get_tiles()))
+
+    print('Final score: {}'.format(game.get_score()[0]))
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+from representations.neural_network import NeuralNetworkRepresentation
+from trainers.neuroevolution import NeuroevolutionTrainer
+
+
+def main():
+    """
+    Train a neural network agent by neuroevolution and save the best agent.
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        0
+    """
+    trainer = NeuroevolutionTrainer(
+        representation=NeuralNetworkRepresentation(dtype='float32'),
+        population_size=64,
+        n_generations=20,
+        n_games=32,
+        seed=1234
+    )
+    trainer.fit()
+
+    # inform the user of the progress made
+    for generation, best, mean in trainer.history:
+        print('Generation: {g}, Best: {b:.1f}, Mean: {m:.1f}'.format(
+            g=generation,
+            b=best,
+            m=mean
+        ))
+
+    trainer.save('neuroevolution.ckpt')
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
+import inspect
+
 import numpy as np
 
 
@@ -79,19 +81,77 @@ class BaseRepresentation:
 
         return params
 
-    def normalize(self, x):
+    def get_arrays(self):
+        """
+        Get the arrays holding the learned state of this representation.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        arrays:     dictionary
+                    Arrays not covered by get_params, such as weights, by
+                    name; saved alongside the parameters in checkpoints.
+        """
+        return dict()
+
+    def set_arrays(self, arrays):
+        """
+        Set the arrays holding the learned state of this representation.
+
+        Parameters
+        ----------
+        arrays:     dictionary
+                    Arrays by name, as returned by get_arrays; they may be
+                    read-only memory maps, and are used without copying.
+
+        Returns
+        -------
+        None
+        """
+        pass
+
+    def normalize(self, x, out=None):
         """
         Normalize a set of input values. 
 
+        Parameters
+        ----------
+        x:      NumPy array
+                Tile values (0 for empty cells); a single board or a batch with
+                one board per row.
+
+        out:    NumPy array or None, default None
+                Floating point array to write the result to.
+
+        Returns
+        -------
+        xn:     NumPy array
+                Normalized values, each board scaled on its own.
+
         Notes
         -----
         2048 tiles are effectively powers of two. To normalize, we will:
             1)  Apply base-2 logarithm to the inputs (2 becomes 1, 8 becomes 3)
+                with empty cells becoming 0.
             2)  Apply min-max scaling to the remaining values such that all 
                 inputs lie between 0 and 1 inclusive.
         """
+        if out is None:
+            out = np.empty(np.shape(x))
+
         # apply base-2 logarithm to inputs
-        xl = np.log2(x)
+        xl = np.maximum(x, 1, out=out)
+        np.log2(xl, out=xl)
+
+        # min-max scale each board, leaving constant boards at zero
+        x_min = np.min(xl, axis=-1, keepdims=True)
+        x_range = np.max(xl, axis=-1, keepdims=True) - x_min
+        x_range[x_range == 0] = 1
+
+        xl -= x_min
+        xl /= x_range
 
-        # return min-max scaled inputs
-        return (x - np.min(x)) / (np.max(x) - np.min(x))
+        return xl
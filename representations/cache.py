@@ -0,0 +1,375 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from envs.symmetry import (
+    MOVE_PERMUTATIONS,
+    canonical_board,
+    canonical_boards,
+    transform_boards
+)
+from representations.base import BaseRepresentation
+
+
+# bit position of each cell in a 64-bit board
+_SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+
+
+class EvaluationCache:
+    """
+    A bounded memo of board evaluations, shared between symmetric boards.
+
+    Notes
+    -----
+    Entries are keyed on 64-bit boards. With symmetric set, a board is first
+    replaced by the smallest of its 8 rotations and reflections (see
+    envs.symmetry.canonical_board), so all of them share one entry; values
+    depending on the orientation, such as move scores, are then stored for
+    the canonical board and mapped back with to_original_moves. Once full,
+    the least recently used entry is evicted for each new one.
+
+    Parameters
+    ----------
+    max_size:   integer, default 1048576
+                Maximum number of entries.
+
+    symmetric:  bool, default True
+                Whether or not symmetric boards share an entry.
+
+    Attributes
+    ----------
+    hits:       integer
+                Number of lookups which found an entry.
+
+    misses:     integer
+                Number of lookups which did not.
+
+    evictions:  integer
+                Number of entries evicted.
+    """
+    def __init__(self, max_size=1048576, symmetric=True):
+        self.max_size = max_size
+        self.symmetric = symmetric
+
+        self._entries = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Reset the hit, miss and eviction counts.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        """
+        Remove every entry, for example after the evaluation changes.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, board):
+        """
+        Key of a board.
+
+        Parameters
+        ----------
+        board:      integer
+                    64-bit board.
+
+        Returns
+        -------
+        key:        integer
+                    Canonical 64-bit board, or the board itself if not
+                    symmetric.
+
+        symmetry:   integer
+                    Index of the symmetry transforming the board into its
+                    key (0 if not symmetric).
+        """
+        if self.symmetric:
+            return canonical_board(board)
+
+        return board, 0
+
+    def keys(self, boards):
+        """
+        Keys of a set of boards of tile exponents; see key.
+
+        Parameters
+        ----------
+        boards:     NumPy array (N, 16)
+                    Tile exponents of each board.
+
+        Returns
+        -------
+        keys:       NumPy array (N,) of uint64
+                    Key of each board.
+
+        symmetries: NumPy array (N,) of integers
+                    Index of the symmetry transforming each board into its
+                    key.
+        """
+        if self.symmetric:
+            return canonical_boards(boards)
+
+        boards = np.asarray(boards, dtype=np.uint64)
+        keys = np.bitwise_or.reduce(boards << _SHIFTS, axis=1)
+
+        return keys, np.zeros(len(boards), dtype=np.int64)
+
+    def get(self, key, default=None):
+        """
+        Look up an entry, marking it as the most recently used.
+
+        Parameters
+        ----------
+        key:        integer
+                    Key of the board, from key or keys.
+
+        default:    object, default None
+                    Value returned if there is no entry.
+
+        Returns
+        -------
+        value:      object
+                    Stored value, or the default.
+        """
+        value = self._entries.get(key, default)
+
+        if value is default:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        return value
+
+    def put(self, key, value):
+        """
+        Store an entry, evicting the least recently used one if full.
+
+        Parameters
+        ----------
+        key:        integer
+                    Key of the board, from key or keys.
+
+        value:      object
+                    Value to store.
+
+        Returns
+        -------
+        None
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def to_original_moves(scores, symmetries):
+        """
+        Map move scores of canonical boards back to the original boards.
+
+        Parameters
+        ----------
+        scores:     NumPy array (4,) or (N, 4)
+                    Score of each move in envs.engine.MOVES on the canonical
+                    board(s).
+
+        symmetries: integer or NumPy array (N,)
+                    Symmetry transforming each original board into its
+                    canonical board.
+
+        Returns
+        -------
+        scores:     NumPy array (4,) or (N, 4)
+                    Score of each move on the original board(s).
+        """
+        # move m of a board is move MOVE_PERMUTATIONS[s, m] of its image
+        moves = MOVE_PERMUTATIONS[symmetries]
+        if np.ndim(scores) == 1:
+            return np.asarray(scores)[moves]
+
+        return np.take_along_axis(np.asarray(scores), moves, axis=1)
+
+    @property
+    def hit_rate(self):
+        """
+        Fraction of lookups which found an entry.
+        """
+        return self.hits / max(1, self.hits + self.misses)
+
+    def stats(self):
+        """
+        Summarize the use of the cache.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        stats:      dictionary
+                    Number of entries, maximum size, hits, misses, hit rate
+                    and evictions.
+        """
+        return {
+            'size': len(self),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions
+        }
+
+
+class CachedRepresentation(BaseRepresentation):
+    """
+    Class for a representation remembering its outputs for the boards it has
+    evaluated.
+
+    Notes
+    -----
+    The inputs are the 16 tile values of a board, as for a
+    NeuralNetworkRepresentation scoring the 4 moves. A batch is looked up
+    row by row in an EvaluationCache; only the boards missing are fed through
+    the wrapped representation, once each, in canonical orientation, and the
+    scores are mapped back to the orientation of each board. With symmetric
+    set the outputs are thus those of the canonical orientation, which only
+    match the wrapped representation if it treats symmetric boards alike
+    (for example a network trained on symmetry-augmented data); otherwise
+    only identical boards share an entry. The cache must be cleared whenever
+    the wrapped representation's weights change.
+
+    Parameters
+    ----------
+    representation: NeuralNetworkRepresentation object
+                    Representation evaluating the boards missing from the
+                    cache.
+
+    max_size:       integer, default 1048576
+                    Maximum number of boards remembered.
+
+    symmetric:      bool, default False
+                    Whether or not symmetric boards share an entry.
+
+    Attributes
+    ----------
+    cache:          EvaluationCache object
+                    Outputs of the boards evaluated.
+    """
+    def __init__(self,
+                 representation=None,
+                 max_size=1048576,
+                 symmetric=False):
+        self.representation = representation
+        self.max_size = max_size
+        self.symmetric = symmetric
+
+        self.cache = EvaluationCache(max_size=max_size, symmetric=symmetric)
+
+    def feed_forward_batch(self, X, out=None, scratch=None):
+        """
+        Feed a batch of boards through the representation, reusing the
+        outputs of boards seen before.
+
+        Parameters
+        ----------
+        X:          NumPy array (B, 16)
+                    Tile values of each board (0 for empty cells).
+
+        out:        NumPy array (B, 4) or None, default None
+                    Array to write the outputs to; allocated if None.
+
+        scratch:    ignored
+                    Accepted for compatibility with
+                    NeuralNetworkRepresentation.
+
+        Returns
+        -------
+        o_o:        NumPy array (B, 4)
+                    Output for each board.
+        """
+        X = np.asarray(X)
+        boards = np.log2(np.maximum(X, 1)).astype(np.uint8)
+        keys, symmetries = self.cache.keys(boards)
+
+        scores = np.empty((len(X), 4), dtype=self.representation.dtype)
+        missing = []
+        for i, key in enumerate(keys.tolist()):
+            value = self.cache.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                scores[i] = value
+
+        if missing:
+            # evaluate each missing board once, in canonical orientation
+            missing = np.array(missing)
+            _, first, inverse = np.unique(
+                keys[missing], return_index=True, return_inverse=True
+            )
+            rows = missing[first]
+            computed = self.representation.feed_forward_batch(
+                transform_boards(X[rows], symmetries[rows])
+            )
+
+            for row, value in zip(rows.tolist(), computed):
+                self.cache.put(int(keys[row]), value.copy())
+            scores[missing] = computed[inverse.ravel()]
+
+        if out is None:
+            out = np.empty_like(scores)
+        out[...] = self.cache.to_original_moves(scores, symmetries)
+
+        return out
+
+    def feed_forward(self, x):
+        """
+        Feed one board through the representation; see feed_forward_batch.
+
+        Parameters
+        ----------
+        x:      NumPy array (16,)
+                Tile values of the board.
+
+        Returns
+        -------
+        o_o:    NumPy array (4,)
+                Output for the board.
+        """
+        return self.feed_forward_batch(np.asarray(x)[np.newaxis])[0]
+
+    def best_moves(self, X, legal=None, out=None, scratch=None):
+        """
+        Pick the highest scoring move for each of a batch of boards; see
+        NeuralNetworkRepresentation.best_moves.
+        """
+        scores = self.feed_forward_batch(X, out=out)
+
+        if legal is not None:
+            scores[~legal] = -np.inf
+
+        return np.argmax(scores, axis=1)
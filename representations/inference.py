@@ -0,0 +1,420 @@
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+
+# seconds a client waits for its result before checking the server is alive
+POLL_INTERVAL = 0.1
+
+
+def _serve(representation,
+           requests,
+           responses,
+           max_batch_size,
+           max_wait,
+           n_batches,
+           n_rows,
+           alive,
+           lifeline):
+    """
+    Answer feed-forward requests in micro-batches until told to stop. Runs in
+    the server process.
+
+    Parameters
+    ----------
+    representation: NeuralNetworkRepresentation object
+                    Network evaluating the requests.
+
+    requests:       multiprocessing Queue
+                    Requests as (client, request, X) tuples; None stops the
+                    server.
+
+    responses:      list of multiprocessing Queues
+                    Queue of each client for its results, as (request, out)
+                    tuples, or (request, exception) if the batch failed.
+
+    max_batch_size: integer
+                    Number of rows after which a batch is run without
+                    waiting for more requests.
+
+    max_wait:       float
+                    Seconds a batch waits, from its first request, for more
+                    requests.
+
+    n_batches:      multiprocessing Value
+                    Number of batches run; updated.
+
+    n_rows:         multiprocessing Value
+                    Number of rows evaluated; updated.
+
+    alive:          multiprocessing Value
+                    Whether or not the server is answering requests; cleared
+                    when this function returns or fails.
+
+    lifeline:       multiprocessing Connection
+                    Sending end of a pipe, held open, never written to, for
+                    as long as the process runs.
+
+    Returns
+    -------
+    None
+    """
+    try:
+        _serve_batches(representation, requests, responses, max_batch_size,
+                       max_wait, n_batches, n_rows)
+    finally:
+        alive.value = 0
+
+
+def _serve_batches(representation,
+                   requests,
+                   responses,
+                   max_batch_size,
+                   max_wait,
+                   n_batches,
+                   n_rows):
+    """
+    Answer requests until told to stop; see _serve.
+    """
+    running = True
+    while running:
+        item = requests.get()
+        if item is None:
+            break
+
+        # gather requests until the batch is full or the wait is over
+        batch = [item]
+        rows = len(item[2])
+        deadline = time.perf_counter() + max_wait
+        while rows < max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = (requests.get(timeout=timeout) if timeout > 0
+                        else requests.get_nowait())
+            except queue.Empty:
+                break
+
+            if item is None:
+                running = False
+                break
+
+            batch.append(item)
+            rows += len(item[2])
+
+        # one dense forward pass for the whole batch
+        try:
+            X = np.concatenate([X for _, _, X in batch])
+            out = representation.feed_forward_batch(X)
+        except Exception as error:
+            for client, request, _ in batch:
+                responses[client].put((request, error))
+            continue
+
+        # hand each client back its own rows
+        start = 0
+        for client, request, X in batch:
+            responses[client].put((request, out[start:start + len(X)]))
+            start += len(X)
+
+        with n_batches.get_lock():
+            n_batches.value += 1
+        with n_rows.get_lock():
+            n_rows.value += rows
+
+
+class InferenceClient:
+    """
+    Handle of one worker on an InferenceServer, usable in place of the
+    server's representation.
+
+    Notes
+    -----
+    Calls block until the server has answered, checking every POLL_INTERVAL
+    seconds that it is still running; they raise RuntimeError once it has
+    stopped, whether it failed, was killed or was stopped with requests
+    pending. A client
+    belongs to one worker at a time; it is given to a worker process when
+    the process is created, for example as an argument of
+    multiprocessing.Process.
+
+    Parameters
+    ----------
+    client_id:  integer
+                Index of the client on its server.
+
+    requests:   multiprocessing Queue
+                Server's request queue.
+
+    responses:  multiprocessing Queue
+                Queue the server puts this client's results on.
+
+    alive:      multiprocessing Value
+                Whether or not the server is answering requests.
+
+    lifeline:   multiprocessing Connection
+                Receiving end of a pipe which only the server process holds
+                open, so it reads end of file once the process is gone.
+    """
+    def __init__(self, client_id, requests, responses, alive, lifeline):
+        self.client_id = client_id
+        self.requests = requests
+        self.responses = responses
+        self.alive = alive
+        self.lifeline = lifeline
+
+        self._n_requests = 0
+
+    def feed_forward_batch(self, X, out=None, scratch=None):
+        """
+        Feed a batch of inputs through the server's network.
+
+        Parameters
+        ----------
+        X:          NumPy array (B, n_i)
+                    Raw inputs to the network, one row per example.
+
+        out:        NumPy array (B, n_o) or None, default None
+                    Array to write the outputs to; allocated if None.
+
+        scratch:    ignored
+                    Accepted for compatibility with
+                    NeuralNetworkRepresentation.
+
+        Returns
+        -------
+        o_o:        NumPy array (B, n_o)
+                    Calculated outputs from the feed-forward calculation,
+                    after the activation function.
+        """
+        request = self._n_requests
+        self._n_requests += 1
+
+        self.requests.put((self.client_id, request, np.asarray(X)))
+        answered, result = self._get_response()
+
+        if answered != request:
+            raise RuntimeError(
+                'Client {c} received the result of request {a} while '
+                'waiting for request {r}.'.format(c=self.client_id,
+                                                  a=answered, r=request)
+            )
+        if isinstance(result, Exception):
+            raise result
+
+        if out is None:
+            return result
+
+        out[...] = result
+        return out
+
+    def _get_response(self):
+        """
+        Wait for the server's next answer to this client.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        response:   tuple
+                    Request number and its result.
+        """
+        while True:
+            try:
+                return self.responses.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+            # a process killed outside Python cannot clear the flag itself,
+            # but the system closes its end of the lifeline
+            if not self.alive.value or self.lifeline.poll():
+                # the answer may have been put just before the server ended
+                try:
+                    return self.responses.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    raise RuntimeError(
+                        'The inference server stopped before answering '
+                        'client {c}.'.format(c=self.client_id)
+                    )
+
+    def feed_forward(self, x):
+        """
+        Feed a given set of inputs through the server's network.
+
+        Parameters
+        ----------
+        x:      NumPy array, size of input layer
+                These are the raw inputs to the network.
+
+        Returns
+        -------
+        o_o:    Numpy array, size of output layer
+                These are the calculated outputs from the feed-forward
+                calculation, after the activation function.
+        """
+        return self.feed_forward_batch(np.asarray(x)[np.newaxis])[0]
+
+    def best_moves(self, X, legal=None, out=None, scratch=None):
+        """
+        Pick the highest scoring move for each of a batch of inputs; see
+        NeuralNetworkRepresentation.best_moves.
+        """
+        scores = self.feed_forward_batch(X, out=out)
+
+        if legal is not None:
+            scores[~legal] = -np.inf
+
+        return np.argmax(scores, axis=1)
+
+
+class InferenceServer:
+    """
+    A process evaluating a network for many worker processes, in dynamic
+    micro-batches.
+
+    Notes
+    -----
+    Workers send their inputs, typically one board at a time, through
+    InferenceClient objects to a single queue. The server process takes the
+    first request waiting, then keeps gathering requests until it holds
+    max_batch_size rows or max_wait seconds have passed, and runs them in one
+    forward pass, so the dispatch overhead of the network is paid once per
+    batch rather than once per board. Each client's rows go back on its own
+    queue. A request larger than max_batch_size is run whole. Worker
+    processes are started after the server, so that clients can tell when
+    the server process has gone.
+
+    Workers then only simulate games, while one process does dense matrix
+    products. A larger max_wait fills batches better at the cost of latency
+    per move; it should stay well below the time a worker spends between
+    requests times the number of workers.
+
+    Parameters
+    ----------
+    representation: NeuralNetworkRepresentation object
+                    Network to evaluate; the server process works on its own
+                    copy.
+
+    n_clients:      integer, default 1
+                    Number of clients, one per worker.
+
+    max_batch_size: integer, default 256
+                    Number of rows after which a batch is run without waiting
+                    for more requests.
+
+    max_wait:       float, default 0.001
+                    Seconds a batch waits, from its first request, for more
+                    requests.
+
+    context:        string or None, default None
+                    Multiprocessing start method (fork, spawn or forkserver);
+                    the platform default if None.
+
+    Attributes
+    ----------
+    clients:        list
+                    InferenceClient object of each worker.
+    """
+    def __init__(self,
+                 representation,
+                 n_clients=1,
+                 max_batch_size=256,
+                 max_wait=0.001,
+                 context=None):
+        self.representation = representation
+        self.n_clients = n_clients
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.context = context
+
+        ctx = multiprocessing.get_context(context)
+        self._requests = ctx.Queue()
+        self._responses = [ctx.Queue() for _ in range(n_clients)]
+        self._n_batches = ctx.Value('q', 0)
+        self._n_rows = ctx.Value('q', 0)
+        self._alive = ctx.Value('b', 0)
+        lifeline, self._lifeline = ctx.Pipe(duplex=False)
+        self._process = ctx.Process(
+            target=_serve,
+            args=(representation, self._requests, self._responses,
+                  max_batch_size, max_wait, self._n_batches, self._n_rows,
+                  self._alive, self._lifeline),
+            daemon=True
+        )
+
+        self.clients = [
+            InferenceClient(i, self._requests, responses, self._alive,
+                            lifeline)
+            for i, responses in enumerate(self._responses)
+        ]
+
+    def start(self):
+        """
+        Start the server process.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        # alive from the start, so early requests wait for the process
+        self._alive.value = 1
+        self._process.start()
+
+        # only the server process holds the lifeline open from now on;
+        # workers must be started after this to see it close
+        self._lifeline.close()
+
+    def stop(self, timeout=None):
+        """
+        Stop the server process once the requests already sent are answered.
+
+        Parameters
+        ----------
+        timeout:    float or None, default None
+                    Seconds to wait for the process to end (forever if None).
+
+        Returns
+        -------
+        None
+        """
+        if self._process.is_alive():
+            self._requests.put(None)
+            self._process.join(timeout)
+
+        if not self._process.is_alive():
+            self._alive.value = 0
+
+    @property
+    def n_batches(self):
+        """
+        Number of batches run so far.
+        """
+        return self._n_batches.value
+
+    @property
+    def n_rows(self):
+        """
+        Number of rows evaluated so far.
+        """
+        return self._n_rows.value
+
+    @property
+    def mean_batch_size(self):
+        """
+        Mean number of rows per batch run so far.
+        """
+        return self.n_rows / max(1, self.n_batches)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
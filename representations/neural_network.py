@@ -1,6 +1,172 @@
 import numpy as np 
 
 from representations.base import BaseRepresentation
+from representations.optimizers import SGD
+
+
+def sigmoid(x, out=None):
+    """
+    Sigmoid activation function.
+
+    Parameters
+    ----------
+    x:      NumPy array
+            Inputs to the activation.
+
+    out:    NumPy array or None, default None
+            Array to write the result to; may be x itself.
+
+    Returns
+    -------
+    y:      NumPy array
+            Activated values.
+    """
+    out = np.negative(x, out=out)
+    np.exp(out, out=out)
+    out += 1
+    np.reciprocal(out, out=out)
+
+    return out
+
+
+def softmax(x, out=None):
+    """
+    Softmax activation function, applied along the last axis.
+
+    Parameters
+    ----------
+    x:      NumPy array
+            Inputs to the activation.
+
+    out:    NumPy array or None, default None
+            Array to write the result to; may be x itself.
+
+    Returns
+    -------
+    y:      NumPy array
+            Activated values; each row sums to one.
+    """
+    # shift by the maximum for numerical stability
+    out = np.subtract(x, np.max(x, axis=-1, keepdims=True), out=out)
+    np.exp(out, out=out)
+    out /= np.sum(out, axis=-1, keepdims=True)
+
+    return out
+
+
+def relu(x, out=None):
+    """
+    Rectified linear activation function.
+
+    Parameters
+    ----------
+    x:      NumPy array
+            Inputs to the activation.
+
+    out:    NumPy array or None, default None
+            Array to write the result to; may be x itself.
+
+    Returns
+    -------
+    y:      NumPy array
+            Activated values.
+    """
+    return np.maximum(x, 0, out=out)
+
+
+ACTIVATIONS = {
+    'sigmoid': sigmoid,
+    'softmax': softmax,
+    'relu': relu
+}
+
+
+def sigmoid_gradient(y, g, out=None):
+    """
+    Back-propagate a gradient through the sigmoid activation function.
+
+    Parameters
+    ----------
+    y:      NumPy array
+            Activated values.
+
+    g:      NumPy array
+            Gradient of the loss with respect to the activated values.
+
+    out:    NumPy array or None, default None
+            Array to write the result to; may be g itself.
+
+    Returns
+    -------
+    d:      NumPy array
+            Gradient of the loss with respect to the activation inputs.
+    """
+    # g * y * (1 - y)
+    out = np.multiply(g, y, out=out)
+    out -= out * y
+
+    return out
+
+
+def softmax_gradient(y, g, out=None):
+    """
+    Back-propagate a gradient through the softmax activation function.
+
+    Parameters
+    ----------
+    y:      NumPy array
+            Activated values.
+
+    g:      NumPy array
+            Gradient of the loss with respect to the activated values.
+
+    out:    NumPy array or None, default None
+            Array to write the result to; may be g itself.
+
+    Returns
+    -------
+    d:      NumPy array
+            Gradient of the loss with respect to the activation inputs.
+    """
+    # y * (g - sum(g * y)), row by row
+    dot = np.sum(g * y, axis=-1, keepdims=True)
+    out = np.subtract(g, dot, out=out)
+    out *= y
+
+    return out
+
+
+def relu_gradient(y, g, out=None):
+    """
+    Back-propagate a gradient through the rectified linear activation
+    function.
+
+    Parameters
+    ----------
+    y:      NumPy array
+            Activated values.
+
+    g:      NumPy array
+            Gradient of the loss with respect to the activated values.
+
+    out:    NumPy array or None, default None
+            Array to write the result to; may be g itself.
+
+    Returns
+    -------
+    d:      NumPy array
+            Gradient of the loss with respect to the activation inputs.
+    """
+    return np.multiply(g, y > 0, out=out)
+
+
+ACTIVATION_GRADIENTS = {
+    'sigmoid': sigmoid_gradient,
+    'softmax': softmax_gradient,
+    'relu': relu_gradient
+}
+
+LOSSES = ('value', 'policy')
 
 
 class NeuralNetworkRepresentation(BaseRepresentation):
@@ -29,6 +195,10 @@ class NeuralNetworkRepresentation(BaseRepresentation):
     seed:       integer, default 1234
                 Seed for the random number generator.
 
+    dtype:      string, default float64
+                NumPy data type of the weights, biases and outputs; float32
+                halves memory traffic during batched inference.
+
     initialize: bool, default True
                 Whether or not to initialize the weights and biases upon
                 construction.
@@ -45,25 +215,36 @@ class NeuralNetworkRepresentation(BaseRepresentation):
                  activation='sigmoid',
                  seed=1234, 
                  initialize=True,
-                 normalize_input=True):
+                 normalize_input=True,
+                 dtype='float64'):
         self.n_i = n_i 
         self.n_h = n_h 
         self.n_o = n_o 
+        self.activation = activation
         self.seed = seed 
+        self.dtype = dtype
 
         # initialize weights and biases
-        self.W_i_h = np.empty((n_i, n_h))
-        self.b_i_h = np.empty(n_h)
-        self.W_h_o = np.empty((n_h, n_o))
-        self.b_h_o = np.empty(n_o)
-
-        # softmax activation function 
-        if activation == 'softmax':
-            self.activation_function = lambda x: np.exp(x) / np.sum(np.exp(x))
-        elif activation == 'sigmoid':
-            self.activation_function = lambda x: 1 / (1 + np.exp(-x))
-        elif activation == 'relu':
-            self.activation_function = lambda x: np.max(0, x)
+        self.W_i_h = np.empty((n_i, n_h), dtype=dtype)
+        self.b_i_h = np.empty(n_h, dtype=dtype)
+        self.W_h_o = np.empty((n_h, n_o), dtype=dtype)
+        self.b_h_o = np.empty(n_o, dtype=dtype)
+
+        # activation function
+        try:
+            self.activation_function = ACTIVATIONS[activation]
+            self.activation_gradient = ACTIVATION_GRADIENTS[activation]
+        except KeyError:
+            raise ValueError('Unknown activation {}'.format(activation))
+
+        # scratch buffers for batched inference and training, keyed by batch
+        # size, and gradient buffers, allocated on first use
+        self._scratch = dict()
+        self._train_scratch = dict()
+        self._gradients = None
+
+        # optimizer used by fit_batch when none is given
+        self._optimizer = SGD()
 
         # initialize if indicated
         if initialize == True:
@@ -88,28 +269,28 @@ class NeuralNetworkRepresentation(BaseRepresentation):
         np.random.seed(self.seed)
 
         # weights from input layer to hidden layer
-        self.W_i_h = np.random.normal(
+        self.W_i_h[...] = np.random.normal(
             0.0, 
             self.n_i ** -0.5, 
             self.W_i_h.shape
         )
 
         # biases from input layer to hidden layer
-        self.b_i_h = np.random.normal(
+        self.b_i_h[...] = np.random.normal(
             0.0,
             self.n_i ** -0.5,
             self.b_i_h.shape
         )
 
         # weights from hidden layer to output layer
-        self.w_h_o = np.random.normal(
+        self.W_h_o[...] = np.random.normal(
             0.0,
             self.n_h ** -0.5,
             self.W_h_o.shape
         )
 
         # biases from hidden layer to output layer 
-        self.b_h_o = np.random.normal(
+        self.b_h_o[...] = np.random.normal(
             0.0,
             self.n_h ** -0.5,
             self.b_h_o.shape 
@@ -132,23 +313,28 @@ class NeuralNetworkRepresentation(BaseRepresentation):
 
         b_h_o:  NumPy array or None, size of networks current b_h_o array
                 Biases between hidden and output layers.
+
+        Notes
+        -----
+        Parameters are copied into the network's existing arrays, so views
+        of those arrays (such as the members of a NeuralNetworkPopulation)
+        stay in sync.
         """
         # if given and appropriate shape, update input-to-hidden weights
         if W_i_h is not None and W_i_h.shape == self.W_i_h.shape:
-            self.W_i_h = W_i_h 
+            self.W_i_h[...] = W_i_h 
 
         # if given and appropriate shape, update input-to-hidden biases
         if b_i_h is not None and b_i_h.shape == self.b_i_h.shape:
-            self.b_i_h = b_i_h 
+            self.b_i_h[...] = b_i_h 
 
         # if given and appropriate shape, update hidden-to-output weights 
         if W_h_o is not None and W_h_o.shape == self.W_h_o.shape:
-            self.W_h_o = W_h_o 
+            self.W_h_o[...] = W_h_o 
 
         # if given and appropriate shape, update hidden-to-output biases
         if b_h_o is not None and b_h_o.shape == self.b_h_o.shape:
-            print(b_h_o)
-            self.b_h_o = b_h_o 
+            self.b_h_o[...] = b_h_o 
 
     def feed_forward(self, x):
         """
@@ -159,23 +345,371 @@ class NeuralNetworkRepresentation(BaseRepresentation):
         x:      NumPy array, size of input layer
                 These are the raw inputs to the network.
 
+        Returns
+        -------
         o_o:    Numpy array, size of output layer
                 These are the calculated outputs from the feed-forward 
-                calculation. A softmax has been applied to convert them to
-                probabilities.
+                calculation, after the activation function.
+        """
+        return self.feed_forward_batch(np.asarray(x)[np.newaxis])[0]
+
+    def _get_scratch(self, batch_size):
+        """
+        Retrieve the scratch buffers for a batch size, allocating them on
+        first use.
+
+        Parameters
+        ----------
+        batch_size: integer
+                    Number of rows in the batch.
+
+        Returns
+        -------
+        scratch:    tuple of NumPy arrays
+                    Buffers for the normalized inputs (batch_size, n_i) and
+                    the hidden layer (batch_size, n_h).
+        """
+        scratch = self._scratch.get(batch_size)
+
+        if scratch is None:
+            scratch = (
+                np.empty((batch_size, self.n_i), dtype=self.dtype),
+                np.empty((batch_size, self.n_h), dtype=self.dtype)
+            )
+            self._scratch[batch_size] = scratch
+
+        return scratch
+
+    def feed_forward_batch(self, X, out=None, scratch=None):
         """
+        Feed a batch of inputs through the network.
+
+        Parameters
+        ----------
+        X:          NumPy array (B, n_i)
+                    Raw inputs to the network, one row per example.
+
+        out:        NumPy array (B, n_o) or None, default None
+                    Array to write the outputs to; allocated if None.
+
+        scratch:    tuple of NumPy arrays or None, default None
+                    Buffers of shape (B, n_i) and (B, n_h) for the normalized
+                    inputs and hidden layer. If None, buffers kept by the
+                    network are reused between calls of the same batch size.
+
+        Returns
+        -------
+        o_o:        NumPy array (B, n_o)
+                    Calculated outputs from the feed-forward calculation,
+                    after the activation function.
+        """
+        if scratch is None:
+            scratch = self._get_scratch(len(X))
+        i, h = scratch
+
+        if out is None:
+            out = np.empty((len(X), self.n_o), dtype=self.dtype)
+
         # normalize the input layer
         if self.normalize_input == True:
-            i = self.normalize(x)
-        else: 
-            i = x
+            i = self.normalize(X, out=i)
+        else:
+            i = X
 
         # calculate the hidden layer inputs and outputs
-        h_i = np.dot(i, self.W_i_h + self.b_i_h)
-        h_o = self.activation_function(h_i)
+        np.matmul(i, self.W_i_h, out=h)
+        h += self.b_i_h
+        self.activation_function(h, out=h)
+
+        # calculate the output layer inputs and outputs
+        np.matmul(h, self.W_h_o, out=out)
+        out += self.b_h_o
+        self.activation_function(out, out=out)
+
+        return out
+
+    def best_moves(self, X, legal=None, out=None, scratch=None):
+        """
+        Pick the highest scoring move for each of a batch of inputs.
+
+        Parameters
+        ----------
+        X:          NumPy array (B, n_i)
+                    Raw inputs to the network, one row per example.
+
+        legal:      NumPy array (B, n_o) of booleans or None, default None
+                    Whether or not each move is legal for each example;
+                    illegal moves are never picked unless no move is legal.
+
+        out:        NumPy array (B, n_o) or None, default None
+                    Array to write the network outputs to; see
+                    feed_forward_batch.
+
+        scratch:    tuple of NumPy arrays or None, default None
+                    Buffers for the intermediate results; see
+                    feed_forward_batch.
+
+        Returns
+        -------
+        moves:      NumPy array (B,) of integers
+                    Index of the picked output for each example.
+        """
+        scores = self.feed_forward_batch(X, out=out, scratch=scratch)
+
+        if legal is not None:
+            scores[~legal] = -np.inf
+
+        return np.argmax(scores, axis=1)
 
-        # calculate the inputs to the output layer
-        o_i = np.dot(h_o, self.W_h_o + self.b_h_o)
-        o_o = self.activation_function(o_i)
+    def parameters(self):
+        """
+        Trainable arrays of the network.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        params:     list of NumPy arrays
+                    W_i_h, b_i_h, W_h_o and b_h_o, in that order; the arrays
+                    themselves, not copies.
+        """
+        return [self.W_i_h, self.b_i_h, self.W_h_o, self.b_h_o]
+
+    def get_arrays(self):
+        """
+        Get the weights and biases of the network.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        arrays:     dictionary
+                    W_i_h, b_i_h, W_h_o and b_h_o by name.
+        """
+        return dict(zip(['W_i_h', 'b_i_h', 'W_h_o', 'b_h_o'],
+                        self.parameters()))
+
+    def set_arrays(self, arrays):
+        """
+        Replace the weights and biases of the network, without copying.
+
+        Parameters
+        ----------
+        arrays:     dictionary
+                    W_i_h, b_i_h, W_h_o and b_h_o by name, such as read-only
+                    memory maps of a checkpoint; train only on writable
+                    arrays.
 
-        return o_o
\ No newline at end of file
+        Returns
+        -------
+        None
+        """
+        for name, param in zip(['W_i_h', 'b_i_h', 'W_h_o', 'b_h_o'],
+                               self.parameters()):
+            if arrays[name].shape != param.shape:
+                raise ValueError(
+                    '{n} of shape {s} does not match this network.'.format(
+                        n=name,
+                        s=arrays[name].shape
+                    )
+                )
+
+        self.W_i_h = arrays['W_i_h']
+        self.b_i_h = arrays['b_i_h']
+        self.W_h_o = arrays['W_h_o']
+        self.b_h_o = arrays['b_h_o']
+        self._gradients = None
+
+    def _get_gradients(self):
+        """
+        Retrieve the gradient buffers, allocating them on first use.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        gradients:  list of NumPy arrays
+                    Buffers shaped like each array of parameters().
+        """
+        if self._gradients is None:
+            self._gradients = [np.zeros_like(p) for p in self.parameters()]
+
+        return self._gradients
+
+    def _get_train_scratch(self, batch_size):
+        """
+        Retrieve the training buffers for a batch size, allocating them on
+        first use.
+
+        Parameters
+        ----------
+        batch_size: integer
+                    Number of rows in the batch.
+
+        Returns
+        -------
+        scratch:    tuple of NumPy arrays
+                    Buffers for the outputs and their gradient (batch_size,
+                    n_o), and the hidden layer gradient (batch_size, n_h).
+        """
+        scratch = self._train_scratch.get(batch_size)
+
+        if scratch is None:
+            scratch = (
+                np.empty((batch_size, self.n_o), dtype=self.dtype),
+                np.empty((batch_size, self.n_o), dtype=self.dtype),
+                np.empty((batch_size, self.n_h), dtype=self.dtype)
+            )
+            self._train_scratch[batch_size] = scratch
+
+        return scratch
+
+    def backward(self, X, o, g_o, scratch=None):
+        """
+        Back-propagate the gradient of a loss through the network, for the
+        inputs most recently fed forward with feed_forward_batch.
+
+        Parameters
+        ----------
+        X:          NumPy array (B, n_i)
+                    Raw inputs given to feed_forward_batch.
+
+        o:          NumPy array (B, n_o)
+                    Outputs returned by feed_forward_batch.
+
+        g_o:        NumPy array (B, n_o)
+                    Gradient of the loss with respect to the outputs returned
+                    by feed_forward_batch; overwritten.
+
+        scratch:    tuple of NumPy arrays or None, default None
+                    Buffers given to feed_forward_batch, holding the
+                    normalized inputs and hidden layer; the network's own
+                    buffers for this batch size if None.
+
+        Returns
+        -------
+        gradients:  list of NumPy arrays
+                    Gradient of the loss with respect to each array of
+                    parameters(); buffers reused by the next call.
+        """
+        if scratch is None:
+            scratch = self._get_scratch(len(X))
+        i, h = scratch
+        if self.normalize_input != True:
+            i = X
+
+        g_h = self._get_train_scratch(len(X))[2]
+        g_W_i_h, g_b_i_h, g_W_h_o, g_b_h_o = self._get_gradients()
+
+        # gradient with respect to the output layer inputs
+        d_o = self.activation_gradient(o, g_o, out=g_o)
+
+        # hidden-to-output weights and biases
+        np.matmul(h.T, d_o, out=g_W_h_o)
+        np.sum(d_o, axis=0, out=g_b_h_o)
+
+        # gradient with respect to the hidden layer inputs
+        np.matmul(d_o, self.W_h_o.T, out=g_h)
+        d_h = self.activation_gradient(h, g_h, out=g_h)
+
+        # input-to-hidden weights and biases
+        np.matmul(i.T, d_h, out=g_W_i_h)
+        np.sum(d_h, axis=0, out=g_b_i_h)
+
+        return self._gradients
+
+    def fit_batch(self,
+                  X,
+                  targets,
+                  moves=None,
+                  loss='value',
+                  optimizer=None,
+                  weights=None):
+        """
+        Take one optimization step on a minibatch.
+
+        Parameters
+        ----------
+        X:          NumPy array (B, n_i)
+                    Raw inputs to the network, one row per example.
+
+        targets:    NumPy array (B,) or (B, n_o)
+                    For the value loss, the target of the output of each
+                    example's move, or of every output if moves is None.
+                    For the policy loss, the advantage of each example's
+                    move.
+
+        moves:      NumPy array (B,) of integers or None, default None
+                    Index of the output (move) taken in each example;
+                    required by the policy loss.
+
+        loss:       string, default value
+                    Loss to minimize:
+                        value:  half the mean squared error between outputs
+                                and targets (value or Q-value regression).
+                        policy: minus the mean of advantage times the log of
+                                the move's output (policy gradient); the
+                                outputs must be positive, as with sigmoid or
+                                softmax activations.
+
+        optimizer:  SGD or Adam object or None, default None
+                    Optimizer updating the parameters in place; plain SGD
+                    with the default learning rate if None. Pass the same
+                    object every step to keep its state.
+
+        weights:    NumPy array (B,) or None, default None
+                    Weight of each example in the loss, such as importance
+                    sampling weights; all ones if None.
+
+        Returns
+        -------
+        loss:       float
+                    Loss of the minibatch before the update.
+        """
+        if loss not in LOSSES:
+            raise ValueError('Unknown loss {}'.format(loss))
+
+        if moves is None and loss == 'policy':
+            raise ValueError('The policy loss requires the moves taken.')
+
+        if optimizer is None:
+            optimizer = self._optimizer
+
+        batch_size = len(X)
+        o, g_o, _ = self._get_train_scratch(batch_size)
+        self.feed_forward_batch(X, out=o)
+
+        # contribution of each example to the mean loss
+        if weights is None:
+            scale = np.full(batch_size, 1 / batch_size)
+        else:
+            scale = np.asarray(weights) / batch_size
+
+        # gradient of the loss with respect to the outputs
+        if moves is None:
+            np.subtract(o, targets, out=g_o)
+            value = 0.5 * np.sum(scale[:, np.newaxis] * np.square(g_o))
+            g_o *= scale[:, np.newaxis]
+        else:
+            rows = np.arange(batch_size)
+            taken = o[rows, moves]
+            g_o[...] = 0
+
+            if loss == 'value':
+                error = taken - targets
+                value = 0.5 * np.sum(scale * np.square(error))
+                g_o[rows, moves] = scale * error
+            else:
+                taken = np.maximum(taken, np.finfo(o.dtype).tiny)
+                value = -np.sum(scale * targets * np.log(taken))
+                g_o[rows, moves] = -scale * targets / taken
+
+        optimizer.step(self.parameters(), self.backward(X, o, g_o))
+
+        return float(value)
@@ -0,0 +1,348 @@
+import numpy as np
+
+from envs.batch import move_boards
+from envs.symmetry import CELL_PERMUTATIONS, N_SYMMETRIES
+from representations.base import BaseRepresentation
+
+
+# cells of the default tuples: two rows and three 2x2 squares; with their
+# symmetric versions they cover every row, column and square of the board
+DEFAULT_TUPLES = [
+    [0, 1, 2, 3],           # outer row
+    [4, 5, 6, 7],           # inner row
+    [0, 1, 4, 5],           # corner square
+    [1, 2, 5, 6],           # edge square
+    [5, 6, 9, 10]           # center square
+]
+
+# the 6-tuples commonly used for strong play; their tables take 256 MB
+LARGE_TUPLES = [
+    [0, 1, 2, 3, 4, 5],
+    [4, 5, 6, 7, 8, 9],
+    [0, 1, 2, 4, 5, 6],
+    [4, 5, 6, 8, 9, 10]
+]
+
+
+class NTupleRepresentation(BaseRepresentation):
+    """
+    Class for the n-tuple network representation.
+
+    Notes
+    -----
+    An n-tuple network values a board as a sum of table lookups. Each tuple is
+    a list of cells; the tile exponents found in those cells index a table of
+    16 ** n weights. Every tuple is also read in its 8 symmetric versions,
+    which share the tuple's table, so the value of a board does not depend on
+    its rotation or reflection.
+
+    All tables live in one flat weights array, so a board is summarized by
+    the positions in that array of its lookups (its indices). The indices of
+    a board which differs from a known board in a few cells are found by
+    recomputing only the lookups touching those cells.
+
+    Parameters
+    ----------
+    tuples:         list or None, default None
+                    Cells of each tuple, numbered 4 * row + column; the
+                    DEFAULT_TUPLES if None.
+
+    learning_rate:  float, default 0.1
+                    Step size of the learn method, shared between all
+                    lookups of a board.
+
+    dtype:          string, default float32
+                    NumPy data type of the weights.
+
+    Attributes
+    ----------
+    weights:        NumPy array
+                    All weights, table after table.
+
+    tables:         list
+                    Views of the weights array, one table per tuple.
+    """
+    def __init__(self, tuples=None, learning_rate=0.1, dtype='float32'):
+        self.tuples = tuples
+        self.learning_rate = learning_rate
+        self.dtype = dtype
+
+        if tuples is None:
+            tuples = DEFAULT_TUPLES
+
+        # every symmetric version of every tuple is one lookup
+        n_max = max(len(cells) for cells in tuples)
+        n_lookups = len(tuples) * N_SYMMETRIES
+        self._cells = np.zeros((n_lookups, n_max), dtype=np.int64)
+        self._powers = np.zeros((n_lookups, n_max), dtype=np.int64)
+        self._offsets = np.zeros(n_lookups, dtype=np.int64)
+
+        sizes = [16 ** len(cells) for cells in tuples]
+        starts = np.concatenate([[0], np.cumsum(sizes)])
+
+        for t, cells in enumerate(tuples):
+            for symmetry in range(N_SYMMETRIES):
+                k = t * N_SYMMETRIES + symmetry
+                n = len(cells)
+
+                # reading these cells of a board reads the tuple's cells of
+                # the board transformed by the symmetry
+                self._cells[k, :n] = CELL_PERMUTATIONS[symmetry][cells]
+                self._powers[k, :n] = 16 ** np.arange(n)
+                self._offsets[k] = starts[t]
+
+        # which lookups read each cell
+        self._touches = np.zeros((16, n_lookups), dtype=bool)
+        for k in range(n_lookups):
+            n = np.count_nonzero(self._powers[k])
+            self._touches[self._cells[k, :n], k] = True
+
+        self.weights = np.zeros(starts[-1], dtype=dtype)
+        self._set_tables()
+
+    def _set_tables(self):
+        """
+        Point the per-tuple tables at the weights array.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        tuples = self.tuples if self.tuples is not None else DEFAULT_TUPLES
+        self.tables = []
+        start = 0
+        for cells in tuples:
+            size = 16 ** len(cells)
+            self.tables.append(self.weights[start:start + size])
+            start += size
+
+    @property
+    def n_lookups(self):
+        """
+        Number of lookups making up the value of a board.
+        """
+        return len(self._offsets)
+
+    def indices(self, boards):
+        """
+        Positions in the weights array of the lookups of boards.
+
+        Parameters
+        ----------
+        boards:     NumPy array (16,) or (N, 16)
+                    Tile exponents of a board, or of one board per row.
+
+        Returns
+        -------
+        indices:    NumPy array (n_lookups,) or (N, n_lookups)
+                    Positions of each board's lookups.
+        """
+        boards = np.asarray(boards, dtype=np.int64)
+
+        return self._offsets + np.sum(
+            boards[..., self._cells] * self._powers,
+            axis=-1
+        )
+
+    def update_indices(self, indices, board, new_board):
+        """
+        Positions of the lookups of a board, given those of a similar board.
+
+        Parameters
+        ----------
+        indices:    NumPy array (n_lookups,)
+                    Positions of the lookups of board.
+
+        board:      NumPy array (16,)
+                    Tile exponents of the known board.
+
+        new_board:  NumPy array (16,)
+                    Tile exponents of the board to index.
+
+        Returns
+        -------
+        indices:    NumPy array (n_lookups,)
+                    Positions of the lookups of new_board; only the lookups
+                    touching changed cells are recomputed.
+        """
+        changed = np.flatnonzero(board != new_board)
+        affected = np.flatnonzero(self._touches[changed].any(axis=0))
+
+        indices = indices.copy()
+        indices[affected] = self._offsets[affected] + np.sum(
+            np.asarray(new_board, dtype=np.int64)[self._cells[affected]] *
+            self._powers[affected],
+            axis=-1
+        )
+
+        return indices
+
+    def evaluate_indices(self, indices):
+        """
+        Value of boards from the positions of their lookups.
+
+        Parameters
+        ----------
+        indices:    NumPy array (n_lookups,) or (N, n_lookups)
+                    Positions of the lookups of a board, or of each board.
+
+        Returns
+        -------
+        value:      float or NumPy array (N,)
+                    Value of the board, or of each board.
+        """
+        return np.sum(self.weights[indices], axis=-1)
+
+    def evaluate(self, boards):
+        """
+        Value of boards.
+
+        Parameters
+        ----------
+        boards:     NumPy array (16,) or (N, 16)
+                    Tile exponents of a board, or of one board per row.
+
+        Returns
+        -------
+        value:      float or NumPy array (N,)
+                    Value of the board, or of each board.
+        """
+        return self.evaluate_indices(self.indices(boards))
+
+    def learn(self, indices, target):
+        """
+        Move the value of a board towards a target.
+
+        Parameters
+        ----------
+        indices:    NumPy array (n_lookups,)
+                    Positions of the lookups of the board.
+
+        target:     float
+                    Value the board should have.
+
+        Returns
+        -------
+        error:      float
+                    Target minus the value of the board before the update.
+        """
+        error = target - self.evaluate_indices(indices)
+
+        # repeated lookups are each updated
+        step = self.learning_rate * error / self.n_lookups
+        np.add.at(self.weights, indices, step)
+
+        return error
+
+    def best_moves(self, boards, legal=None):
+        """
+        Pick, for each board, the move with the best score gained plus value
+        of the board it leads to.
+
+        Parameters
+        ----------
+        boards:     NumPy array (N, 16)
+                    Tile exponents of each board.
+
+        legal:      NumPy array (N, 4) of booleans or None, default None
+                    Whether or not each move in envs.engine.MOVES is legal
+                    for each board.
+
+        Returns
+        -------
+        moves:      NumPy array (N,) of integers
+                    Index in envs.engine.MOVES of the picked move.
+        """
+        n = len(boards)
+
+        # every move from every board at once
+        after, score_add, moved = move_boards(
+            np.repeat(boards, 4, axis=0),
+            np.tile(np.arange(4), n)
+        )
+        values = (score_add + self.evaluate(after)).reshape(n, 4)
+
+        if legal is None:
+            legal = moved.reshape(n, 4)
+        values[~legal] = -np.inf
+
+        return np.argmax(values, axis=1)
+
+    def get_arrays(self):
+        """
+        Get the weights of the network.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        arrays:     dictionary
+                    The weights array, by name.
+        """
+        return {'weights': self.weights}
+
+    def set_arrays(self, arrays):
+        """
+        Replace the weights of the network, without copying.
+
+        Parameters
+        ----------
+        arrays:     dictionary
+                    The weights array, by name, such as a read-only memory
+                    map of a checkpoint.
+
+        Returns
+        -------
+        None
+        """
+        weights = arrays['weights']
+
+        if weights.shape != self.weights.shape:
+            raise ValueError(
+                'Weights of shape {s} do not match the tuples of this '
+                'network.'.format(s=weights.shape)
+            )
+
+        self.weights = weights
+        self._set_tables()
+
+    def save_weights(self, filename):
+        """
+        Save the weights to a NumPy .npy file.
+
+        Parameters
+        ----------
+        filename:   string
+                    File name for the weights.
+
+        Returns
+        -------
+        None
+        """
+        np.save(filename, self.weights)
+
+    def load_weights(self, filename, mmap_mode='r'):
+        """
+        Load weights saved by save_weights.
+
+        Parameters
+        ----------
+        filename:   string
+                    File name of the weights.
+
+        mmap_mode:  string or None, default r
+                    Memory-map the file with this mode instead of reading it
+                    (see numpy.load); the default shares one read-only copy
+                    between processes. Use r+ or None to keep learning.
+
+        Returns
+        -------
+        None
+        """
+        self.set_arrays({'weights': np.load(filename, mmap_mode=mmap_mode)})
@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class SGD:
+    """
+    Class object for stochastic gradient descent, with optional momentum.
+
+    Notes
+    -----
+    Parameters are updated in place, and the momentum buffers are allocated
+    once, on the first step, so training does not reallocate arrays.
+
+    Parameters
+    ----------
+    learning_rate:  float, default 0.01
+                    Step size.
+
+    momentum:       float, default 0.0
+                    Fraction of the previous update added to each update.
+    """
+    def __init__(self, learning_rate=0.01, momentum=0.0):
+        self.learning_rate = learning_rate
+        self.momentum = momentum
+
+        self._velocity = None
+
+    def step(self, params, grads):
+        """
+        Update parameters, in place, from their gradients.
+
+        Parameters
+        ----------
+        params:     list of NumPy arrays
+                    Parameters to update.
+
+        grads:      list of NumPy arrays
+                    Gradient of the loss with respect to each parameter.
+
+        Returns
+        -------
+        None
+        """
+        if self.momentum == 0:
+            for param, grad in zip(params, grads):
+                param -= self.learning_rate * grad
+            return
+
+        if self._velocity is None:
+            self._velocity = [np.zeros_like(param) for param in params]
+
+        for param, grad, velocity in zip(params, grads, self._velocity):
+            velocity *= self.momentum
+            velocity -= self.learning_rate * grad
+            param += velocity
+
+
+class Adam:
+    """
+    Class object for the Adam optimizer.
+
+    Notes
+    -----
+    Parameters are updated in place, and the moment buffers are allocated
+    once, on the first step, so training does not reallocate arrays.
+
+    Parameters
+    ----------
+    learning_rate:  float, default 0.001
+                    Step size.
+
+    beta_1:         float, default 0.9
+                    Decay rate of the first moment estimates.
+
+    beta_2:         float, default 0.999
+                    Decay rate of the second moment estimates.
+
+    epsilon:        float, default 1e-8
+                    Small constant for numerical stability.
+    """
+    def __init__(self,
+                 learning_rate=0.001,
+                 beta_1=0.9,
+                 beta_2=0.999,
+                 epsilon=1e-8):
+        self.learning_rate = learning_rate
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+
+        self._m = None
+        self._v = None
+        self._scratch = None
+        self._t = 0
+
+    def step(self, params, grads):
+        """
+        Update parameters, in place, from their gradients.
+
+        Parameters
+        ----------
+        params:     list of NumPy arrays
+                    Parameters to update.
+
+        grads:      list of NumPy arrays
+                    Gradient of the loss with respect to each parameter.
+
+        Returns
+        -------
+        None
+        """
+        if self._m is None:
+            self._m = [np.zeros_like(param) for param in params]
+            self._v = [np.zeros_like(param) for param in params]
+            self._scratch = [np.zeros_like(param) for param in params]
+
+        self._t += 1
+        step_size = (self.learning_rate *
+                     np.sqrt(1 - self.beta_2 ** self._t) /
+                     (1 - self.beta_1 ** self._t))
+
+        for param, grad, m, v, scratch in zip(params, grads, self._m,
+                                              self._v, self._scratch):
+            # update the moment estimates
+            m *= self.beta_1
+            m += (1 - self.beta_1) * grad
+            v *= self.beta_2
+            v += (1 - self.beta_2) * np.square(grad, out=scratch)
+
+            # param -= step_size * m / (sqrt(v) + epsilon)
+            np.sqrt(v, out=scratch)
+            scratch += self.epsilon
+            np.divide(m, scratch, out=scratch)
+            scratch *= step_size
+            param -= scratch
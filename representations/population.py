@@ -0,0 +1,342 @@
+import numpy as np
+
+from representations.base import BaseRepresentation
+from representations.neural_network import (
+    ACTIVATIONS,
+    NeuralNetworkRepresentation
+)
+
+
+class NeuralNetworkPopulation(BaseRepresentation):
+    """
+    Class for a population of simple neural network representations sharing
+    one architecture.
+
+    Notes
+    -----
+    The weights and biases of all members are stacked into one array per
+    layer (W_i_h is size x n_i x n_h and so on), so the whole population is
+    evaluated with one matmul per layer. Individual members are available as
+    NeuralNetworkRepresentation objects whose arrays are views into the
+    stacked arrays: reading them, or changing them with update_parameters,
+    reads or changes the population.
+
+    Parameters
+    ----------
+    size:       integer, default 100
+                number of networks in the population
+
+    n_i:        integer, default 16
+                number of inputs to each network
+
+    n_h:        integer, default 24
+                number of hidden nodes in each network
+
+    n_o:        integer, default 4
+                number of outputs produced by each network
+
+    activation: string, default sigmoid
+                type of activation function to use
+
+    seed:       integer, default 1234
+                Seed for the random number generator.
+
+    initialize: bool, default True
+                Whether or not to initialize the weights and biases upon
+                construction.
+
+    normalize_input:    bool, default True
+                        Whether or not to normalize the inputs.
+
+    dtype:      string, default float64
+                NumPy data type of the weights, biases and outputs.
+    """
+    def __init__(self,
+                 size=100,
+                 n_i=16,
+                 n_h=24,
+                 n_o=4,
+                 activation='sigmoid',
+                 seed=1234,
+                 initialize=True,
+                 normalize_input=True,
+                 dtype='float64'):
+        self.size = size
+        self.n_i = n_i
+        self.n_h = n_h
+        self.n_o = n_o
+        self.activation = activation
+        self.seed = seed
+        self.normalize_input = normalize_input
+        self.dtype = dtype
+
+        # stacked weights and biases of all members
+        self.W_i_h = np.zeros((size, n_i, n_h), dtype=dtype)
+        self.b_i_h = np.zeros((size, n_h), dtype=dtype)
+        self.W_h_o = np.zeros((size, n_h, n_o), dtype=dtype)
+        self.b_h_o = np.zeros((size, n_o), dtype=dtype)
+
+        # activation function
+        try:
+            self.activation_function = ACTIVATIONS[activation]
+        except KeyError:
+            raise ValueError('Unknown activation {}'.format(activation))
+
+        # scratch buffers for batched inference, keyed by input shape
+        self._scratch = dict()
+
+        # members are created on first access
+        self._members = [None] * size
+
+        # initialize if indicated
+        if initialize == True:
+            self.initialize()
+
+    @classmethod
+    def from_representations(cls, representations):
+        """
+        Build a population from existing networks.
+
+        Parameters
+        ----------
+        representations:    list
+                            NeuralNetworkRepresentation objects sharing one
+                            architecture; their weights are copied.
+
+        Returns
+        -------
+        population:         NeuralNetworkPopulation object
+                            Population holding a copy of each network.
+        """
+        first = representations[0]
+        population = cls(
+            size=len(representations),
+            n_i=first.n_i,
+            n_h=first.n_h,
+            n_o=first.n_o,
+            activation=first.activation,
+            seed=first.seed,
+            initialize=False,
+            normalize_input=first.normalize_input,
+            dtype=first.dtype
+        )
+
+        for p, rep in enumerate(representations):
+            population.W_i_h[p] = rep.W_i_h
+            population.b_i_h[p] = rep.b_i_h
+            population.W_h_o[p] = rep.W_h_o
+            population.b_h_o[p] = rep.b_h_o
+
+        return population
+
+    def initialize(self):
+        """
+        Initialize the weights and biases of every member with random numbers.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        # random number generator ensuring reproducibility
+        rng = np.random.default_rng(self.seed)
+
+        self.W_i_h[...] = rng.normal(0.0, self.n_i ** -0.5, self.W_i_h.shape)
+        self.b_i_h[...] = rng.normal(0.0, self.n_i ** -0.5, self.b_i_h.shape)
+        self.W_h_o[...] = rng.normal(0.0, self.n_h ** -0.5, self.W_h_o.shape)
+        self.b_h_o[...] = rng.normal(0.0, self.n_h ** -0.5, self.b_h_o.shape)
+
+    def get_arrays(self):
+        """
+        Get the stacked weights and biases of the population.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        arrays:     dictionary
+                    W_i_h, b_i_h, W_h_o and b_h_o by name.
+        """
+        return {
+            'W_i_h': self.W_i_h,
+            'b_i_h': self.b_i_h,
+            'W_h_o': self.W_h_o,
+            'b_h_o': self.b_h_o
+        }
+
+    def set_arrays(self, arrays):
+        """
+        Replace the stacked weights and biases of the population, without
+        copying.
+
+        Parameters
+        ----------
+        arrays:     dictionary
+                    W_i_h, b_i_h, W_h_o and b_h_o by name.
+
+        Returns
+        -------
+        None
+        """
+        for name, array in self.get_arrays().items():
+            if arrays[name].shape != array.shape:
+                raise ValueError(
+                    '{n} of shape {s} does not match this '
+                    'population.'.format(n=name, s=arrays[name].shape)
+                )
+
+        self.W_i_h = arrays['W_i_h']
+        self.b_i_h = arrays['b_i_h']
+        self.W_h_o = arrays['W_h_o']
+        self.b_h_o = arrays['b_h_o']
+
+        # members are views of the previous arrays
+        self._members = [None] * self.size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, p):
+        """
+        Retrieve a member of the population.
+
+        Parameters
+        ----------
+        p:          integer
+                    Index of the member.
+
+        Returns
+        -------
+        member:     NeuralNetworkRepresentation object
+                    Network whose weights and biases are views into the
+                    population's arrays.
+        """
+        if p < 0:
+            p += self.size
+
+        member = self._members[p]
+
+        if member is None:
+            member = NeuralNetworkRepresentation(
+                n_i=self.n_i,
+                n_h=self.n_h,
+                n_o=self.n_o,
+                activation=self.activation,
+                seed=self.seed,
+                initialize=False,
+                normalize_input=self.normalize_input,
+                dtype=self.dtype
+            )
+
+            # point the member at its slice of the stacked arrays
+            member.W_i_h = self.W_i_h[p]
+            member.b_i_h = self.b_i_h[p]
+            member.W_h_o = self.W_h_o[p]
+            member.b_h_o = self.b_h_o[p]
+
+            self._members[p] = member
+
+        return member
+
+    def _get_scratch(self, shape):
+        """
+        Retrieve the scratch buffers for an input shape, allocating them on
+        first use.
+
+        Parameters
+        ----------
+        shape:      tuple
+                    Shape of the inputs, (size, B, n_i) or (B, n_i).
+
+        Returns
+        -------
+        scratch:    tuple of NumPy arrays
+                    Buffers for the normalized inputs (same shape as the
+                    inputs) and the hidden layer (size, B, n_h).
+        """
+        scratch = self._scratch.get(shape)
+
+        if scratch is None:
+            scratch = (
+                np.empty(shape, dtype=self.dtype),
+                np.empty((self.size, shape[-2], self.n_h), dtype=self.dtype)
+            )
+            self._scratch[shape] = scratch
+
+        return scratch
+
+    def feed_forward(self, X, out=None):
+        """
+        Feed batches of inputs through every network of the population.
+
+        Parameters
+        ----------
+        X:          NumPy array (size, B, n_i) or (B, n_i)
+                    Raw inputs: one batch per member, or one batch shared by
+                    all members.
+
+        out:        NumPy array (size, B, n_o) or None, default None
+                    Array to write the outputs to; allocated if None.
+
+        Returns
+        -------
+        o_o:        NumPy array (size, B, n_o)
+                    Outputs of each member for each of its inputs.
+        """
+        i, h = self._get_scratch(X.shape)
+
+        if out is None:
+            out = np.empty((self.size, X.shape[-2], self.n_o),
+                           dtype=self.dtype)
+
+        # normalize the input layer
+        if self.normalize_input == True:
+            i = self.normalize(X, out=i)
+        else:
+            i = X
+
+        # calculate the hidden layer inputs and outputs for every member
+        np.matmul(i, self.W_i_h, out=h)
+        h += self.b_i_h[:, np.newaxis, :]
+        self.activation_function(h, out=h)
+
+        # calculate the output layer inputs and outputs for every member
+        np.matmul(h, self.W_h_o, out=out)
+        out += self.b_h_o[:, np.newaxis, :]
+        self.activation_function(out, out=out)
+
+        return out
+
+    def best_moves(self, X, legal=None, out=None):
+        """
+        Pick each member's highest scoring move for each of its inputs.
+
+        Parameters
+        ----------
+        X:          NumPy array (size, B, n_i) or (B, n_i)
+                    Raw inputs; see feed_forward.
+
+        legal:      NumPy array of booleans or None, default None
+                    Whether or not each move is legal for each input,
+                    broadcastable to (size, B, n_o).
+
+        out:        NumPy array (size, B, n_o) or None, default None
+                    Array to write the network outputs to; illegal moves are
+                    set to -inf.
+
+        Returns
+        -------
+        moves:      NumPy array (size, B) of integers
+                    Index of the picked output for each member and input.
+        """
+        scores = self.feed_forward(X, out=out)
+
+        if legal is not None:
+            scores[~np.broadcast_to(legal, scores.shape)] = -np.inf
+
+        return np.argmax(scores, axis=2)
@@ -0,0 +1,261 @@
+import time
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python 3.7 and earlier
+    shared_memory = None
+
+
+# Layout of a shared memory block: a version counter (uint64) in the first
+# ALIGNMENT bytes, then the arrays one after the other, each starting on a
+# multiple of ALIGNMENT bytes.
+ALIGNMENT = 64
+
+# whether or not this Python can share memory between processes (3.8+)
+AVAILABLE = shared_memory is not None
+
+
+def _align(n):
+    """
+    Round a byte count up to a multiple of ALIGNMENT.
+    """
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+class SharedWeights:
+    """
+    The arrays of a representation, published in one shared memory block for
+    other processes to read in place.
+
+    Notes
+    -----
+    The process creating the object owns the block and publishes new values
+    of the arrays with publish. The object is sent to worker processes once,
+    for example as an initializer argument of a ProcessPoolExecutor; there
+    it attaches to the same block, and attach points a representation's
+    arrays at NumPy views of it. Later publishes are seen by every worker
+    without sending the arrays again, so broadcasting new weights costs one
+    copy into the block however many workers there are.
+
+    A version counter guards the arrays as a sequence lock: publish makes it
+    odd while writing and even again when done. Readers wanting to be sure
+    they did not see a half-written update bracket their reads with
+    read_begin and read_retry:
+
+        while True:
+            version = weights.read_begin()
+            out = representation.feed_forward_batch(X)
+            if not weights.read_retry(version):
+                break
+
+    There is a single publisher, the owning process. Shared memory needs
+    Python 3.8 or later; check AVAILABLE before creating the object.
+
+    Parameters
+    ----------
+    source:     BaseRepresentation object or dictionary
+                Representation whose arrays (from get_arrays) are shared, or
+                the arrays by name; they give the layout of the block and its
+                first version.
+
+    Attributes
+    ----------
+    name:       string
+                Name of the shared memory block.
+
+    layout:     list
+                (name, dtype, shape, offset) of each array in the block.
+
+    arrays:     dictionary
+                Views of the arrays in the block, by name; read-only outside
+                the owning process.
+    """
+    def __init__(self, source):
+        if not AVAILABLE:
+            raise RuntimeError(
+                'SharedWeights requires Python 3.8 or later.'
+            )
+
+        arrays = self._get_arrays(source)
+
+        # lay the arrays out after the version counter
+        self.layout = []
+        offset = ALIGNMENT
+        for name, array in arrays.items():
+            array = np.asarray(array)
+            self.layout.append(
+                (name, array.dtype.str, array.shape, offset)
+            )
+            offset = _align(offset + array.nbytes)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=offset)
+        self.name = self._shm.name
+        self._owner = True
+        self._map()
+
+        self.publish(arrays)
+
+    @staticmethod
+    def _get_arrays(source):
+        """
+        Arrays of a representation, or the given arrays themselves.
+        """
+        if isinstance(source, dict):
+            return source
+
+        return source.get_arrays()
+
+    def _map(self):
+        """
+        Create the views of the version counter and the arrays.
+        """
+        buf = self._shm.buf
+        self._version = np.ndarray((1,), dtype=np.uint64, buffer=buf)
+
+        self.arrays = dict()
+        for name, dtype, shape, offset in self.layout:
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buf,
+                               offset=offset)
+            array.flags.writeable = self._owner
+            self.arrays[name] = array
+
+    def __getstate__(self):
+        # only the block's name and layout travel between processes
+        return {'name': self.name, 'layout': self.layout}
+
+    def __setstate__(self, state):
+        self.name = state['name']
+        self.layout = state['layout']
+        self._shm = shared_memory.SharedMemory(name=self.name)
+        self._owner = False
+        self._map()
+
+    @property
+    def version(self):
+        """
+        Current version of the arrays; odd while an update is being written.
+        """
+        return int(self._version[0])
+
+    def publish(self, source):
+        """
+        Copy new values of the arrays into the block.
+
+        Parameters
+        ----------
+        source:     BaseRepresentation object or dictionary
+                    Representation or arrays by name, with the layout the
+                    block was created with.
+
+        Returns
+        -------
+        version:    integer
+                    Version of the published arrays.
+        """
+        if not self._owner:
+            raise RuntimeError(
+                'Only the process which created the shared weights can '
+                'publish them.'
+            )
+
+        arrays = self._get_arrays(source)
+        for name, array in arrays.items():
+            if np.shape(array) != self.arrays[name].shape:
+                raise ValueError(
+                    '{n} of shape {s} does not match the shared '
+                    'weights.'.format(n=name, s=np.shape(array))
+                )
+
+        # odd while writing, so readers can tell
+        self._version[0] += 1
+        for name, array in arrays.items():
+            self.arrays[name][...] = array
+        self._version[0] += 1
+
+        return self.version
+
+    def read_begin(self):
+        """
+        Wait for any update being written to finish.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        version:    integer
+                    Version of the arrays, to give to read_retry.
+        """
+        version = self.version
+        while version % 2 == 1:
+            time.sleep(0)
+            version = self.version
+
+        return version
+
+    def read_retry(self, version):
+        """
+        Check whether the arrays changed since read_begin.
+
+        Parameters
+        ----------
+        version:    integer
+                    Version returned by read_begin.
+
+        Returns
+        -------
+        retry:      bool
+                    Whether or not an update started since, so what was read
+                    may mix two versions.
+        """
+        return self.version != version
+
+    def attach(self, representation):
+        """
+        Point a representation's arrays at the shared arrays, without
+        copying; see the representation's set_arrays.
+
+        Parameters
+        ----------
+        representation: BaseRepresentation object
+                        Representation with the layout of the shared arrays.
+
+        Returns
+        -------
+        representation: BaseRepresentation object
+                        The same representation, now reading the shared
+                        arrays.
+        """
+        representation.set_arrays(self.arrays)
+
+        return representation
+
+    def close(self):
+        """
+        Detach from the block, removing it if this process owns it. Arrays
+        attached to representations must be released first.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self._version = None
+        self.arrays = dict()
+        self._shm.close()
+
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
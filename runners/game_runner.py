@@ -0,0 +1,386 @@
+import asyncio
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from envs import bitboard
+from envs.batch import BatchGameEnv, legal_moves
+from envs.engine import GameEngine
+from envs.timing import MoveTimer
+
+
+GameResult = namedtuple(
+    'GameResult',
+    ['game', 'score', 'n_moves', 'max_tile', 'condition', 'seconds']
+)
+GameResult.__doc__ = """
+Outcome of one game played by a GameRunner.
+
+Fields
+------
+game:       integer
+            Number of the game, from 0.
+
+score:      integer
+            Final score.
+
+n_moves:    integer
+            Number of moves played.
+
+max_tile:   integer
+            Largest tile on the final board.
+
+condition:  integer
+            Final condition of the game (see GameEngine).
+
+seconds:    float
+            Wall time spent playing the game.
+"""
+
+# shared by runs without timing
+_NO_TIMER = MoveTimer(enabled=False)
+
+
+def play_game(game, agent, game_id=0, timer=None, verbose=False):
+    """
+    Play one game to its end.
+
+    Parameters
+    ----------
+    game:       GameEngine or GameHandle object
+                Game in progress, providing get_state() and move(move).
+
+    agent:      BaseAgent object
+                Agent choosing each move from the current tiles and which
+                moves are legal.
+
+    game_id:    integer, default 0
+                Number of the game, reported in the result.
+
+    timer:      MoveTimer object or None, default None
+                Timer recording the next_move and move phases of each move
+                (no timing if None).
+
+    verbose:    bool, default False
+                If true, print the score and condition after each move.
+
+    Returns
+    -------
+    result:     GameResult object
+                Outcome of the game.
+    """
+    timer = timer or _NO_TIMER
+    start = time.perf_counter()
+    number = timer.start_game()
+
+    tiles, score, _, condition = game.get_state()
+    n_moves = 0
+    while (condition == GameEngine.game_on and
+           n_moves < GameEngine.max_iter):
+        # make the agents next move, among those changing the board; the
+        # mask comes from the tiles already read, without a round trip
+        with timer.phase('next_move'):
+            legal = bitboard.legal_moves(bitboard.to_board(tiles))
+            move = agent.next_move(tiles, legal)
+
+        # make it and retrieve the updated game state in one call
+        with timer.phase('move'):
+            tiles, score, _, condition, _ = game.move(move)
+        timer.count_move()
+
+        # inform the user of the updated game state
+        if verbose:
+            print('Iter: {iter}, New score: {s}, Condition: {c}'.format(
+                iter=n_moves,
+                s=score,
+                c=condition
+            ))
+
+        n_moves += 1
+
+    timer.end_game(number)
+
+    return GameResult(
+        game=game_id,
+        score=score,
+        n_moves=n_moves,
+        max_tile=max(val or 0 for row in tiles for val in row),
+        condition=condition,
+        seconds=time.perf_counter() - start
+    )
+
+
+class EngineBackend:
+    """
+    Backend playing games on the in-process batch engine.
+
+    Notes
+    -----
+    The games being played advance together, one move per game per step of a
+    BatchGameEnv, with one call to the next_moves method of a single agent
+    choosing the moves of all of them. A slot whose game ends starts the next
+    game, after the agent's reset_games, until all games are played.
+
+    Parameters
+    ----------
+    seed:       integer, default 1234
+                Seed for the games.
+    """
+    def __init__(self, seed=1234):
+        self.seed = seed
+
+    async def play_games(self, agent_factory, n_games, concurrency, timer):
+        """
+        Play games, several at a time.
+
+        Parameters
+        ----------
+        agent_factory:  callable
+                        Called once without arguments to create the agent
+                        playing every game.
+
+        n_games:        integer
+                        Number of games played.
+
+        concurrency:    integer or None
+                        Number of games played at a time (all if None).
+
+        timer:          MoveTimer object
+                        Timer recording the next_move and step phases.
+
+        Returns
+        -------
+        results:        list
+                        GameResult object of each game, in game order.
+        """
+        n_slots = min(concurrency or n_games, n_games)
+        env = BatchGameEnv(n_games=n_slots, seed=self.seed)
+        boards, legal = env.reset()
+
+        # one agent for all slots; the game, move count and start time of
+        # each slot
+        agent = agent_factory()
+        slot_game = np.arange(n_slots)
+        n_moves = np.zeros(n_slots, dtype=np.int64)
+        starts = [time.perf_counter()] * n_slots
+        numbers = [timer.start_game() for _ in range(n_slots)]
+        next_game = n_slots
+
+        results = [None] * n_games
+        active = np.ones(n_slots, dtype=bool)
+
+        while active.any():
+            slots = np.flatnonzero(active)
+
+            # finished slots keep being stepped, so rows stay put
+            with timer.phase('next_move'):
+                moves = agent.next_moves(boards, legal)
+
+            with timer.phase('step'):
+                boards, _, done, legal = env.step(moves)
+            timer.count_move(len(slots))
+            n_moves[slots] += 1
+
+            # games still having a legal move were stopped by the move limit
+            ended = np.flatnonzero(done & active)
+            stopped = legal_moves(env.final_boards[ended]).any(axis=1)
+            restarted = []
+
+            for s, limited in zip(ended, stopped):
+                final = env.final_boards[s]
+                condition = (GameEngine.game_on if limited
+                             else GameEngine.game_over)
+
+                results[slot_game[s]] = GameResult(
+                    game=int(slot_game[s]),
+                    score=int(env.final_scores[s]),
+                    n_moves=int(n_moves[s]),
+                    max_tile=1 << int(final.max()) if final.max() else 0,
+                    condition=condition,
+                    seconds=time.perf_counter() - starts[s]
+                )
+                timer.end_game(numbers[s])
+
+                # start the next game in this slot, on its fresh board
+                if next_game < n_games:
+                    slot_game[s] = next_game
+                    restarted.append(s)
+                    n_moves[s] = 0
+                    starts[s] = time.perf_counter()
+                    numbers[s] = timer.start_game()
+                    next_game += 1
+                else:
+                    active[s] = False
+
+            if restarted:
+                agent.reset_games(np.array(restarted))
+
+            # let other tasks run between steps
+            await asyncio.sleep(0)
+
+        return results
+
+
+class BrowserBackend:
+    """
+    Backend playing games on a pool of browser sessions.
+
+    Notes
+    -----
+    Each game checks out a session from the pool and is played on a thread of
+    an executor, so the WebDriver round trips of concurrent games overlap
+    while the event loop waits on them.
+
+    Parameters
+    ----------
+    pool:       BrowserPool object
+                Started pool of browser sessions.
+
+    executor:   Executor object or None, default None
+                Executor running the games; a thread pool sized to the
+                concurrency if None.
+    """
+    def __init__(self, pool, executor=None):
+        self.pool = pool
+        self.executor = executor
+
+    def _play_on_pool(self, agent, game_id, timer):
+        """
+        Play one game on a session checked out from the pool. Runs on an
+        executor thread.
+        """
+        with self.pool.acquire() as handle:
+            return play_game(handle, agent, game_id=game_id, timer=timer)
+
+    async def play_games(self, agent_factory, n_games, concurrency, timer):
+        """
+        Play games, several at a time.
+
+        Parameters
+        ----------
+        agent_factory:  callable
+                        Called without arguments to create the agent of each
+                        game.
+
+        n_games:        integer
+                        Number of games played.
+
+        concurrency:    integer or None
+                        Number of games played at a time (one per session of
+                        the pool if None).
+
+        timer:          MoveTimer object
+                        Timer recording the next_move and move phases.
+
+        Returns
+        -------
+        results:        list
+                        GameResult object of each game, in game order.
+        """
+        concurrency = concurrency or self.pool.n_sessions
+        loop = asyncio.get_running_loop()
+
+        executor = self.executor
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def play(game_id):
+            async with semaphore:
+                return await loop.run_in_executor(
+                    executor, self._play_on_pool, agent_factory(), game_id,
+                    timer
+                )
+
+        try:
+            return list(await asyncio.gather(
+                *(play(game_id) for game_id in range(n_games))
+            ))
+        finally:
+            if self.executor is None:
+                executor.shutdown(wait=False)
+
+
+class GameRunner:
+    """
+    Class object playing many games of an agent concurrently.
+
+    Notes
+    -----
+    The runner hands the games to a backend: an EngineBackend steps the games
+    in one process on the batch engine, with one agent from agent_factory
+    choosing the moves of all of them at once, a BrowserBackend plays them on
+    a pool of browser sessions, with a fresh agent for every game. Either way
+    run returns one GameResult per game.
+
+    Parameters
+    ----------
+    agent_factory:  callable
+                    Called without arguments to create an agent, for example
+                    an agent class; see the backends.
+
+    backend:        EngineBackend or BrowserBackend object or None,
+                    default None
+                    Where the games are played; an EngineBackend if None.
+
+    n_games:        integer, default 1
+                    Number of games played.
+
+    concurrency:    integer or None, default None
+                    Number of games played at a time; see the backends.
+
+    timer:          MoveTimer object or None, default None
+                    Timer recording the phases of each move (no timing if
+                    None).
+    """
+    def __init__(self,
+                 agent_factory,
+                 backend=None,
+                 n_games=1,
+                 concurrency=None,
+                 timer=None):
+        self.agent_factory = agent_factory
+        self.backend = backend
+        self.n_games = n_games
+        self.concurrency = concurrency
+        self.timer = timer
+
+    async def play(self):
+        """
+        Play the games; a coroutine, for use inside a running event loop.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        results:    list
+                    GameResult object of each game, in game order.
+        """
+        backend = self.backend or EngineBackend()
+
+        return await backend.play_games(
+            self.agent_factory,
+            self.n_games,
+            self.concurrency,
+            self.timer or _NO_TIMER
+        )
+
+    def run(self):
+        """
+        Play the games, in a new event loop.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        results:    list
+                    GameResult object of each game, in game order.
+        """
+        return asyncio.run(self.play())
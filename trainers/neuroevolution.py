@@ -0,0 +1,456 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from agents.neural_network import NeuralNetworkAgent
+from envs.batch import BatchGameEnv
+from representations.neural_network import NeuralNetworkRepresentation
+from representations.population import NeuralNetworkPopulation
+from representations import shared
+
+
+# population of a worker process, reading the shared weights; set by
+# _init_worker
+_worker = dict()
+
+
+def play_games(representation, n_games=32, seed=1234):
+    """
+    Play a set of games with a network and report their final scores.
+
+    Parameters
+    ----------
+    representation: NeuralNetworkRepresentation object
+                    Network picking the legal move with the highest output.
+
+    n_games:        integer, default 32
+                    Number of games, played at once on a BatchGameEnv.
+
+    seed:           integer, default 1234
+                    Seed for the games' random number streams.
+
+    Returns
+    -------
+    scores:         NumPy array (n_games,)
+                    Final score of each game.
+    """
+    agent = NeuralNetworkAgent(representation=representation)
+    game = BatchGameEnv(n_games=n_games, seed=seed)
+    boards, legal = game.reset()
+
+    # play until every game has finished once
+    finished = np.zeros(n_games, dtype=bool)
+    scores = np.zeros(n_games, dtype=np.int64)
+    while not finished.all():
+        moves = agent.next_moves(boards, legal)
+        boards, _, done, legal = game.step(moves)
+
+        # keep the score of each game's first finish
+        first = done & ~finished
+        scores[first] = game.final_scores[first]
+        finished |= done
+
+    return scores
+
+
+def _evaluate(params, weights, n_games, seed):
+    """
+    Fitness of one network: its mean final score. Runs in worker processes.
+
+    Parameters
+    ----------
+    params:     dictionary
+                Constructor parameters of the NeuralNetworkRepresentation.
+
+    weights:    tuple of NumPy arrays
+                W_i_h, b_i_h, W_h_o and b_h_o of the network.
+
+    n_games:    integer
+                Number of games played.
+
+    seed:       integer
+                Seed for the games' random number streams.
+
+    Returns
+    -------
+    fitness:    float
+                Mean final score.
+    """
+    representation = NeuralNetworkRepresentation(**params)
+    representation.update_parameters(*weights)
+
+    return float(np.mean(play_games(representation, n_games, seed)))
+
+
+def _init_worker(weights, params):
+    """
+    Attach a worker process to the population's shared weights.
+
+    Parameters
+    ----------
+    weights:    SharedWeights object
+                Stacked weights and biases of the population.
+
+    params:     dictionary
+                Constructor parameters of the NeuralNetworkPopulation.
+
+    Returns
+    -------
+    None
+    """
+    _worker['weights'] = weights
+    _worker['population'] = weights.attach(NeuralNetworkPopulation(**params))
+
+
+def _evaluate_member(p, n_games, seed):
+    """
+    Fitness of one member of the shared population: its mean final score.
+    Runs in worker processes.
+
+    Parameters
+    ----------
+    p:          integer
+                Index of the member.
+
+    n_games:    integer
+                Number of games played.
+
+    seed:       integer
+                Seed for the games' random number streams.
+
+    Returns
+    -------
+    fitness:    float
+                Mean final score.
+    """
+    weights = _worker['weights']
+    member = _worker['population'][p]
+
+    # play again if the weights were published mid-evaluation
+    while True:
+        version = weights.read_begin()
+        fitness = float(np.mean(play_games(member, n_games, seed)))
+        if not weights.read_retry(version):
+            return fitness
+
+
+class NeuroevolutionTrainer:
+    """
+    Class object for training neural network agents by neuroevolution.
+
+    A population of networks, all with the configuration of a given
+    NeuralNetworkRepresentation, is evolved with elitism, uniform crossover
+    and Gaussian mutation. The fitness of a network is its mean final score
+    over a set of games; within a generation every network plays the same
+    games, and the networks are evaluated in parallel on a process pool.
+    The pool's workers read the population from shared memory, which is
+    updated once per generation, so tasks only carry member indices; before
+    Python 3.8, which lacks shared memory, each task carries its member's
+    weights instead.
+
+    Parameters
+    ----------
+    representation:     NeuralNetworkRepresentation object
+                        Network whose configuration (via get_params) is used
+                        for the population; its weights seed the first member.
+
+    population_size:    integer, default 64
+                        Number of networks in the population.
+
+    n_generations:      integer, default 50
+                        Number of generations to evolve.
+
+    n_games:            integer, default 32
+                        Number of games played to measure fitness.
+
+    elite_fraction:     float, default 0.25
+                        Fraction of the population kept unchanged, and used as
+                        parents, each generation.
+
+    crossover_rate:     float, default 0.5
+                        Probability that a child combines two parents rather
+                        than cloning one.
+
+    mutation_sigma:     float, default 0.1
+                        Standard deviation of the Gaussian mutations.
+
+    n_jobs:             integer or None, default None
+                        Number of worker processes (all cores if None; no pool
+                        if 1).
+
+    seed:               integer, default 1234
+                        Seed for the population, the evolution and the games.
+
+    Attributes
+    ----------
+    best_representation:    NeuralNetworkRepresentation object
+                            Fittest network found.
+
+    best_fitness:           float
+                            Fitness of the fittest network found.
+
+    history:                list
+                            (generation, best fitness, mean fitness) of each
+                            generation.
+    """
+    def __init__(self,
+                 representation=None,
+                 population_size=64,
+                 n_generations=50,
+                 n_games=32,
+                 elite_fraction=0.25,
+                 crossover_rate=0.5,
+                 mutation_sigma=0.1,
+                 n_jobs=None,
+                 seed=1234):
+        self.representation = representation
+        self.population_size = population_size
+        self.n_generations = n_generations
+        self.n_games = n_games
+        self.elite_fraction = elite_fraction
+        self.crossover_rate = crossover_rate
+        self.mutation_sigma = mutation_sigma
+        self.n_jobs = n_jobs
+        self.seed = seed
+
+        self.best_representation = None
+        self.best_fitness = None
+        self.history = []
+
+    def _get_representation_params(self):
+        """
+        Constructor parameters of the networks in the population.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        params:     dictionary
+                    Parameters of the given representation, with weight
+                    initialization disabled.
+        """
+        if self.representation is None:
+            self.representation = NeuralNetworkRepresentation(seed=self.seed)
+
+        params = self.representation.get_params()
+        params['initialize'] = False
+
+        return params
+
+    def _evaluate_population(self,
+                             population,
+                             params,
+                             seed,
+                             executor,
+                             weights=None):
+        """
+        Measure the fitness of every member of the population.
+
+        Parameters
+        ----------
+        population: NeuralNetworkPopulation object
+                    Population to evaluate.
+
+        params:     dictionary
+                    Constructor parameters of the networks.
+
+        seed:       integer
+                    Seed for the games, shared by all members.
+
+        executor:   ProcessPoolExecutor object or None
+                    Pool evaluating the members (in process if None).
+
+        weights:    SharedWeights object or None, default None
+                    Population's weights, as read by the pool's workers;
+                    updated with the population before evaluating. If None,
+                    each task carries its member's weights instead.
+
+        Returns
+        -------
+        fitness:    NumPy array (population_size,)
+                    Fitness of each member.
+        """
+        size = len(population)
+
+        if executor is None or weights is None:
+            tasks = [
+                (params,
+                 (population.W_i_h[p], population.b_i_h[p],
+                  population.W_h_o[p], population.b_h_o[p]),
+                 self.n_games,
+                 seed)
+                for p in range(size)
+            ]
+
+            if executor is None:
+                fitness = [_evaluate(*task) for task in tasks]
+            else:
+                fitness = list(executor.map(_evaluate, *zip(*tasks)))
+        else:
+            weights.publish(population)
+            fitness = list(executor.map(
+                _evaluate_member,
+                range(size),
+                [self.n_games] * size,
+                [seed] * size
+            ))
+
+        return np.array(fitness)
+
+    def _next_generation(self, population, fitness, rng):
+        """
+        Replace the population, in place, with its next generation.
+
+        Parameters
+        ----------
+        population: NeuralNetworkPopulation object
+                    Current population.
+
+        fitness:    NumPy array (population_size,)
+                    Fitness of each member.
+
+        rng:        NumPy Generator object
+                    Random number generator driving the evolution.
+
+        Returns
+        -------
+        None
+        """
+        size = len(population)
+        n_elite = max(1, int(self.elite_fraction * size))
+        n_children = size - n_elite
+
+        # the elite, fittest first, are the parents of the children
+        elite = np.argsort(-fitness, kind='stable')[:n_elite]
+        parents_a = elite[rng.integers(n_elite, size=n_children)]
+        parents_b = elite[rng.integers(n_elite, size=n_children)]
+        crossover = rng.random(n_children) < self.crossover_rate
+
+        for arr in (population.W_i_h, population.b_i_h,
+                    population.W_h_o, population.b_h_o):
+            a = arr[parents_a]
+            b = arr[parents_b]
+
+            # uniform crossover: each weight comes from either parent
+            shape = (n_children,) + (1,) * (arr.ndim - 1)
+            mask = (rng.random(a.shape) < 0.5) & crossover.reshape(shape)
+            children = np.where(mask, b, a)
+
+            # gaussian mutation
+            children += rng.normal(0.0, self.mutation_sigma, children.shape)
+
+            arr[:n_elite] = arr[elite]
+            arr[n_elite:] = children
+
+    def fit(self):
+        """
+        Evolve the population.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        best_representation:    NeuralNetworkRepresentation object
+                                Fittest network found.
+        """
+        params = self._get_representation_params()
+        rng = np.random.default_rng(self.seed)
+
+        # random population, with the given network as its first member
+        population = NeuralNetworkPopulation(
+            size=self.population_size,
+            n_i=params['n_i'],
+            n_h=params['n_h'],
+            n_o=params['n_o'],
+            activation=params['activation'],
+            seed=self.seed,
+            normalize_input=params['normalize_input'],
+            dtype=params['dtype']
+        )
+        population[0].update_parameters(
+            self.representation.W_i_h,
+            self.representation.b_i_h,
+            self.representation.W_h_o,
+            self.representation.b_h_o
+        )
+
+        # one seed per generation, so every member plays the same games
+        game_seeds = rng.integers(2 ** 31, size=self.n_generations)
+
+        # workers attach to the population's weights once, in shared memory;
+        # without it (before Python 3.8) each task carries its weights
+        n_jobs = self.n_jobs or os.cpu_count()
+        executor = None
+        weights = None
+        if n_jobs > 1 and shared.AVAILABLE:
+            weights = shared.SharedWeights(population)
+            population_params = population.get_params()
+            population_params['initialize'] = False
+            executor = ProcessPoolExecutor(
+                n_jobs,
+                initializer=_init_worker,
+                initargs=(weights, population_params)
+            )
+        elif n_jobs > 1:
+            executor = ProcessPoolExecutor(n_jobs)
+
+        try:
+            for generation in range(self.n_generations):
+                fitness = self._evaluate_population(
+                    population,
+                    params,
+                    int(game_seeds[generation]),
+                    executor,
+                    weights
+                )
+
+                # keep a copy of the fittest network seen so far
+                best = int(np.argmax(fitness))
+                improved = (self.best_fitness is None or
+                            fitness[best] > self.best_fitness)
+                if improved:
+                    self.best_fitness = float(fitness[best])
+                    self.best_representation = NeuralNetworkRepresentation(
+                        **params
+                    )
+                    self.best_representation.update_parameters(
+                        population.W_i_h[best],
+                        population.b_i_h[best],
+                        population.W_h_o[best],
+                        population.b_h_o[best]
+                    )
+
+                self.history.append(
+                    (generation, float(fitness[best]), float(fitness.mean()))
+                )
+
+                if generation < self.n_generations - 1:
+                    self._next_generation(population, fitness, rng)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if weights is not None:
+                weights.close()
+
+        return self.best_representation
+
+    def save(self, filename=None):
+        """
+        Save an agent playing with the fittest network found.
+
+        Parameters
+        ----------
+        filename    string
+                    File name for the saved object.
+
+        Returns
+        -------
+        None
+        """
+        agent = NeuralNetworkAgent(representation=self.best_representation)
+        agent.save(filename)
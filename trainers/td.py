@@ -0,0 +1,126 @@
+import numpy as np
+
+from envs.batch import RandomStreams, legal_moves, move_boards, spawn_tiles
+from representations.ntuple import NTupleRepresentation
+
+
+class TDTrainer:
+    """
+    Class object for training n-tuple networks by temporal difference
+    learning.
+
+    The network learns the value of afterstates: the boards reached by a move,
+    before the new tile is placed. The trainer plays games greedily with
+    respect to score gained plus afterstate value, and after each move pulls
+    the value of the previous afterstate towards the score gained by the move
+    plus the value of the new afterstate (TD(0)). Lookup indices are carried
+    from board to board, recomputing only the lookups touching changed cells.
+
+    Parameters
+    ----------
+    representation: NTupleRepresentation object or None, default None
+                    Network to train; a new one with the default tuples if
+                    None.
+
+    n_games:        integer, default 1000
+                    Number of games played.
+
+    seed:           integer, default 1234
+                    Seed for the games.
+
+    Attributes
+    ----------
+    scores:         list
+                    Final score of each game played.
+    """
+    def __init__(self, representation=None, n_games=1000, seed=1234):
+        self.representation = representation
+        self.n_games = n_games
+        self.seed = seed
+
+        self.scores = []
+
+    def _play_game(self, seed):
+        """
+        Play one game, learning after every move.
+
+        Parameters
+        ----------
+        seed:       integer
+                    Seed for the game.
+
+        Returns
+        -------
+        score:      integer
+                    Final score of the game.
+        """
+        rep = self.representation
+        streams = RandomStreams(1, seed=seed)
+        game = np.zeros(1, dtype=np.int64)
+
+        boards = np.zeros((1, 16), dtype=np.uint8)
+        spawn_tiles(boards, game, streams)
+        spawn_tiles(boards, game, streams)
+        board = boards[0]
+        indices = rep.indices(board)
+
+        score = 0
+        previous = None
+        while True:
+            legal = legal_moves(board[np.newaxis])[0]
+            if not legal.any():
+                break
+
+            # value every move from the current board
+            after, score_add, _ = move_boards(
+                np.repeat(board[np.newaxis], 4, axis=0),
+                np.arange(4)
+            )
+            after_indices = np.stack([
+                rep.update_indices(indices, board, after[move])
+                for move in range(4)
+            ])
+            values = score_add + rep.evaluate_indices(after_indices)
+            values[~legal] = -np.inf
+            move = int(np.argmax(values))
+
+            # pull the previous afterstate towards the move's outcome
+            if previous is not None:
+                rep.learn(previous, values[move])
+            previous = after_indices[move]
+
+            # place the new tile
+            boards = after[move][np.newaxis].copy()
+            spawn_tiles(boards, game, streams)
+            indices = rep.update_indices(previous, after[move], boards[0])
+            board = boards[0]
+
+            score += int(score_add[move])
+
+        # nothing follows the final afterstate
+        if previous is not None:
+            rep.learn(previous, 0.0)
+
+        return score
+
+    def fit(self):
+        """
+        Play and learn from the games.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        representation: NTupleRepresentation object
+                        Trained network.
+        """
+        if self.representation is None:
+            self.representation = NTupleRepresentation()
+
+        seeds = np.random.SeedSequence(self.seed).generate_state(self.n_games)
+        for seed in seeds.tolist():
+            self.scores.append(self._play_game(seed))
+
+        return self.representation